@@ -1,5 +1,6 @@
 import argparse
 import logging
+import multiprocessing
 import sys
 import signal
 from src.application import Application
@@ -65,4 +66,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包后的程序启动唤醒词子进程时会重新执行入口，需要先交给 multiprocessing 处理
+    multiprocessing.freeze_support()
     sys.exit(main())
\ No newline at end of file
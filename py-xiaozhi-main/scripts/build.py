@@ -207,6 +207,7 @@ a = Analysis(
         'websockets',  # 添加 websockets 依赖
         'vosk',  # 添加语音识别依赖
         'vosk.vosk_cffi',  # 添加 vosk cffi 模块
+        'src.audio_processing.wake_word_detect',  # 唤醒词子进程中延迟导入
     ],
     hookspath=['hooks'],  # 添加自定义钩子目录
     hooksconfig={{}},
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 文件名: ws_test_server.py
+"""
+本地 WebSocket 测试服务器
+
+只实现 hello 握手和音频回环：收到的上行 Opus 帧原样发回客户端，
+用于在没有真实服务器时验证二进制协议 v2 的协商和帧头收发。
+
+使用方法:
+    python scripts/ws_test_server.py --port 8000 --version 2
+    然后把配置中的 WEBSOCKET_URL 改为 ws://127.0.0.1:8000/ ，
+    WEBSOCKET_PROTOCOL_VERSION 改为 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import websockets
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.protocols.binary_protocol import (  # noqa: E402
+    FrameType, PROTOCOL_VERSION_FRAMED, PROTOCOL_VERSION_RAW,
+    pack_frame, unpack_frame
+)
+
+
+class Session:
+    """一个客户端连接的状态"""
+
+    def __init__(self, websocket, server_version):
+        self.websocket = websocket
+        self.server_version = server_version
+        self.version = PROTOCOL_VERSION_RAW
+        self.frame_duration = 60
+        self.started_at = time.monotonic()
+        self.frames = 0
+        self.last_timestamp = None
+
+    def timestamp(self):
+        """会话开始以来的毫秒数"""
+        return int((time.monotonic() - self.started_at) * 1000)
+
+    async def handle_text(self, message):
+        data = json.loads(message)
+        msg_type = data.get("type")
+        if msg_type == "hello":
+            requested = data.get("version", PROTOCOL_VERSION_RAW)
+            self.version = min(requested, self.server_version)
+            self.frame_duration = data.get("audio_params", {}).get("frame_duration", 60)
+            self.started_at = time.monotonic()
+            print(f"hello: 客户端请求版本 {requested}，使用版本 {self.version}")
+            await self.websocket.send(json.dumps({
+                "type": "hello",
+                "version": self.version,
+                "transport": "websocket",
+                "audio_params": data.get("audio_params", {}),
+            }))
+        else:
+            print(f"收到消息: {data}")
+
+    async def handle_binary(self, message):
+        if self.version >= PROTOCOL_VERSION_FRAMED:
+            try:
+                frame_type, timestamp, payload = unpack_frame(message)
+            except ValueError as e:
+                print(f"无效的二进制帧: {e}")
+                return
+            if frame_type != FrameType.OPUS:
+                return
+            if self.last_timestamp is not None:
+                gap = timestamp - self.last_timestamp
+                if gap > self.frame_duration * 1.5:
+                    print(f"上行帧间隔 {gap} ms，可能有丢帧")
+            self.last_timestamp = timestamp
+            self.frames += 1
+            # 下行时间戳按帧时长递增，客户端据此换算序列号
+            reply = pack_frame(payload, self.frames * self.frame_duration)
+        else:
+            self.frames += 1
+            reply = message
+        await self.websocket.send(bytes(reply))
+
+
+async def handler(websocket, path=None, server_version=PROTOCOL_VERSION_FRAMED):
+    session = Session(websocket, server_version)
+    print("客户端已连接")
+    try:
+        async for message in websocket:
+            if isinstance(message, str):
+                await session.handle_text(message)
+            else:
+                await session.handle_binary(message)
+    except websockets.ConnectionClosed:
+        pass
+    print(f"客户端已断开，共回环 {session.frames} 帧音频")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="本地 WebSocket 测试服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--version", type=int, default=PROTOCOL_VERSION_FRAMED,
+                        choices=[PROTOCOL_VERSION_RAW, PROTOCOL_VERSION_FRAMED],
+                        help="服务器支持的最高二进制协议版本")
+    args = parser.parse_args()
+
+    async def serve(websocket, path=None):
+        await handler(websocket, path, args.version)
+
+    async with websockets.serve(serve, args.host, args.port):
+        print(f"测试服务器已启动: ws://{args.host}:{args.port}/ （协议版本 {args.version}）")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n测试服务器已停止")
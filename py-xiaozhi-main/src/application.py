@@ -1,5 +1,4 @@
 import asyncio
-import json
 import logging
 import threading
 import time
@@ -14,6 +13,7 @@ from src.constants.constants import (
     AbortReason, ListeningMode
 )
 from src.display import gui_display, cli_display
+from src.utils import json_codec
 from src.utils.config_manager import ConfigManager
 
 setup_opus()
@@ -56,12 +56,21 @@ class Application:
 
         # 状态变量
         self.device_state = DeviceState.IDLE
+        self._state_before_reconnect = DeviceState.IDLE  # 会话中断时的状态，恢复后回到该状态
         self.voice_detected = False
         self.keep_listening = False
         self.aborted = False
         self.current_text = ""
         self.current_emotion = "neutral"
 
+        # 收到的JSON消息按类型分发
+        self._json_handlers = {
+            "tts": self._handle_tts_message,
+            "stt": self._handle_stt_message,
+            "llm": self._handle_llm_message,
+            "iot": self._handle_iot_message,
+        }
+
         # 音频处理相关
         self.audio_codec = None  # 将在 _initialize_audio 中初始化
         self.is_tts_playing = False # 因为Display的播放状态只是GUI使用，不方便Music_player使用，所以加了这个标志位表示是TTS在说话
@@ -70,8 +79,6 @@ class Application:
         self.loop = asyncio.new_event_loop()
         self.loop_thread = None
         self.running = False
-        self.input_event_thread = None
-        self.output_event_thread = None
 
         # 任务队列和锁
         self.main_tasks = []
@@ -83,12 +90,10 @@ class Application:
         # 回调函数
         self.on_state_changed_callbacks = []
 
-        # 初始化事件对象
-        self.events = {
-            EventType.SCHEDULE_EVENT: threading.Event(),
-            EventType.AUDIO_INPUT_READY_EVENT: threading.Event(),
-            EventType.AUDIO_OUTPUT_READY_EVENT: threading.Event()
-        }
+        # 主循环只阻塞在一个条件变量上，事件到达时立即唤醒
+        self._wakeup = threading.Condition()
+        self._pending_events = set()
+        self._output_wakeup_at = None  # 抖动缓冲区预缓冲结束的时间点
 
         # 创建显示界面
         self.display = None
@@ -107,8 +112,15 @@ class Application:
         main_loop_thread.daemon = True
         main_loop_thread.start()
 
-        # 初始化并启动唤醒词检测
-        self._initialize_wake_word_detector()
+        # 初始化音频编解码器，唤醒词检测需要订阅它的麦克风输入
+        self._initialize_audio()
+
+        # 初始化并启动唤醒词检测，模型在后台加载，不阻塞启动
+        threading.Thread(
+            target=self._initialize_wake_word_detector,
+            name="WakeWordInit",
+            daemon=True
+        ).start()
 
         # 初始化通信协议
         self.set_protocol_type(protocol)
@@ -143,15 +155,20 @@ class Application:
         # 设置设备状态为待命
         self.set_device_state(DeviceState.IDLE)
 
-        # 初始化音频编解码器
-        self._initialize_audio()
-        
         # 设置联网协议回调（MQTT AND WEBSOCKET）
         self.protocol.on_network_error = self._on_network_error
         self.protocol.on_incoming_audio = self._on_incoming_audio
         self.protocol.on_incoming_json = self._on_incoming_json
         self.protocol.on_audio_channel_opened = self._on_audio_channel_opened
         self.protocol.on_audio_channel_closed = self._on_audio_channel_closed
+        self.protocol.reconnect.on_reconnecting = self._on_session_reconnecting
+        self.protocol.reconnect.on_resumed = self._on_session_resumed
+
+        # OTA信息在后台刷新，连接时直接使用已保存的信息
+        self.loop.create_task(self.config.refresh_mqtt_info_async())
+
+        # 空闲时预先建立控制连接，唤醒后可以更快开始对话
+        self.loop.create_task(self.protocol.prepare())
 
         logger.info("应用程序初始化完成")
 
@@ -160,6 +177,9 @@ class Application:
         try:
             from src.audio_codecs.audio_codec import AudioCodec
             self.audio_codec = AudioCodec()
+            self.audio_codec.on_input_ready = self._on_audio_input_ready
+            self.audio_codec.on_output_space = self._on_audio_output_space
+            self.audio_codec.encode_worker.on_encoded = self._send_encoded_audio
             logger.info("音频编解码器初始化成功")
 
             # 记录音量控制状态
@@ -181,7 +201,7 @@ class Application:
         if protocol_type == 'mqtt':
             self.protocol = MqttProtocol(self.loop)
         else:  # websocket
-            self.protocol = WebsocketProtocol()
+            self.protocol = WebsocketProtocol(self.loop)
 
     def set_display_type(self, mode: str):
         """初始化显示界面"""
@@ -219,20 +239,40 @@ class Application:
         self.running = True
 
         while self.running:
-            # 等待事件
-            for event_type, event in self.events.items():
-                if event.is_set():
-                    event.clear()
-
-                    if event_type == EventType.AUDIO_INPUT_READY_EVENT:
-                        self._handle_input_audio()
-                    elif event_type == EventType.AUDIO_OUTPUT_READY_EVENT:
-                        self._handle_output_audio()
-                    elif event_type == EventType.SCHEDULE_EVENT:
-                        self._process_scheduled_tasks()
-
-            # 短暂休眠以避免CPU占用过高
-            time.sleep(0.01)
+            # 阻塞等待事件，没有事件时不占用CPU
+            with self._wakeup:
+                while self.running and not self._pending_events:
+                    timeout = None
+                    if self._output_wakeup_at is not None:
+                        timeout = self._output_wakeup_at - time.monotonic()
+                        if timeout <= 0:
+                            self._output_wakeup_at = None
+                            self._pending_events.add(
+                                EventType.AUDIO_OUTPUT_READY_EVENT
+                            )
+                            break
+                    self._wakeup.wait(timeout)
+                pending = self._pending_events
+                self._pending_events = set()
+
+            if EventType.SCHEDULE_EVENT in pending:
+                self._process_scheduled_tasks()
+            if EventType.AUDIO_INPUT_READY_EVENT in pending:
+                self._handle_input_audio()
+            if EventType.AUDIO_OUTPUT_READY_EVENT in pending:
+                self._handle_output_audio()
+
+    def _set_event(self, event_type):
+        """标记事件并唤醒主循环（线程安全）"""
+        with self._wakeup:
+            self._pending_events.add(event_type)
+            self._wakeup.notify()
+
+    def _schedule_output_wakeup(self, delay):
+        """在指定时间后触发音频输出事件"""
+        with self._wakeup:
+            self._output_wakeup_at = time.monotonic() + delay
+            self._wakeup.notify()
 
     def _process_scheduled_tasks(self):
         """处理调度任务"""
@@ -250,21 +290,32 @@ class Application:
         """调度任务到主循环"""
         with self.mutex:
             self.main_tasks.append(callback)
-        self.events[EventType.SCHEDULE_EVENT].set()
+        self._set_event(EventType.SCHEDULE_EVENT)
 
     def _handle_input_audio(self):
         """处理音频输入"""
         if self.device_state != DeviceState.LISTENING:
             return
 
-        # 读取并发送音频数据
-        encoded_data = self.audio_codec.read_audio()
-        if (encoded_data and self.protocol and
-                self.protocol.is_audio_channel_opened()):
-            asyncio.run_coroutine_threadsafe(
-                self.protocol.send_audio(encoded_data),
-                self.loop
-            )
+        # 读取所有已就绪的音频帧，交给编码线程编码并发送
+        while True:
+            pcm_data = self.audio_codec.read_pcm()
+            if not pcm_data:
+                break
+            self.audio_codec.encode_worker.submit(pcm_data)
+
+    def _send_encoded_audio(self, encoded_data):
+        """发送编码后的音频数据（在编码线程中调用）"""
+        if self.device_state != DeviceState.LISTENING:
+            return
+        if self.protocol and self.protocol.is_audio_channel_opened():
+            # 交给协议的上行队列，网络慢时在队列中丢弃过时的帧
+            self.protocol.enqueue_audio(encoded_data)
+
+    def _on_audio_input_ready(self):
+        """回调模式下输入帧就绪（在 PortAudio 回调线程中调用）"""
+        if self.device_state == DeviceState.LISTENING:
+            self._set_event(EventType.AUDIO_INPUT_READY_EVENT)
 
     async def _send_text_tts(self, text):
         """将文本转换为语音并发送"""
@@ -298,7 +349,7 @@ class Application:
                 # 设置聊天消息
                 self.set_chat_message("user", text)
                 await self.protocol.send_text(
-                    json.dumps({"session_id": "", "type": "listen", "state": "stop"}))
+                    json_codec.dumps({"session_id": "", "type": "listen", "state": "stop"}))
                 await self.protocol.send_text(b'')
                 
                 return True
@@ -316,10 +367,38 @@ class Application:
         if self.device_state != DeviceState.SPEAKING:
             return
         self.is_tts_playing = True
+
+        # 确保输出流是活跃的
+        output_stream = self.audio_codec.output_stream
+        if output_stream and not output_stream.is_active():
+            try:
+                output_stream.start_stream()
+            except Exception as e:
+                logger.warning(f"启动输出流失败，尝试重新初始化: {e}")
+                self.audio_codec._reinitialize_output_stream()
+
         self.audio_codec.play_audio()
 
-    def _on_network_error(self):
+        # 一次最多处理一批数据，剩余数据继续排队处理；
+        # 抖动缓冲区还在预缓冲时，等到可以播放时再唤醒
+        delay = self.audio_codec.time_until_playable()
+        if delay is None:
+            return
+        if delay <= 0:
+            self._set_event(EventType.AUDIO_OUTPUT_READY_EVENT)
+        else:
+            self._schedule_output_wakeup(delay)
+
+    def _on_audio_output_space(self):
+        """回调模式下输出缓冲区有空间（在 PortAudio 回调线程中调用）"""
+        if (self.device_state == DeviceState.SPEAKING and
+                self.audio_codec.has_pending_audio()):
+            self._set_event(EventType.AUDIO_OUTPUT_READY_EVENT)
+
+    def _on_network_error(self, message=None):
         """网络错误回调"""
+        if message:
+            logger.error(f"网络错误: {message}")
         self.keep_listening = False
         self.set_device_state(DeviceState.IDLE)
         # 恢复唤醒词检测
@@ -337,33 +416,28 @@ class Application:
                     self.loop
                 )
 
-    def _on_incoming_audio(self, data):
-        """接收音频数据回调"""
+    def _on_incoming_audio(self, data, sequence=None):
+        """接收音频数据回调
+
+        参数:
+            data: Opus 编码数据
+            sequence: 包序列号，协议提供时用于抖动缓冲区排序和丢包恢复
+        """
         if self.device_state == DeviceState.SPEAKING:
-            self.audio_codec.write_audio(data)
-            self.events[EventType.AUDIO_OUTPUT_READY_EVENT].set()
+            self.audio_codec.write_audio(data, sequence)
+            self._set_event(EventType.AUDIO_OUTPUT_READY_EVENT)
 
-    def _on_incoming_json(self, json_data):
-        """接收JSON数据回调"""
+    def _on_incoming_json(self, data):
+        """接收JSON数据回调，data 为协议层已经解析好的字典"""
         try:
-            if not json_data:
+            if not data:
                 return
 
-            # 解析JSON数据
-            if isinstance(json_data, str):
-                data = json.loads(json_data)
-            else:
-                data = json_data
-            # 处理不同类型的消息
+            # 按消息类型分发
             msg_type = data.get("type", "")
-            if msg_type == "tts":
-                self._handle_tts_message(data)
-            elif msg_type == "stt":
-                self._handle_stt_message(data)
-            elif msg_type == "llm":
-                self._handle_llm_message(data)
-            elif msg_type == "iot":
-                self._handle_iot_message(data)
+            handler = self._json_handlers.get(msg_type)
+            if handler:
+                handler(data)
             else:
                 logger.warning(f"收到未知类型的消息: {msg_type}")
         except Exception as e:
@@ -405,22 +479,13 @@ class Application:
         if self.device_state == DeviceState.SPEAKING:
             # 给音频播放一个缓冲时间，确保所有音频都播放完毕
             def delayed_state_change():
-                # 等待音频队列清空
-                # 增加等待重试次数，确保音频可以完全播放完毕
-                max_wait_attempts = 30  # 增加等待尝试次数
-                wait_interval = 0.1  # 每次等待的时间间隔
-                attempts = 0
-
-                # 等待直到队列为空或超过最大尝试次数
-                while (not self.audio_codec.audio_decode_queue.empty() and 
-                       attempts < max_wait_attempts):
-                    time.sleep(wait_interval)
-                    attempts += 1
-
-                # 确保所有数据都被播放出来
-                # 再额外等待一点时间确保最后的数据被处理
-                if self.is_tts_playing:
-                    time.sleep(0.5)
+                # 等待播放完毕事件，超时时间按尚未播放的音频时长计算
+                timeout = self.audio_codec.pending_duration() + 1.0
+                if not self.audio_codec.wait_for_drain(timeout):
+                    logger.warning(
+                        f"等待音频播放完毕超时: "
+                        f"{self.audio_codec.get_playback_stats()}"
+                    )
 
                 # 设置TTS播放状态为False
                 self.is_tts_playing = False
@@ -456,14 +521,16 @@ class Application:
         logger.info("音频通道已打开")
         self.schedule(lambda: self._start_audio_streams())
 
-        # 发送物联网设备描述符
+        # 发送物联网设备描述符和当前状态
         from src.iot.thing_manager import ThingManager
         thing_manager = ThingManager.get_instance()
         asyncio.run_coroutine_threadsafe(
-            self.protocol.send_iot_descriptors(thing_manager.get_descriptors_json()),
+            self.protocol.send_iot_snapshot(
+                thing_manager.get_descriptors_json(),
+                thing_manager.get_states_json()
+            ),
             self.loop
         )
-        self._update_iot_states()
 
 
     def _start_audio_streams(self):
@@ -486,69 +553,10 @@ class Application:
                     # 只有在出错时才重新初始化
                     self.audio_codec._reinitialize_output_stream()
 
-            # 设置事件触发器
-            if self.input_event_thread is None or not self.input_event_thread.is_alive():
-                self.input_event_thread = threading.Thread(
-                    target=self._audio_input_event_trigger, daemon=True)
-                self.input_event_thread.start()
-                logger.info("已启动输入事件触发线程")
-
-            # 检查输出事件线程
-            if self.output_event_thread is None or not self.output_event_thread.is_alive():
-                self.output_event_thread = threading.Thread(
-                    target=self._audio_output_event_trigger, daemon=True)
-                self.output_event_thread.start()
-                logger.info("已启动输出事件触发线程")
-
             logger.info("音频流已启动")
         except Exception as e:
             logger.error(f"启动音频流失败: {e}")
 
-    def _audio_input_event_trigger(self):
-        """音频输入事件触发器"""
-        while self.running:
-            try:
-                # 只有在主动监听状态下才触发输入事件
-                if self.device_state == DeviceState.LISTENING and self.audio_codec.input_stream:
-                    self.events[EventType.AUDIO_INPUT_READY_EVENT].set()
-            except OSError as e:
-                logger.error(f"音频输入流错误: {e}")
-                # 不要退出循环，继续尝试
-                time.sleep(0.5)
-            except Exception as e:
-                logger.error(f"音频输入事件触发器错误: {e}")
-                time.sleep(0.5)
-            
-            # 确保触发频率足够高，即使帧长度较大
-            # 使用20ms作为最大触发间隔，确保即使帧长度为60ms也能有足够的采样率
-            sleep_time = min(20, AudioConfig.FRAME_DURATION) / 1000
-            time.sleep(sleep_time)  # 按帧时长触发，但确保最小触发频率
-
-    def _audio_output_event_trigger(self):
-        """音频输出事件触发器"""
-        while self.running:
-            try:
-                # 确保输出流是活跃的
-                if (self.device_state == DeviceState.SPEAKING and
-                    self.audio_codec and
-                    self.audio_codec.output_stream):
-
-                    # 如果输出流不活跃，尝试重新激活
-                    if not self.audio_codec.output_stream.is_active():
-                        try:
-                            self.audio_codec.output_stream.start_stream()
-                        except Exception as e:
-                            logger.warning(f"启动输出流失败，尝试重新初始化: {e}")
-                            self.audio_codec._reinitialize_output_stream()
-
-                    # 当队列中有数据时才触发事件
-                    if not self.audio_codec.audio_decode_queue.empty():
-                        self.events[EventType.AUDIO_OUTPUT_READY_EVENT].set()
-            except Exception as e:
-                logger.error(f"音频输出事件触发器错误: {e}")
-
-            time.sleep(0.02)  # 稍微延长检查间隔
-
     async def _on_audio_channel_closed(self):
         """音频通道关闭回调"""
         logger.info("音频通道已关闭")
@@ -560,19 +568,25 @@ class Application:
         if self.wake_word_detector:
             if not self.wake_word_detector.is_running():
                 logger.info("在空闲状态下启动唤醒词检测")
-                # 获取最新的共享流
-                if hasattr(self, 'audio_codec') and self.audio_codec:
-                    shared_stream = self.audio_codec.get_shared_input_stream()
-                    if shared_stream:
-                        self.wake_word_detector.start(shared_stream)
-                    else:
-                        self.wake_word_detector.start()
-                else:
-                    self.wake_word_detector.start()
+                self._start_wake_word_detector()
             elif self.wake_word_detector.paused:
                 logger.info("在空闲状态下恢复唤醒词检测")
                 self.wake_word_detector.resume()
 
+    async def _on_session_reconnecting(self, reason):
+        """音频会话中断，正在重连"""
+        self._state_before_reconnect = self.device_state
+        self.set_device_state(DeviceState.CONNECTING)
+
+    async def _on_session_resumed(self):
+        """音频会话已恢复，回到中断前的对话状态"""
+        if self.keep_listening or self._state_before_reconnect == DeviceState.LISTENING:
+            await self.protocol.send_start_listening(ListeningMode.AUTO_STOP)
+            self.set_device_state(DeviceState.LISTENING)
+        else:
+            # 中断前的语音播放已无法继续
+            self.set_device_state(DeviceState.IDLE)
+
     def set_device_state(self, state):
         """设置设备状态"""
         if self.device_state == state:
@@ -604,6 +618,8 @@ class Application:
             if self.audio_codec:
                 if self.audio_codec.is_input_paused():
                     self.audio_codec.resume_input()
+                # 丢弃聆听开始前缓存的旧音频
+                self.audio_codec.discard_pending_input()
         elif state == DeviceState.SPEAKING:
             self.display.update_status("说话中...")
             if self.wake_word_detector and hasattr(self.wake_word_detector, 'paused') and self.wake_word_detector.paused:
@@ -905,6 +921,10 @@ class Application:
         logger.info("正在关闭应用程序...")
         self.running = False
 
+        # 唤醒主循环使其退出
+        with self._wakeup:
+            self._wakeup.notify_all()
+
         # 关闭音频编解码器
         if self.audio_codec:
             self.audio_codec.close()
@@ -912,7 +932,7 @@ class Application:
         # 关闭协议
         if self.protocol:
             asyncio.run_coroutine_threadsafe(
-                self.protocol.close_audio_channel(),
+                self.protocol.disconnect(),
                 self.loop
             )
 
@@ -988,6 +1008,11 @@ class Application:
 
         try:
             from src.audio_processing.wake_word_detect import WakeWordDetector
+            from src.audio_processing.wake_word_process import WakeWordProcess
+
+            out_of_process = self.config.get_config(
+                "WAKE_WORD_OPTIONS.OUT_OF_PROCESS", False
+            )
 
             # 获取模型路径配置
             model_path_config = self.config.get_config(
@@ -1017,8 +1042,16 @@ class Application:
                 self.wake_word_detector = None
                 return
 
-            # 创建检测器实例
-            self.wake_word_detector = WakeWordDetector()
+            if out_of_process:
+                # 模型由子进程加载，主进程只负责转发音频
+                self.wake_word_detector = WakeWordProcess()
+            else:
+                # 后台预热共享模型，检测器创建时直接复用
+                from src.audio_processing.model_registry import ModelRegistry
+                ModelRegistry.get_instance().warm_up(str(model_path))
+
+                # 创建检测器实例（等待模型加载完成）
+                self.wake_word_detector = WakeWordDetector()
 
             # 如果唤醒词检测器被禁用（内部故障），则更新配置
             if not getattr(self.wake_word_detector, 'enabled', True):
@@ -1030,10 +1063,16 @@ class Application:
             # 注册唤醒词检测回调和错误处理
             self.wake_word_detector.on_detected(self._on_wake_word_detected)
             
-            # 使用lambda捕获self，而不是单独定义函数
-            self.wake_word_detector.on_error = lambda error: (
-                self._handle_wake_word_error(error)
-            )
+            if out_of_process:
+                # 子进程崩溃由 WakeWordProcess 自行重启，这里只会收到重启失败的错误
+                self.wake_word_detector.on_error = lambda error: (
+                    logger.error(f"唤醒词子进程无法恢复: {error}")
+                )
+            else:
+                # 使用lambda捕获self，而不是单独定义函数
+                self.wake_word_detector.on_error = lambda error: (
+                    self._handle_wake_word_error(error)
+                )
             
             logger.info("唤醒词检测器初始化成功")
 
@@ -1062,15 +1101,12 @@ class Application:
         if not self.wake_word_detector:
             return
         
-        # 确保音频编解码器已初始化
-        if hasattr(self, 'audio_codec') and self.audio_codec:
-            shared_stream = self.audio_codec.get_shared_input_stream()
-            if shared_stream:
-                logger.info("使用共享的音频输入流启动唤醒词检测器")
-                self.wake_word_detector.start(shared_stream)
-            else:
-                logger.warning("无法获取共享输入流，唤醒词检测器将使用独立音频流")
-                self.wake_word_detector.start()
+        # 优先订阅音频编解码器的麦克风输入，与上行音频共用同一个采集源
+        if self.audio_codec:
+            logger.info("使用共享的麦克风订阅启动唤醒词检测器")
+            self.wake_word_detector.start(
+                self.audio_codec.subscribe_input("wake_word")
+            )
         else:
             logger.warning("音频编解码器尚未初始化，唤醒词检测器将使用独立音频流")
             self.wake_word_detector.start()
@@ -1135,19 +1171,8 @@ class Application:
                 self.wake_word_detector.stop()
                 time.sleep(0.5)  # 给予一些时间让资源释放
 
-            # 确保使用最新的共享音频输入流
-            if hasattr(self, 'audio_codec') and self.audio_codec:
-                shared_stream = self.audio_codec.get_shared_input_stream()
-                if shared_stream:
-                    self.wake_word_detector.start(shared_stream)
-                    logger.info("使用共享的音频流重新启动唤醒词检测器")
-                else:
-                    # 如果无法获取共享流，尝试让检测器创建自己的流
-                    self.wake_word_detector.start()
-                    logger.info("使用独立的音频流重新启动唤醒词检测器")
-            else:
-                self.wake_word_detector.start()
-                logger.info("使用独立的音频流重新启动唤醒词检测器")
+            # 重新订阅麦克风输入，旧的订阅已在 stop() 中关闭
+            self._start_wake_word_detector()
 
             logger.info("唤醒词检测器重新启动成功")
         except Exception as e:
@@ -1207,10 +1232,3 @@ class Application:
         )
         logger.info("物联网设备状态已更新")
 
-    def _update_wake_word_detector_stream(self):
-        """更新唤醒词检测器的音频流"""
-        if self.wake_word_detector and self.audio_codec:
-            shared_stream = self.audio_codec.get_shared_input_stream()
-            if shared_stream and self.wake_word_detector.is_running():
-                self.wake_word_detector.update_stream(shared_stream)
-                logger.info("已更新唤醒词检测器的音频流")
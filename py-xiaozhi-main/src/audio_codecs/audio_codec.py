@@ -1,9 +1,15 @@
 import logging
-import queue
 import numpy as np
 import pyaudio
 import opuslib
 from src.constants.constants import AudioConfig
+from src.audio_codecs.audio_input_hub import AudioInputHub, BackpressurePolicy
+from src.audio_codecs.audio_resampler import AudioFormatConverter
+from src.audio_codecs.downlink_queue import DownlinkQueue, OverflowPolicy
+from src.audio_codecs.frame_ring_buffer import FrameRingBuffer
+from src.audio_codecs.jitter_buffer import JitterBuffer
+from src.audio_codecs.opus_encode_worker import OpusEncodeWorker
+from src.utils.config_manager import ConfigManager
 import time
 import sys
 import threading
@@ -11,6 +17,69 @@ import threading
 logger = logging.getLogger("AudioCodec")
 
 
+def _is_format_supported(audio, device_index, is_input, rate, channels):
+    """检查设备是否支持指定的16位采样格式"""
+    try:
+        if is_input:
+            return audio.is_format_supported(
+                rate,
+                input_device=device_index,
+                input_channels=channels,
+                input_format=pyaudio.paInt16
+            )
+        return audio.is_format_supported(
+            rate,
+            output_device=device_index,
+            output_channels=channels,
+            output_format=pyaudio.paInt16
+        )
+    except ValueError:
+        return False
+
+
+def negotiate_stream_format(audio, device_index, is_input, rate, channels):
+    """
+    选择打开设备时使用的采样率和声道数
+
+    优先使用调用方需要的格式，设备不支持时退回设备的原生采样率和声道数，
+    两者之间的差异由 AudioFormatConverter 转换。
+
+    参数:
+        audio: PyAudio 实例
+        device_index: 设备索引
+        is_input: 是否为输入设备
+        rate: 期望的采样率
+        channels: 期望的声道数
+
+    返回:
+        tuple: (采样率, 声道数)
+    """
+    info = audio.get_device_info_by_index(device_index)
+    native_rate = int(info.get("defaultSampleRate") or rate)
+    max_channels = int(
+        info.get("maxInputChannels" if is_input else "maxOutputChannels")
+        or channels
+    )
+    native_channels = max(1, min(2, max_channels))
+
+    candidates = (
+        (rate, channels),
+        (native_rate, channels),
+        (rate, native_channels),
+        (native_rate, native_channels),
+    )
+    for candidate_rate, candidate_channels in candidates:
+        if _is_format_supported(audio, device_index, is_input,
+                                candidate_rate, candidate_channels):
+            return candidate_rate, candidate_channels
+
+    logger.warning(
+        f"设备 {info.get('name')} 未报告支持的格式，"
+        f"尝试使用原生格式 {native_rate}Hz/{native_channels}声道"
+    )
+    return native_rate, native_channels
+
+
 class AudioCodec:
     """音频编解码器类，处理音频的录制和播放"""
 
@@ -21,11 +90,78 @@ class AudioCodec:
         self.output_stream = None
         self.opus_encoder = None
         self.opus_decoder = None
-        self.audio_decode_queue = queue.Queue()
+        self.encode_worker = None  # 上行音频编码线程
         self._is_closing = False  # 添加关闭状态标志
         self._is_input_paused = False  # 添加输入流暂停状态标志
         self._input_paused_lock = threading.Lock()  # 添加线程锁
         self._stream_lock = threading.Lock()  # 添加流操作锁
+        self.on_input_ready = None  # 回调模式下有新的完整输入帧时调用
+        self.on_output_space = None  # 回调模式下输出缓冲区腾出空间时调用
+
+        # 输入模式: callback 由 PortAudio 回调采集，blocking 由独立线程阻塞读取
+        config = ConfigManager.get_instance()
+        self.input_mode = config.get_config("AUDIO_OPTIONS.INPUT_MODE", "callback")
+        self.input_overflow_count = 0  # PortAudio 报告的输入溢出次数
+        self._reported_overruns = 0
+        self._reported_overflows = 0
+        self._capture_thread = None
+        self._capture_running = False
+        # 麦克风按设备支持的格式打开，采集后再转换为协议要求的格式
+        self.input_device_rate = AudioConfig.INPUT_SAMPLE_RATE
+        self.input_device_channels = AudioConfig.CHANNELS
+        self._input_device_frame_size = AudioConfig.INPUT_FRAME_SIZE
+        self._input_converter = None
+
+        # 麦克风只采集一次，由分发中心把相同的帧分发给编解码器、唤醒词、VAD等订阅者
+        self.input_hub = AudioInputHub()
+        # 回调每次给出的样本数不固定，先在环形缓冲区中拼成固定大小的帧
+        self.input_buffer = FrameRingBuffer(
+            AudioConfig.INPUT_FRAME_SIZE, capacity_frames=4
+        )
+        self._input_clear_pending = False  # 由采集端在下一次写入前清空环形缓冲区
+        self._reported_ring_overruns = 0
+        self._uplink = self.input_hub.subscribe(
+            "codec",
+            max_frames=config.get_config("AUDIO_OPTIONS.INPUT_BUFFER_FRAMES", 50),
+            on_available=self._on_uplink_frame
+        )
+
+        # 输出模式: callback 由 PortAudio 回调从环形缓冲区取数据，blocking 为阻塞写入
+        self.output_mode = config.get_config("AUDIO_OPTIONS.OUTPUT_MODE", "callback")
+        self._output_buffer_frames = config.get_config(
+            "AUDIO_OPTIONS.OUTPUT_BUFFER_FRAMES", 4
+        )
+        self.output_buffer = None  # 回调模式的环形缓冲区，打开输出流时按设备格式创建
+        self.output_underrun_count = 0  # 播放过程中输出缓冲区数据不足的次数
+        self._reported_underruns = 0
+        self._output_scratch = None  # 输出回调使用的预分配数组
+        self._output_clear_pending = False
+        # 扬声器同样按设备支持的格式打开，解码后再转换
+        self.output_device_rate = AudioConfig.OUTPUT_SAMPLE_RATE
+        self.output_device_channels = AudioConfig.CHANNELS
+        self._output_converter = None
+        # 一个解码帧转换为设备格式后最多占用的样本数
+        self._output_frame_samples = AudioConfig.OUTPUT_FRAME_SIZE * AudioConfig.CHANNELS
+
+        # 下行抖动缓冲区，只在播放线程中访问
+        self.jitter_buffer = JitterBuffer(
+            AudioConfig.FRAME_DURATION,
+            min_delay_ms=config.get_config("AUDIO_OPTIONS.JITTER_MIN_DELAY_MS", 60),
+            max_delay_ms=config.get_config("AUDIO_OPTIONS.JITTER_MAX_DELAY_MS", 400)
+        )
+        self._jitter_reset_pending = False
+
+        # 有界的下行队列，网络线程写入，播放线程转入抖动缓冲区
+        self.downlink_queue = DownlinkQueue(
+            max_packets=config.get_config("AUDIO_OPTIONS.DOWNLINK_MAX_MS", 10000)
+            // AudioConfig.FRAME_DURATION,
+            policy=config.get_config(
+                "AUDIO_OPTIONS.DOWNLINK_OVERFLOW_POLICY", OverflowPolicy.DROP_OLDEST
+            )
+        )
+        # 下行音频全部播放完毕时置位，写入新数据时清除
+        self.playback_drained = threading.Event()
+        self.playback_drained.set()
 
         self._initialize_audio()
 
@@ -42,25 +178,13 @@ class AudioCodec:
                 is_input=False
             )
 
-            # 初始化音频输入流 - 使用16kHz采样率
-            self.input_stream = self.audio.open(
-                format=pyaudio.paInt16,
-                channels=AudioConfig.CHANNELS,
-                rate=AudioConfig.INPUT_SAMPLE_RATE,  # 使用16kHz
-                input=True,
-                input_device_index=input_device_index,
-                frames_per_buffer=AudioConfig.INPUT_FRAME_SIZE
-            )
+            # 初始化音频输入流 - 按设备格式采集，转换为16kHz
+            self.input_stream = self._open_input_stream(input_device_index)
+            if self.input_mode != "callback":
+                self._start_capture_thread()
 
-            # 初始化音频输出流 - 使用24kHz采样率
-            self.output_stream = self.audio.open(
-                format=pyaudio.paInt16,
-                channels=AudioConfig.CHANNELS,
-                rate=AudioConfig.OUTPUT_SAMPLE_RATE,  # 使用24kHz
-                output=True,
-                output_device_index=output_device_index,
-                frames_per_buffer=AudioConfig.OUTPUT_FRAME_SIZE
-            )
+            # 初始化音频输出流 - 24kHz解码结果转换为设备格式播放
+            self.output_stream = self._open_output_stream(output_device_index)
 
             # 初始化Opus编码器 - 使用16kHz（与输入匹配）
             self.opus_encoder = opuslib.Encoder(
@@ -69,6 +193,13 @@ class AudioCodec:
                 application=AudioConfig.OPUS_APPLICATION
             )
 
+            # 编码放到独立线程，采集与编码、发送可以并行
+            self.encode_worker = OpusEncodeWorker(
+                self.opus_encoder,
+                AudioConfig.INPUT_FRAME_SIZE
+            )
+            self.encode_worker.start()
+
             # 初始化Opus解码器 - 使用24kHz（与输出匹配）
             self.opus_decoder = opuslib.Decoder(
                 fs=AudioConfig.OUTPUT_SAMPLE_RATE,
@@ -80,6 +211,190 @@ class AudioCodec:
             logger.error(f"初始化音频设备失败: {e}")
             raise
 
+    def _open_input_stream(self, input_device_index):
+        """按照输入模式打开音频输入流"""
+        stream_callback = None
+        if self.input_mode == "callback":
+            stream_callback = self._input_callback
+
+        rate, channels = negotiate_stream_format(
+            self.audio, input_device_index, True,
+            AudioConfig.INPUT_SAMPLE_RATE, AudioConfig.CHANNELS
+        )
+        self.input_device_rate = rate
+        self.input_device_channels = channels
+        self._input_device_frame_size = int(rate * AudioConfig.FRAME_DURATION / 1000)
+        self._input_converter = AudioFormatConverter(
+            rate, AudioConfig.INPUT_SAMPLE_RATE,
+            channels, AudioConfig.CHANNELS
+        )
+        if not self._input_converter.passthrough:
+            logger.info(
+                f"麦克风以 {rate}Hz/{channels}声道 打开，"
+                f"采集后转换为 {AudioConfig.INPUT_SAMPLE_RATE}Hz"
+            )
+
+        return self.audio.open(
+            format=pyaudio.paInt16,
+            channels=channels,
+            rate=rate,
+            input=True,
+            input_device_index=input_device_index,
+            frames_per_buffer=self._input_device_frame_size,
+            stream_callback=stream_callback
+        )
+
+    def _input_callback(self, in_data, frame_count, time_info, status_flags):
+        """PortAudio 输入回调，拼成完整的帧后分发给所有订阅者"""
+        if status_flags & pyaudio.paInputOverflow:
+            self.input_overflow_count += 1
+
+        if in_data:
+            self._publish_input(in_data)
+
+        return None, pyaudio.paContinue
+
+    def _publish_input(self, data):
+        """把设备格式的数据转换后拼成完整的帧，分发给所有订阅者"""
+        if self._input_clear_pending:
+            self._input_clear_pending = False
+            self.input_buffer.clear()
+        self.input_buffer.write(self._input_converter.process(data))
+        while True:
+            frame = self.input_buffer.pop_frame()
+            if frame is None:
+                break
+            self.input_hub.publish(frame)
+
+    def _start_capture_thread(self):
+        """阻塞输入模式下启动采集线程"""
+        if self._capture_thread and self._capture_thread.is_alive():
+            return
+        self._capture_running = True
+        self._capture_thread = threading.Thread(
+            target=self._capture_loop,
+            name="AudioCapture",
+            daemon=True
+        )
+        self._capture_thread.start()
+
+    def _capture_loop(self):
+        """阻塞读取麦克风数据并分发，读取在 PortAudio 内部等待，不会空转"""
+        while self._capture_running:
+            stream = self.input_stream
+            try:
+                if not stream or not stream.is_active():
+                    time.sleep(0.1)
+                    continue
+                data = stream.read(
+                    self._input_device_frame_size,
+                    exception_on_overflow=False
+                )
+            except Exception as e:
+                if self._capture_running and not self._is_closing:
+                    logger.warning(f"采集音频数据时出错: {e}")
+                time.sleep(0.1)
+                continue
+
+            if data:
+                self._publish_input(data)
+
+    def _on_uplink_frame(self):
+        """上行订阅者有新帧时通知应用程序"""
+        if self.on_input_ready and not self._is_input_paused:
+            self.on_input_ready()
+
+    def _open_output_stream(self, output_device_index):
+        """按照输出模式打开音频输出流"""
+        rate, channels = negotiate_stream_format(
+            self.audio, output_device_index, False,
+            AudioConfig.OUTPUT_SAMPLE_RATE, AudioConfig.CHANNELS
+        )
+        self.output_device_rate = rate
+        self.output_device_channels = channels
+        self._output_converter = AudioFormatConverter(
+            AudioConfig.OUTPUT_SAMPLE_RATE, rate,
+            AudioConfig.CHANNELS, channels
+        )
+        if not self._output_converter.passthrough:
+            logger.info(
+                f"扬声器以 {rate}Hz/{channels}声道 打开，"
+                f"解码后从 {AudioConfig.OUTPUT_SAMPLE_RATE}Hz 转换"
+            )
+        device_frame_size = int(rate * AudioConfig.FRAME_DURATION / 1000)
+        # 重采样每次输出的帧数可能比标称值多一帧
+        self._output_frame_samples = (device_frame_size + 1) * channels
+
+        stream_callback = None
+        if self.output_mode == "callback":
+            stream_callback = self._output_callback
+            self.output_buffer = FrameRingBuffer(
+                self._output_frame_samples,
+                capacity_frames=self._output_buffer_frames
+            )
+            self._output_scratch = np.zeros(
+                device_frame_size * channels, dtype=np.int16
+            )
+            self._output_clear_pending = False
+
+        return self.audio.open(
+            format=pyaudio.paInt16,
+            channels=channels,
+            rate=rate,
+            output=True,
+            output_device_index=output_device_index,
+            frames_per_buffer=device_frame_size,
+            stream_callback=stream_callback
+        )
+
+    def _output_callback(self, in_data, frame_count, time_info, status_flags):
+        """PortAudio 输出回调，从环形缓冲区取数据，不足部分补静音"""
+        if self._output_clear_pending:
+            self._output_clear_pending = False
+            self.output_buffer.clear()
+
+        count = frame_count * self.output_device_channels
+        if len(self._output_scratch) < count:
+            self._output_scratch = np.zeros(count, dtype=np.int16)
+        out = self._output_scratch[:count]
+
+        had_data = self.output_buffer.available() > 0
+        read = self.output_buffer.read_into(out)
+        if read < count:
+            out[read:] = 0
+            if had_data:
+                self.output_underrun_count += 1
+            self._check_drained()
+
+        if self.on_output_space and self.output_buffer.free_space() >= self._output_frame_samples:
+            self.on_output_space()
+
+        return out.tobytes(), pyaudio.paContinue
+
+    def _report_input_overruns(self):
+        """上报上行队列、拼帧环形缓冲区和 PortAudio 的输入溢出"""
+        overruns = self._uplink.dropped_count
+        if overruns != self._reported_overruns:
+            logger.warning(
+                f"上行音频队列溢出，丢弃 {overruns - self._reported_overruns} 帧"
+            )
+            self._reported_overruns = overruns
+
+        ring_overruns = self.input_buffer.overrun_count
+        if ring_overruns != self._reported_ring_overruns:
+            logger.warning(
+                f"输入环形缓冲区溢出 {ring_overruns - self._reported_ring_overruns} 次，"
+                f"累计丢弃 {self.input_buffer.dropped_samples} 个样本"
+            )
+            self._reported_ring_overruns = ring_overruns
+
+        overflows = self.input_overflow_count
+        if overflows != self._reported_overflows:
+            logger.warning(
+                f"PortAudio 报告输入溢出 {overflows - self._reported_overflows} 次"
+            )
+            self._reported_overflows = overflows
+
     def _get_default_or_first_available_device(self, is_input=True):
         """获取默认设备或第一个可用的输入/输出设备"""
         try:
@@ -119,6 +434,7 @@ class AudioCodec:
         """恢复输入流"""
         with self._input_paused_lock:
             self._is_input_paused = False
+        self.discard_pending_input()
         logger.info("音频输入已恢复")
 
     def is_input_paused(self):
@@ -126,117 +442,191 @@ class AudioCodec:
         with self._input_paused_lock:
             return self._is_input_paused
 
+    def discard_pending_input(self):
+        """丢弃上行队列中尚未读取的输入数据，开始新一轮聆听前调用"""
+        self._uplink.clear()
+        # 非聆听期间的溢出属于预期行为，不再上报
+        self._reported_overruns = self._uplink.dropped_count
+        self._reported_ring_overruns = self.input_buffer.overrun_count
+        self._reported_overflows = self.input_overflow_count
+
+    def subscribe_input(self, name, max_frames=50,
+                        policy=BackpressurePolicy.DROP_OLDEST, on_available=None):
+        """
+        订阅麦克风音频，供唤醒词、VAD 等组件使用
+
+        返回:
+            AudioSubscription: 订阅对象，不再使用时调用 close()
+        """
+        return self.input_hub.subscribe(
+            name, max_frames=max_frames, policy=policy, on_available=on_available
+        )
+
     def read_audio(self):
         """读取音频输入数据并编码"""
+        data = self.read_pcm()
+        if data is None:
+            return None
+        return self.encode_pcm(data)
+
+    def read_pcm(self):
+        """读取一帧原始 PCM 输入数据（不编码，不会阻塞）"""
         if self.is_input_paused():
             return None
-        
+
         try:
-            with self._stream_lock:
-                if not self.input_stream or not self.input_stream.is_active():
-                    try:
-                        if self.input_stream:
-                            try:
-                                self.input_stream.start_stream()
-                                logger.info("重新启动了音频输入流")
-                            except Exception as e:
-                                logger.warning(f"无法重新启动音频输入流: {e}")
-                                self._reinitialize_input_stream()
-                        else:
-                            self._reinitialize_input_stream()
-                    except Exception as e:
-                        logger.error(f"无法初始化音频输入流: {e}")
-                        return None
-
-                # 检查是否有数据可读
-                available = self.input_stream.get_read_available()
-                if available <= 0:
-                    return None
-
-                # 如果缓冲区累积了太多数据，清空一部分以避免延迟
-                # 降低阈值，以避免在大帧长度下清除太多数据
-                if available > AudioConfig.INPUT_FRAME_SIZE * 2:
-                    # 降低清除量，保留更多最近的数据
-                    to_skip = available - (AudioConfig.INPUT_FRAME_SIZE * 1.5)
-                    if to_skip > 0:
-                        self.input_stream.read(
-                            int(to_skip),
-                            exception_on_overflow=False
-                        )
-                
-                # 读取音频数据
-                try:
-                    data = self.input_stream.read(
-                        AudioConfig.INPUT_FRAME_SIZE,
-                        exception_on_overflow=False
-                    )
-                except OSError as e:
-                    if "Input overflowed" in str(e):
-                        logger.warning("输入缓冲区溢出，尝试恢复")
-                        self._reinitialize_input_stream()
-                    else:
-                        logger.error(f"读取音频数据时出错: {e}")
-                    return None
-                
-                if not data:
-                    return None
-
-                # 检查音频数据是否有效
-                if len(data) != AudioConfig.INPUT_FRAME_SIZE * 2:  # 16位采样，每个采样2字节
-                    logger.warning(
-                        f"音频数据大小异常: {len(data)} bytes, "
-                        f"预期: {AudioConfig.INPUT_FRAME_SIZE * 2} bytes"
-                    )
-                    return None
-                
-                # 编码音频数据
-                try:
-                    return self.opus_encoder.encode(
-                        data,
-                        AudioConfig.INPUT_FRAME_SIZE
-                    )
-                except Exception as e:
-                    logger.error(f"编码音频数据时出错: {e}")
-                    return None
-            
+            if not self.input_stream or not self.input_stream.is_active():
+                with self._stream_lock:
+                    self._ensure_input_stream_active()
+
+            self._report_input_overruns()
+            return self._uplink.read_nowait()
+
         except Exception as e:
             logger.error(f"读取音频输入时出错: {e}")
             return None
 
-    def write_audio(self, opus_data):
-        """将编码的音频数据添加到播放队列"""
-        self.audio_decode_queue.put(opus_data)
+    def encode_pcm(self, data):
+        """在调用线程中同步编码一帧 PCM 数据"""
+        try:
+            return self.opus_encoder.encode(
+                data,
+                AudioConfig.INPUT_FRAME_SIZE
+            )
+        except Exception as e:
+            logger.error(f"编码音频数据时出错: {e}")
+            return None
+
+    def _ensure_input_stream_active(self):
+        """确保输入流处于活跃状态（调用方需持有流锁）"""
+        if self.input_stream and self.input_stream.is_active():
+            return
+        try:
+            if self.input_stream:
+                try:
+                    self.input_stream.start_stream()
+                    logger.info("重新启动了音频输入流")
+                except Exception as e:
+                    logger.warning(f"无法重新启动音频输入流: {e}")
+                    self._reinitialize_input_stream()
+            else:
+                self._reinitialize_input_stream()
+        except Exception as e:
+            logger.error(f"无法初始化音频输入流: {e}")
+
+    def write_audio(self, opus_data, sequence=None):
+        """将编码的音频数据添加到播放队列
+
+        参数:
+            opus_data: Opus 编码数据
+            sequence: 包序列号，协议不提供时为 None
+        """
+        self.downlink_queue.put(opus_data, sequence)
+        self.playback_drained.clear()
+
+    def _fill_jitter_buffer(self):
+        """把网络线程写入的数据转入抖动缓冲区（在播放线程中调用）"""
+        if self._jitter_reset_pending:
+            self._jitter_reset_pending = False
+            self.jitter_buffer.reset()
+            self._output_converter.reset()
+
+        # 抖动缓冲区只保留最大延迟以内的包，其余的积压留在有界的下行队列中
+        for _ in range(self.jitter_buffer.free_slots()):
+            packet = self.downlink_queue.get_nowait()
+            if packet is None:
+                break
+            self.jitter_buffer.put(*packet)
+
+    def time_until_playable(self):
+        """
+        距离下一次需要调用 play_audio 还需等待的时间（秒）
+
+        返回:
+            float: 需要立即调用时为 0
+            None: 暂时不需要调用（没有待播放的数据，或输出缓冲区已满，
+                回调腾出空间后会通过 on_output_space 通知）
+        """
+        if (self.output_buffer is not None and
+                self.output_buffer.free_space() < self._output_frame_samples):
+            return None
+        if len(self.downlink_queue) and self.jitter_buffer.free_slots():
+            return 0.0
+        if self._jitter_reset_pending:
+            return None
+        return self.jitter_buffer.time_until_ready()
 
     def play_audio(self):
         """处理并播放队列中的音频数据"""
+        if self.output_mode == "callback":
+            self._play_audio_to_buffer()
+        else:
+            self._play_audio_blocking()
+
+    def _play_audio_to_buffer(self):
+        """解码数据并写入输出环形缓冲区，由输出回调负责播放，不会阻塞"""
+        try:
+            self._fill_jitter_buffer()
+            self._report_output_underruns()
+
+            # 只解码缓冲区能容纳的数据，其余留在抖动缓冲区中
+            while self.output_buffer.free_space() >= self._output_frame_samples:
+                packet = self.jitter_buffer.pop()
+                if packet is None:
+                    break
+                opus_data, decode_fec = packet
+                try:
+                    pcm_data = self.opus_decoder.decode(
+                        opus_data,
+                        AudioConfig.OUTPUT_FRAME_SIZE,
+                        decode_fec=decode_fec
+                    )
+                except Exception as e:
+                    logger.error(f"解码音频数据时出错: {e}")
+                    continue
+                # 解码结果转换为设备格式后直接写入环形缓冲区
+                self.output_buffer.write(self._output_converter.process(pcm_data))
+        except Exception as e:
+            logger.error(f"播放音频时出错: {e}")
+
+    def _report_output_underruns(self):
+        """上报输出回调的数据不足"""
+        underruns = self.output_underrun_count
+        if underruns != self._reported_underruns:
+            logger.debug(
+                f"输出缓冲区数据不足 {underruns - self._reported_underruns} 次"
+            )
+            self._reported_underruns = underruns
+
+    def _play_audio_blocking(self):
+        """解码数据并阻塞写入输出流"""
         try:
-            if self.audio_decode_queue.empty():
-                return None
+            self._fill_jitter_buffer()
 
             # 批量处理多个音频包以减少处理延迟
-            batch_size = min(10, self.audio_decode_queue.qsize())
             buffer = bytearray()
-            
-            # 从队列中获取数据并解码
-            for _ in range(batch_size):
+
+            # 从抖动缓冲区中按序取包并解码，缺失的包使用 FEC 或 PLC 补齐
+            for _ in range(10):
+                packet = self.jitter_buffer.pop()
+                if packet is None:
+                    break
+                opus_data, decode_fec = packet
                 try:
-                    opus_data = self.audio_decode_queue.get_nowait()
                     # 解码为24kHz的PCM数据
                     pcm_data = self.opus_decoder.decode(
-                        opus_data, 
+                        opus_data,
                         AudioConfig.OUTPUT_FRAME_SIZE,
-                        decode_fec=False
+                        decode_fec=decode_fec
                     )
                     buffer.extend(pcm_data)
-                except queue.Empty:
-                    break
                 except Exception as e:
                     logger.error(f"解码音频数据时出错: {e}")
 
             # 只有在有数据时才处理和播放
             if len(buffer) > 0:
-                # 转换为numpy数组
-                pcm_array = np.frombuffer(buffer, dtype=np.int16)
+                # 转换为设备的采样率和声道数
+                pcm_array = self._output_converter.process(bytes(buffer))
                 
                 # 使用锁保护输出流操作
                 with self._stream_lock:
@@ -258,37 +648,94 @@ class AudioCodec:
                                 self.output_stream.write(pcm_array.tobytes())
                             except Exception:
                                 logger.error("重新初始化后播放音频时出错")
-                                
+
+            self._check_drained()
         except Exception:
             logger.error("播放音频时出错")
             self._reinitialize_output_stream()
 
     def has_pending_audio(self):
         """检查是否还有待播放的音频数据"""
-        return not self.audio_decode_queue.empty()
+        if len(self.downlink_queue) > 0:
+            return True
+        if not self._jitter_reset_pending and len(self.jitter_buffer) > 0:
+            return True
+        return (self.output_buffer is not None and
+                not self._output_clear_pending and
+                self.output_buffer.available() > 0)
+
+    def pending_duration(self):
+        """尚未播放的音频时长（秒）"""
+        duration = (
+            (len(self.downlink_queue) + len(self.jitter_buffer))
+            * AudioConfig.FRAME_DURATION / 1000
+        )
+        if self.output_buffer is not None:
+            duration += self.output_buffer.available() / (
+                self.output_device_rate * self.output_device_channels
+            )
+        return duration
+
+    def _check_drained(self):
+        """没有待播放的数据时置位播放完毕事件"""
+        if not self.playback_drained.is_set() and not self.has_pending_audio():
+            self.playback_drained.set()
+
+    def wait_for_drain(self, timeout=None):
+        """
+        等待下行音频全部播放完毕
+
+        参数:
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        返回:
+            bool: 是否在超时前播放完毕
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            if not self.playback_drained.wait(remaining):
+                return False
+            if not self.has_pending_audio():
+                break
+            # 事件置位后又有新数据写入，短暂等待后重新检查
+            time.sleep(0.01)
+
+        # 缓冲区取空后，声卡中还有最后一段数据正在播放
+        try:
+            if self.output_stream:
+                time.sleep(self.output_stream.get_output_latency())
+        except Exception:
+            pass
+        return True
+
+    def get_playback_stats(self):
+        """获取下行队列和抖动缓冲区的统计信息"""
+        return {
+            "queue": self.downlink_queue.get_stats(),
+            "jitter": self.jitter_buffer.get_stats(),
+            "pending_ms": round(self.pending_duration() * 1000, 1),
+            "underrun": self.output_underrun_count,
+        }
 
     def wait_for_audio_complete(self, timeout=5.0):
-        # 等待音频队列清空
-        attempt = 0
-        max_attempts = 15
-        while not self.audio_decode_queue.empty() and attempt < max_attempts:
-            time.sleep(0.1)
-            attempt += 1
+        """等待音频播放完毕，然后清空剩余数据"""
+        self.wait_for_drain(timeout)
 
         # 在关闭前清空任何剩余数据
-        while not self.audio_decode_queue.empty():
-            try:
-                self.audio_decode_queue.get_nowait()
-            except queue.Empty:
-                break
+        self.clear_audio_queue()
 
     def clear_audio_queue(self):
         """清空音频队列"""
-        while not self.audio_decode_queue.empty():
-            try:
-                self.audio_decode_queue.get_nowait()
-            except queue.Empty:
-                break
+        # 抖动缓冲区只能在播放线程中访问，这里只做标记，由播放线程重置
+        self._jitter_reset_pending = True
+        # 输出环形缓冲区同理，由输出回调清空
+        if self.output_buffer is not None:
+            self._output_clear_pending = True
+        self.downlink_queue.clear()
+        self.playback_drained.set()
 
     def start_streams(self):
         """启动音频流"""
@@ -322,17 +769,13 @@ class AudioCodec:
             if sys.platform in ('darwin', 'linux'):
                 time.sleep(0.1)
 
-            input_device = self._get_default_or_first_available_device(
-                is_input=True
-            )
-            self.output_stream = self.audio.open(
-                format=pyaudio.paInt16,
-                channels=AudioConfig.CHANNELS,
-                rate=AudioConfig.OUTPUT_SAMPLE_RATE,
-                output=True,
-                output_device_index=input_device,
-                frames_per_buffer=AudioConfig.OUTPUT_FRAME_SIZE
+            if self.output_buffer is not None:
+                self._output_clear_pending = True
+
+            output_device_index = self._get_default_or_first_available_device(
+                is_input=False
             )
+            self.output_stream = self._open_output_stream(output_device_index)
             logger.info("音频输出流重新初始化成功")
         except Exception as e:
             logger.error(f"重新初始化音频输出流失败: {e}")
@@ -347,12 +790,6 @@ class AudioCodec:
             if self.input_stream:
                 try:
                     if self.input_stream.is_active():
-                        # 在关闭前清空缓冲区
-                        while self.input_stream.get_read_available() > 0:
-                            self.input_stream.read(
-                                AudioConfig.INPUT_FRAME_SIZE,
-                                exception_on_overflow=False
-                            )
                         self.input_stream.stop_stream()
                     self.input_stream.close()
                 except Exception:  # 忽略关闭时的错误
@@ -362,31 +799,16 @@ class AudioCodec:
             if sys.platform in ('darwin', 'linux'):
                 time.sleep(0.1)
 
+            # 环形缓冲区只能由采集端清空，这里只做标记
+            self._input_clear_pending = True
+
             input_device_index = self._get_default_or_first_available_device(is_input=True)
-            self.input_stream = self.audio.open(
-                format=pyaudio.paInt16,
-                channels=AudioConfig.CHANNELS,
-                rate=AudioConfig.INPUT_SAMPLE_RATE,
-                input=True,
-                input_device_index=input_device_index,
-                frames_per_buffer=AudioConfig.INPUT_FRAME_SIZE
-            )
+            self.input_stream = self._open_input_stream(input_device_index)
             logger.info("音频输入流重新初始化成功")
         except Exception as e:
             logger.error(f"重新初始化音频输入流失败: {e}")
             raise
 
-    def get_shared_input_stream(self):
-        """获取可共享的输入流，如果不可用则返回None"""
-        with self._stream_lock:
-            if not self.input_stream or not self.input_stream.is_active():
-                try:
-                    self._reinitialize_input_stream()
-                except Exception as e:
-                    logger.error(f"无法获取可共享的输入流: {e}")
-                    return None
-            return self.input_stream
-
     def close(self):
         """关闭音频编解码器，确保资源正确释放"""
         if self._is_closing:  # 防止重复关闭
@@ -406,6 +828,12 @@ class AudioCodec:
             # 强制清空音频队列
             self.clear_audio_queue()
 
+            # 停止采集线程
+            self._capture_running = False
+            if self._capture_thread and self._capture_thread.is_alive():
+                self._capture_thread.join(timeout=1.0)
+            self._capture_thread = None
+
             with self._stream_lock:  # 使用锁确保线程安全
                 # 关闭输入流
                 if self.input_stream:
@@ -441,6 +869,11 @@ class AudioCodec:
                     finally:
                         self.audio = None
 
+            # 停止编码线程
+            if self.encode_worker:
+                self.encode_worker.stop()
+                self.encode_worker = None
+
             # 清理编解码器
             self.opus_encoder = None
             self.opus_decoder = None
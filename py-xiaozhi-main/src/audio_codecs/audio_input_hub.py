@@ -0,0 +1,149 @@
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger("AudioInputHub")
+
+
+class BackpressurePolicy:
+    """订阅队列写满时的处理策略"""
+    DROP_OLDEST = "drop_oldest"  # 丢弃最旧的帧，保证读到的是最新音频
+    DROP_NEWEST = "drop_newest"  # 丢弃新到的帧，保证已缓存的音频连续
+
+
+class AudioSubscription:
+    """麦克风音频的一个订阅者，拥有独立的有界队列"""
+
+    def __init__(self, hub, name, max_frames=50,
+                 policy=BackpressurePolicy.DROP_OLDEST, on_available=None):
+        """
+        初始化订阅者
+
+        参数:
+            hub: 所属的 AudioInputHub
+            name: 订阅者名称，用于日志
+            max_frames: 队列最多缓存的帧数
+            policy: 队列写满时的处理策略，见 BackpressurePolicy
+            on_available: 有新帧入队时的回调（在采集线程中调用，需尽快返回）
+        """
+        self.hub = hub
+        self.name = name
+        self.max_frames = max(1, int(max_frames))
+        self.policy = policy
+        self.on_available = on_available
+        self.closed = False
+
+        self._frames = deque()
+        self._cond = threading.Condition()
+
+        # 统计信息
+        self.received_count = 0
+        self.dropped_count = 0
+
+    def push(self, frame):
+        """放入一帧数据（由 AudioInputHub 在采集线程中调用）"""
+        with self._cond:
+            if len(self._frames) >= self.max_frames:
+                self.dropped_count += 1
+                if self.dropped_count % 100 == 1:
+                    logger.warning(
+                        f"订阅者 {self.name} 队列已满，"
+                        f"累计丢弃 {self.dropped_count} 帧"
+                    )
+                if self.policy == BackpressurePolicy.DROP_NEWEST:
+                    return
+                self._frames.popleft()
+            self._frames.append(frame)
+            self.received_count += 1
+            self._cond.notify()
+
+        if self.on_available:
+            self.on_available()
+
+    def read(self, timeout=None):
+        """
+        读取一帧数据
+
+        参数:
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        返回:
+            bytes: 一帧 PCM 数据，超时或订阅已关闭时返回 None
+        """
+        with self._cond:
+            if not self._frames and not self.closed:
+                self._cond.wait(timeout)
+            if self._frames:
+                return self._frames.popleft()
+            return None
+
+    def read_nowait(self):
+        """不等待地读取一帧数据，没有数据时返回 None"""
+        try:
+            return self._frames.popleft()
+        except IndexError:
+            return None
+
+    def pending(self):
+        """队列中等待读取的帧数"""
+        return len(self._frames)
+
+    def clear(self):
+        """丢弃队列中所有未读的帧"""
+        with self._cond:
+            self._frames.clear()
+
+    def close(self):
+        """取消订阅并唤醒正在等待的读取者"""
+        if self.closed:
+            return
+        self.hub.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._frames.clear()
+            self._cond.notify_all()
+
+
+class AudioInputHub:
+    """麦克风音频分发中心
+
+    音频只从一个采集源读取一次，然后把相同的帧分发给所有订阅者，
+    每个订阅者使用自己的有界队列和背压策略，互不影响。
+    """
+
+    def __init__(self):
+        self._subscribers = ()  # 使用元组，发布时无需加锁即可安全遍历
+        self._lock = threading.Lock()
+
+    def subscribe(self, name, max_frames=50,
+                  policy=BackpressurePolicy.DROP_OLDEST, on_available=None):
+        """
+        新增一个订阅者
+
+        返回:
+            AudioSubscription: 订阅对象，不再使用时调用 close()
+        """
+        subscription = AudioSubscription(
+            self, name, max_frames, policy, on_available
+        )
+        with self._lock:
+            self._subscribers = self._subscribers + (subscription,)
+        logger.info(f"音频订阅者已加入: {name}")
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """移除订阅者"""
+        with self._lock:
+            self._subscribers = tuple(
+                s for s in self._subscribers if s is not subscription
+            )
+        logger.info(f"音频订阅者已移除: {subscription.name}")
+
+    def publish(self, frame):
+        """把一帧数据分发给所有订阅者（由采集线程调用）"""
+        for subscription in self._subscribers:
+            subscription.push(frame)
+
+    def subscriber_count(self):
+        """当前订阅者数量"""
+        return len(self._subscribers)
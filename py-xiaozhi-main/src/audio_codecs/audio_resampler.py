@@ -0,0 +1,224 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=16)
+def _design_polyphase_filter(up, down, taps_per_phase):
+    """
+    设计多相低通滤波器（Kaiser 窗 sinc）
+
+    返回:
+        numpy.ndarray: 形状为 (up, taps_per_phase) 的滤波器组，
+            每一相的系数已经倒序，便于直接与升序排列的输入样本做点积
+    """
+    num_taps = taps_per_phase * up
+    # 截止频率取两个采样率中较低者的奈奎斯特频率，留出一定的过渡带
+    cutoff = 0.45 / max(up, down)
+    n = np.arange(num_taps) - (num_taps - 1) / 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(num_taps, 8.0)
+    # 归一化直流增益，插零上采样会使幅度缩小 up 倍，这里一并补偿
+    h *= up / h.sum()
+
+    # phases[p][k] = h[p + k * up]
+    phases = h.reshape(taps_per_phase, up).T
+    return np.ascontiguousarray(phases[:, ::-1], dtype=np.float32)
+
+
+def mix_channels(frames, dst_channels):
+    """
+    声道混合
+
+    参数:
+        frames: 形状为 (帧数, 声道数) 的 float32 数组
+        dst_channels: 目标声道数
+
+    返回:
+        numpy.ndarray: 形状为 (帧数, dst_channels) 的数组
+    """
+    src_channels = frames.shape[1]
+    if src_channels == dst_channels:
+        return frames
+    if src_channels == 1:
+        return np.repeat(frames, dst_channels, axis=1)
+    # 多声道先取平均混为单声道，再按需要复制
+    mono = frames.mean(axis=1, keepdims=True)
+    if dst_channels == 1:
+        return mono
+    return np.repeat(mono, dst_channels, axis=1)
+
+
+class PolyphaseResampler:
+    """流式多相重采样器
+
+    采样率之比化简为 up/down 后，只计算实际需要输出的样本，
+    每个输出样本是对应相位的滤波器与输入样本的点积，整块数据一次完成向量化计算。
+    块与块之间保留滤波器所需的历史样本和相位，可以按任意大小的块连续处理。
+    """
+
+    def __init__(self, src_rate, dst_rate, channels=1, taps_per_phase=16):
+        """
+        初始化重采样器
+
+        参数:
+            src_rate: 输入采样率
+            dst_rate: 输出采样率
+            channels: 声道数
+            taps_per_phase: 每一相的滤波器阶数，越大音质越好、计算量越大
+        """
+        g = math.gcd(int(src_rate), int(dst_rate))
+        self.up = int(dst_rate) // g
+        self.down = int(src_rate) // g
+        self.channels = channels
+        # 降采样时截止频率更低，需要按比例增加阶数才能保持相同的过渡带宽度
+        self.taps = taps_per_phase * max(1, math.ceil(self.down / self.up))
+        self._filters = _design_polyphase_filter(self.up, self.down, self.taps)
+        self._tap_offsets = np.arange(self.taps)
+        self.reset()
+
+    @property
+    def delay(self):
+        """滤波器引入的延迟（输出样本数）"""
+        return (self.taps * self.up - 1) / (2 * self.down)
+
+    def reset(self):
+        """清空历史样本，开始处理新的音频流"""
+        self._history = np.zeros((self.taps - 1, self.channels), dtype=np.float32)
+        # 下一个输出样本在上采样序列中的位置，相对于下一块输入的起点
+        self._position = 0
+
+    def process(self, frames):
+        """
+        重采样一块音频
+
+        参数:
+            frames: 形状为 (帧数, 声道数) 的 float32 数组
+
+        返回:
+            numpy.ndarray: 形状为 (输出帧数, 声道数) 的 float32 数组
+        """
+        total = len(frames) * self.up
+        count = max(0, -(-(total - self._position) // self.down))
+
+        positions = self._position + np.arange(count) * self.down
+        base = positions // self.up
+        phase = positions % self.up
+
+        # 历史样本长度为 taps - 1，因此 buffer[base + k] 对应输入样本 x[base - taps + 1 + k]
+        buffer = np.concatenate((self._history, frames.astype(np.float32, copy=False)))
+        window = buffer[base[:, None] + self._tap_offsets]
+        out = np.einsum("nt,ntc->nc", self._filters[phase], window)
+
+        self._position += count * self.down - total
+        self._history = buffer[len(buffer) - (self.taps - 1):].copy()
+        return out
+
+
+def _to_int16(frames):
+    """float32 样本转换为 int16，超出范围的部分截断"""
+    return np.clip(np.rint(frames), -32768, 32767).astype(np.int16)
+
+
+class AudioFormatConverter:
+    """16 位 PCM 的采样率与声道转换
+
+    用于在设备原生格式与协议要求的格式之间转换。减少声道时先混音再重采样，
+    增加声道时先重采样再复制，重采样始终在较少的声道上进行。
+    格式相同时直接返回输入数据，不做任何计算。
+    """
+
+    def __init__(self, src_rate, dst_rate, src_channels=1, dst_channels=1):
+        """
+        初始化格式转换器
+
+        参数:
+            src_rate: 输入采样率
+            dst_rate: 输出采样率
+            src_channels: 输入声道数
+            dst_channels: 输出声道数
+        """
+        self.src_rate = int(src_rate)
+        self.dst_rate = int(dst_rate)
+        self.src_channels = int(src_channels)
+        self.dst_channels = int(dst_channels)
+        self.passthrough = (
+            self.src_rate == self.dst_rate and
+            self.src_channels == self.dst_channels
+        )
+
+        self.resampler = None
+        if self.src_rate != self.dst_rate:
+            self.resampler = PolyphaseResampler(
+                self.src_rate,
+                self.dst_rate,
+                channels=min(self.src_channels, self.dst_channels)
+            )
+
+    def reset(self):
+        """清空重采样器的历史状态"""
+        if self.resampler:
+            self.resampler.reset()
+
+    def process(self, data):
+        """
+        转换一块交错排列的 PCM 数据
+
+        参数:
+            data: bytes 或 int16 numpy 数组
+
+        返回:
+            numpy.ndarray: 转换后交错排列的一维 int16 数组
+        """
+        if isinstance(data, np.ndarray):
+            samples = data.reshape(-1)
+        else:
+            samples = np.frombuffer(data, dtype=np.int16)
+        if self.passthrough:
+            return samples
+
+        frames = samples.reshape(-1, self.src_channels).astype(np.float32)
+        if self.dst_channels < self.src_channels:
+            frames = mix_channels(frames, self.dst_channels)
+        if self.resampler:
+            frames = self.resampler.process(frames)
+        if self.dst_channels > self.src_channels:
+            frames = mix_channels(frames, self.dst_channels)
+        return _to_int16(frames).reshape(-1)
+
+
+def resample_pcm(data, src_rate, dst_rate, src_channels=1, dst_channels=1):
+    """
+    一次性转换一段完整的 PCM 音频，并补偿滤波器延迟
+
+    参数:
+        data: bytes 或 int16 numpy 数组
+        src_rate: 输入采样率
+        dst_rate: 输出采样率
+        src_channels: 输入声道数
+        dst_channels: 输出声道数
+
+    返回:
+        numpy.ndarray: 转换后交错排列的一维 int16 数组
+    """
+    converter = AudioFormatConverter(src_rate, dst_rate, src_channels, dst_channels)
+    if converter.resampler is None:
+        return converter.process(data)
+
+    if isinstance(data, np.ndarray):
+        samples = data.reshape(-1)
+    else:
+        samples = np.frombuffer(data, dtype=np.int16)
+    src_frames = len(samples) // src_channels
+    resampler = converter.resampler
+
+    # 末尾补零，把滤波器中剩余的样本冲刷出来
+    pad_frames = math.ceil(resampler.delay * resampler.down / resampler.up) + 1
+    padded = np.concatenate(
+        (samples, np.zeros(pad_frames * src_channels, dtype=np.int16))
+    )
+    out = converter.process(padded).reshape(-1, dst_channels)
+
+    skip = int(round(resampler.delay))
+    expected = -(-src_frames * resampler.up // resampler.down)
+    return out[skip:skip + expected].reshape(-1)
@@ -0,0 +1,140 @@
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger("DownlinkQueue")
+
+
+class OverflowPolicy:
+    """下行队列写满时的处理策略"""
+    DROP_OLDEST = "drop_oldest"  # 丢弃最旧的包，直接追上最新的音频
+    COMPRESS = "compress"  # 在较旧的一半积压中隔一个丢一个，把积压时长压缩一半，丢包分散而不成片
+
+
+class DownlinkQueue:
+    """有界的下行音频包队列
+
+    网络线程写入，播放线程读取。每个包记录到达时间，用于统计队列深度和排队时长。
+    队列写满时按 OverflowPolicy 丢包，并把后续包的序列号向前平移，
+    使抖动缓冲区看到的序列号保持连续，丢掉的包直接缩短延迟，而不会被当作丢包补齐。
+    """
+
+    def __init__(self, max_packets=150, policy=OverflowPolicy.DROP_OLDEST):
+        """
+        初始化下行队列
+
+        参数:
+            max_packets: 队列最多缓存的包数
+            policy: 队列写满时的处理策略，见 OverflowPolicy
+        """
+        self.max_packets = max(2, int(max_packets))
+        self.policy = policy
+        self._packets = deque()  # (Opus数据, 序列号, 到达时间)
+        self._lock = threading.Lock()
+        self._sequence_offset = 0  # 因丢包向前平移的序列号数量
+
+        # 统计信息
+        self.dropped_count = 0
+        self.max_depth = 0
+        self.average_wait = 0.0  # 包在队列中平均等待的时间（秒）
+
+    def __len__(self):
+        return len(self._packets)
+
+    def put(self, opus_data, sequence=None, arrival_time=None):
+        """
+        放入一个 Opus 包（网络线程调用）
+
+        参数:
+            opus_data: Opus 编码数据
+            sequence: 包序列号，协议不提供时为 None
+            arrival_time: 到达时间（time.monotonic），为 None 时取当前时间
+        """
+        if arrival_time is None:
+            arrival_time = time.monotonic()
+
+        with self._lock:
+            if len(self._packets) >= self.max_packets:
+                self._handle_overflow()
+            if sequence is not None:
+                sequence -= self._sequence_offset
+            self._packets.append((opus_data, sequence, arrival_time))
+            if len(self._packets) > self.max_depth:
+                self.max_depth = len(self._packets)
+
+    def get_nowait(self, now=None):
+        """
+        取出最早的包（播放线程调用）
+
+        返回:
+            tuple: (opus_data, sequence, arrival_time)，队列为空时返回 None
+        """
+        with self._lock:
+            if not self._packets:
+                return None
+            packet = self._packets.popleft()
+
+        if now is None:
+            now = time.monotonic()
+        self.average_wait += (now - packet[2] - self.average_wait) / 16
+        return packet
+
+    def clear(self):
+        """丢弃所有未播放的包，并重新开始序列号平移"""
+        with self._lock:
+            self._packets.clear()
+            self._sequence_offset = 0
+
+    def oldest_age(self, now=None):
+        """队列中最早的包已经等待的时间（秒），队列为空时为 0"""
+        try:
+            arrival_time = self._packets[0][2]
+        except IndexError:
+            return 0.0
+        if now is None:
+            now = time.monotonic()
+        return now - arrival_time
+
+    def get_stats(self):
+        """获取统计信息"""
+        return {
+            "depth": len(self._packets),
+            "max_depth": self.max_depth,
+            "age_ms": round(self.oldest_age() * 1000, 1),
+            "average_wait_ms": round(self.average_wait * 1000, 1),
+            "dropped": self.dropped_count,
+        }
+
+    def _handle_overflow(self):
+        """按策略丢包（调用方需持有锁）"""
+        if self.policy == OverflowPolicy.COMPRESS:
+            # 较旧的一半中保留奇数位置的包
+            half = len(self._packets) // 2
+            drop_indices = range(0, half, 2)
+        else:
+            drop_indices = range(1)
+
+        packets = list(self._packets)
+        dropped = [packets[i] for i in drop_indices]
+        drop_set = set(drop_indices)
+        remaining = [p for i, p in enumerate(packets) if i not in drop_set]
+
+        dropped_sequences = sorted(p[1] for p in dropped if p[1] is not None)
+        if dropped_sequences:
+            # 序列号大于被丢弃包的，都向前平移相应的数量
+            remaining = [
+                (data, seq - bisect.bisect_left(dropped_sequences, seq), arrival)
+                if seq is not None else (data, seq, arrival)
+                for data, seq, arrival in remaining
+            ]
+            self._sequence_offset += len(dropped_sequences)
+
+        self._packets = deque(remaining)
+        previous = self.dropped_count
+        self.dropped_count += len(dropped)
+        if previous == 0 or previous // 50 != self.dropped_count // 50:
+            logger.warning(
+                f"下行音频队列已满（{self.policy}），累计丢弃 {self.dropped_count} 个包"
+            )
@@ -0,0 +1,121 @@
+import numpy as np
+
+
+class FrameRingBuffer:
+    """预分配的 PCM 环形缓冲区（单生产者/单消费者，无锁）
+
+    生产者（通常是 PortAudio 回调线程）只修改写指针，消费者只修改读指针，
+    两个指针都是单调递增的样本计数，依赖 GIL 保证整数赋值的原子性，
+    因此读写两端都不需要加锁。缓冲区写满时不会覆盖未读数据，
+    而是丢弃新到的样本并记录溢出次数，由消费者决定如何上报。
+    """
+
+    def __init__(self, frame_size, capacity_frames=50, dtype=np.int16):
+        """
+        初始化环形缓冲区
+
+        参数:
+            frame_size: 每帧的样本数
+            capacity_frames: 缓冲区能容纳的帧数
+            dtype: 样本数据类型
+        """
+        self.frame_size = int(frame_size)
+        self.capacity = self.frame_size * int(capacity_frames)
+        self.dtype = np.dtype(dtype)
+        self._buffer = np.zeros(self.capacity, dtype=self.dtype)
+        self._write_pos = 0  # 只由生产者修改
+        self._read_pos = 0  # 只由消费者修改
+
+        # 溢出统计（只由生产者修改）
+        self.overrun_count = 0
+        self.dropped_samples = 0
+
+    def available(self):
+        """当前可读取的样本数"""
+        return self._write_pos - self._read_pos
+
+    def available_frames(self):
+        """当前可读取的完整帧数"""
+        return self.available() // self.frame_size
+
+    def free_space(self):
+        """当前可写入的样本数"""
+        return self.capacity - self.available()
+
+    def write(self, data):
+        """
+        写入 PCM 数据（生产者调用）
+
+        参数:
+            data: bytes 或 numpy 数组
+
+        返回:
+            int: 实际写入的样本数，未写入的部分计入溢出统计
+        """
+        if isinstance(data, np.ndarray):
+            samples = data.astype(self.dtype, copy=False).reshape(-1)
+        else:
+            samples = np.frombuffer(data, dtype=self.dtype)
+
+        count = len(samples)
+        if count == 0:
+            return 0
+
+        free = self.free_space()
+        if count > free:
+            self.overrun_count += 1
+            self.dropped_samples += count - free
+            count = free
+            if count == 0:
+                return 0
+
+        start = self._write_pos % self.capacity
+        first = min(count, self.capacity - start)
+        self._buffer[start:start + first] = samples[:first]
+        if count > first:
+            self._buffer[:count - first] = samples[first:count]
+
+        # 数据写完后再移动写指针，保证消费者看到的都是完整数据
+        self._write_pos += count
+        return count
+
+    def read_into(self, out):
+        """
+        读取数据到预分配的数组中（消费者调用）
+
+        参数:
+            out: 目标 numpy 数组
+
+        返回:
+            int: 实际读取的样本数
+        """
+        count = min(len(out), self.available())
+        if count == 0:
+            return 0
+
+        start = self._read_pos % self.capacity
+        first = min(count, self.capacity - start)
+        out[:first] = self._buffer[start:start + first]
+        if count > first:
+            out[first:count] = self._buffer[:count - first]
+
+        self._read_pos += count
+        return count
+
+    def pop_frame(self):
+        """
+        取出一帧完整的 PCM 数据（消费者调用）
+
+        返回:
+            bytes: 一帧 PCM 数据，数据不足一帧时返回 None
+        """
+        if self.available() < self.frame_size:
+            return None
+
+        frame = np.empty(self.frame_size, dtype=self.dtype)
+        self.read_into(frame)
+        return frame.tobytes()
+
+    def clear(self):
+        """丢弃所有未读数据（消费者调用）"""
+        self._read_pos = self._write_pos
@@ -0,0 +1,201 @@
+import time
+
+
+class JitterBuffer:
+    """下行音频的自适应抖动缓冲区
+
+    按序列号对 Opus 包排序，根据到达时间估算网络抖动并动态调整目标缓冲延迟。
+    播放时按序列号依次取包：包丢失时优先使用下一个包的带内 FEC 恢复，
+    没有可用的下一个包时使用 Opus 的丢包隐藏（PLC）。
+    该类不是线程安全的，写入和读取需要在同一个线程中进行。
+    """
+
+    def __init__(self, frame_duration_ms, min_delay_ms=60, max_delay_ms=400):
+        """
+        初始化抖动缓冲区
+
+        参数:
+            frame_duration_ms: 每个包的音频时长（毫秒）
+            min_delay_ms: 最小目标缓冲延迟（毫秒）
+            max_delay_ms: 最大缓冲延迟（毫秒），超出时丢弃最旧的包
+        """
+        self.frame_duration = frame_duration_ms / 1000
+        self.min_delay = min_delay_ms / 1000
+        self.max_delay = max(max_delay_ms, min_delay_ms) / 1000
+        self.max_packets = max(1, int(self.max_delay / self.frame_duration))
+
+        # 统计信息
+        self.late_count = 0  # 晚于播放位置到达而被丢弃的包
+        self.duplicate_count = 0  # 重复的包
+        self.lost_count = 0  # 播放时缺失的包
+        self.fec_count = 0  # 使用 FEC 恢复的包
+        self.plc_count = 0  # 使用 PLC 隐藏的包
+        self.overflow_count = 0  # 超过最大延迟被丢弃的包
+        self.underrun_count = 0  # 播放过程中缓冲区被取空的次数
+
+        self.reset()
+
+    def reset(self):
+        """清空缓冲区并重新开始缓冲（统计信息保留）"""
+        self._packets = {}  # 序列号 -> (Opus数据, 到达时间)
+        self._next_seq = None  # 下一个要播放的序列号
+        self._auto_seq = 0  # 数据源不提供序列号时按到达顺序编号
+        self._playing = False
+        self._last_transit = None
+        self._concealed = 0  # 当前这段缺口已经连续隐藏的包数
+        self.jitter = 0.0  # 到达抖动估计（秒）
+
+    def __len__(self):
+        return len(self._packets)
+
+    def free_slots(self):
+        """在不超过最大延迟的前提下还能放入的包数"""
+        return max(0, self.max_packets - len(self._packets))
+
+    @property
+    def target_delay(self):
+        """当前的目标缓冲延迟（秒）"""
+        delay = self.frame_duration + 4 * self.jitter
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def put(self, opus_data, sequence=None, arrival_time=None):
+        """
+        放入一个 Opus 包
+
+        参数:
+            opus_data: Opus 编码数据
+            sequence: 包序列号，为 None 时按到达顺序编号
+            arrival_time: 到达时间（time.monotonic），为 None 时取当前时间
+
+        返回:
+            bool: 包是否被接收
+        """
+        if arrival_time is None:
+            arrival_time = time.monotonic()
+        if sequence is None:
+            sequence = self._auto_seq
+            self._auto_seq += 1
+
+        if self._next_seq is not None and sequence < self._next_seq:
+            if self._playing:
+                self.late_count += 1
+                return False
+            # 尚未开始播放，更早的包仍然可以插到队首
+            self._next_seq = sequence
+        if sequence in self._packets:
+            self.duplicate_count += 1
+            return False
+
+        self._update_jitter(sequence, arrival_time)
+        self._packets[sequence] = (opus_data, arrival_time)
+        if self._next_seq is None:
+            self._next_seq = sequence
+
+        self._trim()
+        return True
+
+    def pop(self, now=None):
+        """
+        取出下一个要播放的包
+
+        返回:
+            tuple: (opus_data, decode_fec)。opus_data 为空字节时表示需要 PLC，
+                decode_fec 为 True 时表示用该包的 FEC 数据恢复上一个丢失的包。
+            None: 当前没有可以播放的数据
+        """
+        if not self._packets:
+            if self._playing:
+                # 播放过程中被取空，重新缓冲；句子之间的停顿不应计入抖动
+                self._playing = False
+                self._last_transit = None
+                self.underrun_count += 1
+            return None
+
+        if not self._playing:
+            if self.time_until_ready(now) > 0:
+                return None
+            self._playing = True
+            # 重新缓冲后从最旧的包开始播放，不为停顿期间的序列号补 PLC
+            self._next_seq = min(self._packets)
+            self._concealed = 0
+
+        if self._concealed >= self.max_packets:
+            # 缺口过长，跳到剩余最旧的包继续播放
+            self._next_seq = min(self._packets)
+
+        seq = self._next_seq
+        self._next_seq += 1
+
+        packet = self._packets.pop(seq, None)
+        if packet is not None:
+            self._concealed = 0
+            return packet[0], False
+
+        self.lost_count += 1
+        self._concealed += 1
+        next_packet = self._packets.get(seq + 1)
+        if next_packet is not None:
+            self.fec_count += 1
+            return next_packet[0], True
+
+        self.plc_count += 1
+        return b"", False
+
+    def time_until_ready(self, now=None):
+        """
+        距离可以开始播放还需等待的时间（秒）
+
+        返回:
+            float: 已经可以播放时为 0
+            None: 缓冲区为空
+        """
+        if not self._packets:
+            return None
+        if self._playing:
+            return 0.0
+
+        target = self.target_delay
+        if len(self._packets) * self.frame_duration >= target:
+            return 0.0
+
+        if now is None:
+            now = time.monotonic()
+        oldest_arrival = min(arrival for _, arrival in self._packets.values())
+        return max(0.0, target - (now - oldest_arrival))
+
+    def get_stats(self):
+        """获取统计信息"""
+        return {
+            "depth": len(self._packets),
+            "jitter_ms": round(self.jitter * 1000, 1),
+            "target_delay_ms": round(self.target_delay * 1000, 1),
+            "late": self.late_count,
+            "duplicate": self.duplicate_count,
+            "lost": self.lost_count,
+            "fec": self.fec_count,
+            "plc": self.plc_count,
+            "overflow": self.overflow_count,
+            "underrun": self.underrun_count,
+        }
+
+    def _update_jitter(self, sequence, arrival_time):
+        """按 RFC 3550 的方式平滑估计抖动，只统计迟到的部分
+
+        TTS 服务端通常会快于实时地突发发送，提前到达不会造成卡顿，
+        因此只把传输时间变长的部分计入抖动。
+        """
+        transit = arrival_time - sequence * self.frame_duration
+        if self._last_transit is not None:
+            delta = max(0.0, transit - self._last_transit)
+            self.jitter += (delta - self.jitter) / 16
+        self._last_transit = transit
+
+    def _trim(self):
+        """缓冲超过最大延迟时丢弃最旧的包，避免延迟无限增长"""
+        if len(self._packets) <= self.max_packets:
+            return
+        while len(self._packets) > self.max_packets:
+            del self._packets[min(self._packets)]
+            self.overflow_count += 1
+        # 已经落后，直接从剩余最旧的包继续播放
+        self._next_seq = min(self._packets)
@@ -0,0 +1,122 @@
+import logging
+import queue
+import threading
+
+logger = logging.getLogger("OpusEncodeWorker")
+
+
+class OpusEncodeWorker:
+    """Opus 编码工作线程
+
+    采集线程只负责把原始 PCM 帧放入有界队列，编码在独立线程中完成，
+    编码结果通过 on_encoded 回调交给发送端。Opus 编码器是有状态的，
+    同一路音频必须按顺序由同一个编码器处理，因此每路音频只使用一个工作线程。
+    """
+
+    def __init__(self, encoder, frame_size, on_encoded=None, max_pending=10):
+        """
+        初始化编码工作线程
+
+        参数:
+            encoder: opuslib.Encoder 实例
+            frame_size: 每帧的样本数
+            on_encoded: 编码完成回调，格式: callback(opus_data)
+            max_pending: 队列中最多等待编码的帧数
+        """
+        self.encoder = encoder
+        self.frame_size = frame_size
+        self.on_encoded = on_encoded
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._running = False
+
+        # 统计信息
+        self.encoded_count = 0
+        self.dropped_count = 0
+
+    def start(self):
+        """启动编码线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._worker_loop,
+            name="OpusEncodeWorker",
+            daemon=True
+        )
+        self._thread.start()
+        logger.info("Opus编码线程已启动")
+
+    def stop(self):
+        """停止编码线程，丢弃尚未编码的帧"""
+        if not self._running:
+            return
+        self._running = False
+        self.clear()
+        try:
+            self._queue.put_nowait(None)  # 唤醒工作线程
+        except queue.Full:
+            pass
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+        logger.info("Opus编码线程已停止")
+
+    def submit(self, pcm_data):
+        """
+        提交一帧 PCM 数据等待编码（任意线程调用，不会阻塞）
+
+        队列已满时丢弃最旧的一帧，保证发送出去的始终是最新的音频。
+
+        返回:
+            bool: 是否有帧因队列已满被丢弃
+        """
+        dropped = False
+        while True:
+            try:
+                self._queue.put_nowait(pcm_data)
+                return dropped
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped_count += 1
+                    dropped = True
+                    if self.dropped_count % 50 == 1:
+                        logger.warning(
+                            f"编码队列已满，累计丢弃 {self.dropped_count} 帧"
+                        )
+                except queue.Empty:
+                    pass
+
+    def pending(self):
+        """等待编码的帧数"""
+        return self._queue.qsize()
+
+    def clear(self):
+        """丢弃所有等待编码的帧"""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def _worker_loop(self):
+        """编码线程主循环"""
+        while self._running:
+            pcm_data = self._queue.get()
+            if pcm_data is None or not self._running:
+                continue
+
+            try:
+                opus_data = self.encoder.encode(pcm_data, self.frame_size)
+            except Exception as e:
+                logger.error(f"编码音频数据时出错: {e}")
+                continue
+
+            self.encoded_count += 1
+            callback = self.on_encoded
+            if callback:
+                try:
+                    callback(opus_data)
+                except Exception as e:
+                    logger.error(f"处理编码结果时出错: {e}")
@@ -0,0 +1,102 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from vosk import Model, SetLogLevel
+
+logger = logging.getLogger("ModelRegistry")
+
+
+class ModelRegistry:
+    """进程内共享的 Vosk 模型
+
+    每个模型目录在进程中只加载一次，所有识别器共用同一个 Model 对象，
+    检测器出错重建时不必重新加载。warm_up() 在后台线程中提前加载，
+    get_model() 等待加载完成；加载失败的模型不会被缓存，下次调用会重新尝试。
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = ModelRegistry()
+        return cls._instance
+
+    def __init__(self):
+        self._models = {}  # 模型绝对路径 -> Future[Model]
+        self._lock = threading.Lock()
+
+    def warm_up(self, model_path):
+        """
+        在后台线程中加载模型，已经加载或正在加载时直接返回
+
+        参数:
+            model_path: 模型目录
+
+        返回:
+            concurrent.futures.Future: 加载完成后得到 Model
+        """
+        key = os.path.abspath(model_path)
+        with self._lock:
+            future = self._models.get(key)
+            if future is not None:
+                return future
+            future = Future()
+            self._models[key] = future
+
+        threading.Thread(
+            target=self._load,
+            args=(key, future),
+            name="ModelWarmUp",
+            daemon=True
+        ).start()
+        return future
+
+    def get_model(self, model_path, timeout=None):
+        """
+        获取模型，尚未加载时等待加载完成
+
+        参数:
+            model_path: 模型目录
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        返回:
+            Model: 共享的 Vosk 模型
+        """
+        return self.warm_up(model_path).result(timeout)
+
+    def is_ready(self, model_path):
+        """模型是否已经加载完成"""
+        future = self._models.get(os.path.abspath(model_path))
+        return (future is not None and future.done()
+                and future.exception() is None)
+
+    def unload(self, model_path):
+        """从缓存中移除模型，内存在所有识别器释放后回收"""
+        with self._lock:
+            self._models.pop(os.path.abspath(model_path), None)
+
+    def _load(self, key, future):
+        """加载模型（在后台线程中运行）"""
+        try:
+            if not os.path.exists(key):
+                raise FileNotFoundError(f"模型路径不存在: {key}")
+            logger.info(f"正在加载语音识别模型: {key}")
+            start = time.monotonic()
+            SetLogLevel(-1)  # 设置 Vosk 日志级别为静默
+            model = Model(model_path=key)
+            logger.info(f"模型加载完成，耗时 {time.monotonic() - start:.1f} 秒")
+            future.set_result(model)
+        except Exception as e:
+            logger.error(f"加载模型失败: {e}")
+            # 失败的结果不缓存，下次调用时重新加载
+            with self._lock:
+                if self._models.get(key) is future:
+                    del self._models[key]
+            future.set_exception(e)
@@ -0,0 +1,151 @@
+from collections import deque
+from functools import lru_cache
+
+from pypinyin import lazy_pinyin
+
+
+@lru_cache(maxsize=4096)
+def _char_pinyin(char):
+    """单个汉字的拼音（带缓存）"""
+    return lazy_pinyin(char)[0]
+
+
+def _tokenize(text, start=0):
+    """
+    把文本切分为拼音音节序列
+
+    每个汉字是一个音节，连续的字母数字视为一个词（转为小写），空白和标点忽略。
+
+    返回:
+        list: [(音节, 在文本中的结束位置)]
+    """
+    tokens = []
+    i = start
+    length = len(text)
+    while i < length:
+        char = text[i]
+        if char.isascii():
+            if char.isalnum():
+                j = i + 1
+                while j < length and text[j].isascii() and text[j].isalnum():
+                    j += 1
+                tokens.append((text[i:j].lower(), j))
+                i = j
+                continue
+        elif char.isalpha():
+            tokens.append((_char_pinyin(char), i + 1))
+        i += 1
+    return tokens
+
+
+class PinyinMatcher:
+    """多唤醒词拼音匹配器
+
+    所有唤醒词的拼音音节序列编译为一个 Aho-Corasick 自动机，文本只需扫描一遍，
+    耗时与唤醒词数量无关。识别器的部分结果通常是在上一次结果后面追加内容，
+    匹配器保存每个音节处的自动机状态，只处理与上一次结果不同的部分。
+    """
+
+    def __init__(self, wake_words):
+        """
+        初始化匹配器
+
+        参数:
+            wake_words: 唤醒词列表
+        """
+        self.wake_words = list(wake_words)
+        self.patterns = [
+            [syllable for syllable, _ in _tokenize(word)] for word in self.wake_words
+        ]
+        self._build()
+        self.reset()
+
+    def _build(self):
+        """构造自动机"""
+        self._goto = [{}]  # 每个状态的转移表
+        self._fail = [0]
+        self._output = [None]  # 到达该状态时匹配到的唤醒词序号（取最短的一个）
+
+        for index, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for syllable in pattern:
+                next_state = self._goto[state].get(syllable)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][syllable] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                state = next_state
+            if self._output[state] is None:
+                self._output[state] = index
+
+        # 按层次计算失败指针，并把失败状态的输出合并进来
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for syllable, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and syllable not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(syllable, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                if self._output[next_state] is None:
+                    self._output[next_state] = self._output[self._fail[next_state]]
+
+    def reset(self):
+        """开始新的一段识别结果"""
+        self._text = ""
+        self._ends = []  # 每个音节在文本中的结束位置
+        self._states = []  # 处理完每个音节后的自动机状态
+
+    def _step(self, state, syllable):
+        """自动机前进一步"""
+        while state and syllable not in self._goto[state]:
+            state = self._fail[state]
+        return self._goto[state].get(syllable, 0)
+
+    def feed(self, text):
+        """
+        处理最新的识别结果，只扫描与上一次结果不同的部分
+
+        参数:
+            text: 识别器当前的完整文本（部分结果或最终结果）
+
+        返回:
+            tuple: (是否匹配, 唤醒词)
+        """
+        if text.startswith(self._text):
+            prefix = len(self._text)
+        else:
+            prefix = 0
+            while (prefix < len(text) and prefix < len(self._text)
+                   and text[prefix] == self._text[prefix]):
+                prefix += 1
+
+        # 保留完全位于公共前缀内的音节（字母数字词可能在前缀之后继续延长，因此不含边界处的）
+        keep = len(self._ends)
+        while keep and (self._ends[keep - 1] > prefix or
+                        (self._ends[keep - 1] == prefix and prefix < len(text)
+                         and text[prefix - 1].isascii() and text[prefix - 1].isalnum())):
+            keep -= 1
+        del self._ends[keep:]
+        del self._states[keep:]
+        self._text = text
+
+        state = self._states[-1] if self._states else 0
+        start = self._ends[-1] if self._ends else 0
+        matched = None
+        for syllable, end in _tokenize(text, start):
+            state = self._step(state, syllable)
+            self._ends.append(end)
+            self._states.append(state)
+            if matched is None and self._output[state] is not None:
+                matched = self._output[state]
+
+        if matched is None:
+            return False, None
+        return True, self.wake_words[matched]
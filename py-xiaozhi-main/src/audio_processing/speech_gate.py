@@ -0,0 +1,146 @@
+import logging
+from collections import deque
+
+import numpy as np
+import webrtcvad
+
+logger = logging.getLogger("SpeechGate")
+
+# webrtcvad 支持的采样率
+_VAD_SAMPLE_RATES = (8000, 16000, 32000, 48000)
+
+
+class SpeechGate:
+    """语音门限，放在唤醒词识别器前面
+
+    分两级判断：先用 numpy 一次算出整块音频中每个短帧的能量，
+    只有能量超过门限的帧才交给 webrtcvad 判断是否为语音。
+    门限关闭时音频只进入预录缓冲区，检测到语音后连同预录的音频一起放行，
+    语音结束后再保持一小段时间才关闭，避免切掉词尾。
+    能量门限随环境底噪自适应，安静和嘈杂环境下都能尽早放过静音。
+    """
+
+    def __init__(self, sample_rate, frame_ms=20, vad_mode=2,
+                 min_energy=200.0, noise_factor=3.0,
+                 pre_roll_ms=400, hangover_ms=800):
+        """
+        初始化语音门限
+
+        参数:
+            sample_rate: 采样率
+            frame_ms: 分析帧时长（毫秒），webrtcvad 要求 10、20 或 30
+            vad_mode: webrtcvad 灵敏度（0-3），越大越倾向于判为非语音
+            min_energy: 能量门限的下限（int16 样本的 RMS）
+            noise_factor: 能量超过底噪的多少倍才进一步做 VAD 判断
+            pre_roll_ms: 门限打开时补送的预录音频时长
+            hangover_ms: 语音结束后门限保持打开的时长
+        """
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.min_energy = min_energy
+        self.noise_factor = noise_factor
+        self.pre_roll_bytes = sample_rate * pre_roll_ms // 1000 * 2
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+
+        self.vad = None
+        if sample_rate in _VAD_SAMPLE_RATES:
+            self.vad = webrtcvad.Vad(vad_mode)
+        else:
+            logger.warning(f"webrtcvad 不支持 {sample_rate}Hz，只使用能量判断")
+
+        # 统计信息
+        self.passed_bytes = 0
+        self.gated_bytes = 0
+
+        self.reset()
+
+    def reset(self):
+        """清空状态，门限回到关闭状态"""
+        self.is_open = False
+        self.noise_floor = self.min_energy / self.noise_factor
+        self._silence_frames = 0
+        self._remainder = np.zeros(0, dtype=np.int16)
+        self._pre_roll = deque()
+        self._pre_roll_size = 0
+
+    def process(self, data):
+        """
+        处理一块 16 位单声道 PCM 数据
+
+        参数:
+            data: PCM 数据
+
+        返回:
+            tuple: (需要送入识别器的数据列表, 门限是否在这一块之后关闭)
+                门限关闭时调用方应结束当前识别，取出最终结果
+        """
+        speech = self._detect_speech(data)
+
+        if not self.is_open:
+            if not speech:
+                self._push_pre_roll(data)
+                self.gated_bytes += len(data)
+                return [], False
+            # 检测到语音，连同预录音频一起放行
+            self.is_open = True
+            self._silence_frames = 0
+            chunks = list(self._pre_roll)
+            chunks.append(data)
+            self._pre_roll.clear()
+            self._pre_roll_size = 0
+            self.passed_bytes += sum(len(chunk) for chunk in chunks)
+            return chunks, False
+
+        self.passed_bytes += len(data)
+        if speech:
+            self._silence_frames = 0
+            return [data], False
+
+        self._silence_frames += max(1, len(data) // 2 // self.frame_samples)
+        if self._silence_frames >= self.hangover_frames:
+            self.is_open = False
+            self._silence_frames = 0
+            return [data], True
+        return [data], False
+
+    def _detect_speech(self, data):
+        """判断这一块音频中是否有语音"""
+        samples = np.frombuffer(data, dtype=np.int16)
+        if len(self._remainder):
+            samples = np.concatenate((self._remainder, samples))
+        count = len(samples) // self.frame_samples
+        self._remainder = samples[count * self.frame_samples:]
+        if count == 0:
+            return False
+
+        frames = samples[:count * self.frame_samples].reshape(count, self.frame_samples)
+        energy = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+
+        threshold = max(self.min_energy, self.noise_floor * self.noise_factor)
+        loud = energy > threshold
+
+        # 用每块中最安静的帧跟踪底噪：变安静时快速下降，变吵时缓慢上升
+        quietest = float(energy.min())
+        rate = 0.3 if quietest < self.noise_floor else 0.02
+        self.noise_floor += (quietest - self.noise_floor) * rate
+
+        if not loud.any():
+            return False
+        if self.vad is None:
+            return True
+
+        for index in np.flatnonzero(loud):
+            try:
+                if self.vad.is_speech(frames[index].tobytes(), self.sample_rate):
+                    return True
+            except Exception as e:
+                logger.debug(f"VAD 判断失败: {e}")
+                return True
+        return False
+
+    def _push_pre_roll(self, data):
+        """保存最近的一段音频，门限打开时补送"""
+        self._pre_roll.append(data)
+        self._pre_roll_size += len(data)
+        while self._pre_roll and self._pre_roll_size - len(self._pre_roll[0]) >= self.pre_roll_bytes:
+            self._pre_roll_size -= len(self._pre_roll.popleft())
@@ -45,7 +45,9 @@ class VADDetector:
         self.silence_count = 0
         self.triggered = False
         
-        # 创建独立的PyAudio实例和流，避免与主音频流冲突
+        # 优先订阅编解码器的麦克风分发中心，不可用时才创建独立的PyAudio实例和流
+        self.audio_source = None
+        self._pending_audio = b""
         self.pa = None
         self.stream = None
         
@@ -97,7 +99,13 @@ class VADDetector:
         return self.running and not self.paused
     
     def _initialize_audio_stream(self):
-        """初始化独立的音频流"""
+        """初始化音频输入，优先使用共享的麦克风订阅"""
+        if self.audio_codec and hasattr(self.audio_codec, "subscribe_input"):
+            self.audio_source = self.audio_codec.subscribe_input("vad", max_frames=10)
+            self._pending_audio = b""
+            logger.info("VAD检测器使用共享的麦克风订阅")
+            return True
+
         try:
             # 创建PyAudio实例
             self.pa = pyaudio.PyAudio()
@@ -135,6 +143,10 @@ class VADDetector:
     def _close_audio_stream(self):
         """关闭音频流"""
         try:
+            if self.audio_source:
+                self.audio_source.close()
+                self.audio_source = None
+
             if self.stream:
                 self.stream.stop_stream()
                 self.stream.close()
@@ -153,8 +165,8 @@ class VADDetector:
         logger.info("VAD检测循环已启动")
         
         while self.running:
-            # 如果暂停或者音频流未初始化，则跳过
-            if self.paused or not self.stream:
+            # 如果暂停或者音频输入未初始化，则跳过
+            if self.paused or not (self.stream or self.audio_source):
                 time.sleep(0.1)
                 continue
                 
@@ -178,6 +190,9 @@ class VADDetector:
                 else:
                     # 不在说话状态，重置状态
                     self._reset_state()
+                    if self.audio_source:
+                        self.audio_source.clear()
+                        self._pending_audio = b""
                     
             except Exception as e:
                 logger.error(f"VAD检测循环出错: {e}")
@@ -188,6 +203,9 @@ class VADDetector:
     
     def _read_audio_frame(self):
         """读取一帧音频数据"""
+        if self.audio_source:
+            return self._read_shared_frame()
+
         try:
             if not self.stream or not self.stream.is_active():
                 return None
@@ -199,6 +217,19 @@ class VADDetector:
             logger.error(f"读取音频帧失败: {e}")
             return None
             
+    def _read_shared_frame(self):
+        """从共享订阅中读取数据，并切分为VAD需要的帧长度"""
+        frame_bytes = self.frame_size * 2  # 16位音频，每个样本2字节
+        while len(self._pending_audio) < frame_bytes:
+            data = self.audio_source.read(timeout=0.1)
+            if data is None:
+                return None
+            self._pending_audio += data
+
+        frame = self._pending_audio[:frame_bytes]
+        self._pending_audio = self._pending_audio[frame_bytes:]
+        return frame
+
     def _detect_speech(self, frame):
         """检测是否是语音"""
         try:
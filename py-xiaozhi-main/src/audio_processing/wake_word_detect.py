@@ -5,9 +5,11 @@ import time
 import pyaudio
 import os
 import sys
-from vosk import Model, KaldiRecognizer, SetLogLevel
-from pypinyin import lazy_pinyin
+from vosk import KaldiRecognizer
 
+from src.audio_processing.model_registry import ModelRegistry
+from src.audio_processing.pinyin_matcher import PinyinMatcher
+from src.audio_processing.speech_gate import SpeechGate
 from src.constants.constants import AudioConfig
 from src.utils.config_manager import ConfigManager
 
@@ -19,14 +21,14 @@ class WakeWordDetector:
     """唤醒词检测类"""
 
     def __init__(self,
-                 sample_rate=AudioConfig.INPUT_SAMPLE_RATE,
-                 buffer_size=AudioConfig.INPUT_FRAME_SIZE):
+                 sample_rate=None,
+                 buffer_size=None):
         """
         初始化唤醒词检测器
 
         参数:
-            sample_rate: 音频采样率
-            buffer_size: 音频缓冲区大小
+            sample_rate: 音频采样率，默认使用 AudioConfig.INPUT_SAMPLE_RATE
+            buffer_size: 音频缓冲区大小，默认使用 AudioConfig.INPUT_FRAME_SIZE
         """
         # 初始化基本属性
         self.on_detected_callbacks = []
@@ -36,9 +38,13 @@ class WakeWordDetector:
         self.paused = False
         self.audio = None
         self.stream = None
-        self.external_stream = False
+        self.audio_source = None  # 来自 AudioInputHub 的订阅，优先于独立音频流
         self.stream_lock = threading.Lock()
         self.on_error = None
+        self.speech_gate = None
+        self._last_partial = None  # 上一次的部分识别结果，没有变化时不再解析
+        # 识别器只能在检测线程中访问，其他线程只做标记，由检测线程重置
+        self._reset_pending = False
 
         # 获取配置
         config = ConfigManager.get_instance()
@@ -49,11 +55,14 @@ class WakeWordDetector:
 
         # 基本初始化
         self.enabled = True
-        self.sample_rate = sample_rate
-        self.buffer_size = buffer_size
+        self.sample_rate = sample_rate or AudioConfig.INPUT_SAMPLE_RATE
+        self.buffer_size = buffer_size or AudioConfig.INPUT_FRAME_SIZE
         self.sensitivity = config.get_config(
             "WAKE_WORD_OPTIONS.SENSITIVITY", 0.5
         )
+        self.recognizer_mode = config.get_config(
+            "WAKE_WORD_OPTIONS.RECOGNIZER_MODE", "grammar"
+        )
 
         # 设置唤醒词
         self.wake_words = config.get_config('WAKE_WORD_OPTIONS.WAKE_WORDS', [
@@ -61,9 +70,7 @@ class WakeWordDetector:
         ])
         
         # 预先计算唤醒词的拼音
-        self.wake_words_pinyin = []
-        for word in self.wake_words:
-            self.wake_words_pinyin.append(''.join(lazy_pinyin(word)))
+        self.matcher = PinyinMatcher(self.wake_words)
 
         # 初始化模型
         try:
@@ -77,18 +84,25 @@ class WakeWordDetector:
                 self.enabled = False
                 raise FileNotFoundError(error_msg)
 
-            # 初始化模型
-            logger.info(f"正在加载语音识别模型: {model_path}")
-            SetLogLevel(-1)  # 设置 Vosk 日志级别为静默
-            self.model = Model(model_path=model_path)
-            self.recognizer = KaldiRecognizer(self.model, self.sample_rate)
+            # 模型在进程内共享，已经加载（或正在后台预热）时不会重复加载
+            self.model = ModelRegistry.get_instance().get_model(model_path)
+            self.recognizer = self._create_recognizer()
             self.recognizer.SetWords(True)
-            logger.info("模型加载完成")
+            logger.info("识别器创建完成")
+
+            # 语音门限：静音时不运行识别器
+            if config.get_config("WAKE_WORD_OPTIONS.SPEECH_GATE", True):
+                self.speech_gate = SpeechGate(
+                    self.sample_rate,
+                    min_energy=config.get_config(
+                        "WAKE_WORD_OPTIONS.GATE_MIN_ENERGY", 200
+                    )
+                )
 
             # 调试信息
             logger.info(f"已配置 {len(self.wake_words)} 个唤醒词")
             for i, word in enumerate(self.wake_words):
-                pinyin = self.wake_words_pinyin[i]
+                pinyin = ' '.join(self.matcher.patterns[i])
                 logger.debug(f"唤醒词 {i + 1}: {word} (拼音: {pinyin})")
                 
         except Exception as e:
@@ -97,6 +111,37 @@ class WakeWordDetector:
             logger.error(traceback.format_exc())
             self.enabled = False
     
+    def _build_grammar(self):
+        """
+        由唤醒词构造识别语法
+
+        中文唤醒词按单字切分（小模型的词表一定包含单字），英文按空格切分，
+        最后加上 [unk] 吸收其他语音，避免被强行识别成唤醒词。
+        """
+        phrases = []
+        for word in self.wake_words:
+            if word.isascii():
+                tokens = word.lower().split()
+            else:
+                tokens = [char for char in word if not char.isspace()]
+            if tokens:
+                phrases.append(" ".join(tokens))
+        phrases.append("[unk]")
+        return json.dumps(phrases, ensure_ascii=False)
+
+    def _create_recognizer(self):
+        """创建识别器，关键词检测模式失败时回退到开放词表"""
+        if self.recognizer_mode == "grammar":
+            try:
+                grammar = self._build_grammar()
+                recognizer = KaldiRecognizer(self.model, self.sample_rate, grammar)
+                logger.info(f"使用关键词检测模式，语法: {grammar}")
+                return recognizer
+            except Exception as e:
+                logger.warning(f"创建关键词识别器失败，使用开放词表识别: {e}")
+        logger.info("使用开放词表识别模式")
+        return KaldiRecognizer(self.model, self.sample_rate)
+
     def _get_model_path(self, config):
         """获取模型路径，处理不同运行环境"""
         model_path = config.get_config(
@@ -123,8 +168,14 @@ class WakeWordDetector:
         
         return model_path
 
-    def start(self, audio_stream=None):
-        """启动唤醒词检测"""
+    def start(self, audio_source=None):
+        """
+        启动唤醒词检测
+
+        参数:
+            audio_source: 麦克风音频订阅（AudioSubscription），
+                为 None 时打开独立的音频流
+        """
         if not getattr(self, 'enabled', True):
             logger.info("唤醒词功能已禁用，无法启动")
             return False
@@ -135,11 +186,11 @@ class WakeWordDetector:
         try:
             # 初始化音频
             with self.stream_lock:
-                if audio_stream:
-                    self.stream = audio_stream
+                if audio_source:
+                    self.audio_source = audio_source
+                    self.stream = None
                     self.audio = None
-                    self.external_stream = True
-                    logger.info("唤醒词检测器使用外部音频流")
+                    logger.info("唤醒词检测器使用共享的麦克风订阅")
                 else:
                     self.audio = pyaudio.PyAudio()
                     self.stream = self.audio.open(
@@ -149,7 +200,6 @@ class WakeWordDetector:
                         input=True,
                         frames_per_buffer=self.buffer_size
                     )
-                    self.external_stream = False
                     logger.info("唤醒词检测器使用内部音频流")
 
             # 启动检测线程
@@ -181,8 +231,13 @@ class WakeWordDetector:
                 self.detection_thread.join(timeout=1.0)
                 self.detection_thread = None
 
-            # 只有当使用内部流时才关闭
-            if not self.external_stream and self.stream:
+            # 取消麦克风订阅
+            if self.audio_source:
+                self.audio_source.close()
+                self.audio_source = None
+
+            # 关闭内部音频流
+            if self.stream:
                 try:
                     if self.stream.is_active():
                         self.stream.stop_stream()
@@ -190,9 +245,6 @@ class WakeWordDetector:
                     self.stream = None
                 except Exception as e:
                     logger.error(f"停止音频流时出错: {e}")
-            else:
-                # 如果是外部流，只设置为None但不关闭
-                self.stream = None
 
             if self.audio:
                 try:
@@ -210,10 +262,15 @@ class WakeWordDetector:
     def resume(self):
         """恢复唤醒词检测"""
         if self.running and self.paused:
-            self.paused = False
-            # 如果流已关闭，重新启动检测
-            if not self.stream or not self.stream.is_active():
+            # 检测线程可能还在处理暂停前读到的数据，这里只做标记，由检测线程重置识别器
+            self._reset_pending = True
+            if self.audio_source and not self.audio_source.closed:
+                # 丢弃暂停期间积累的音频
+                self.audio_source.clear()
+            elif not self.stream or not self.stream.is_active():
+                # 如果流已关闭，重新启动检测
                 self.start()
+            self.paused = False
             logger.info("唤醒词检测已恢复")
 
     def is_running(self):
@@ -244,38 +301,9 @@ class WakeWordDetector:
         self.audio = None
 
     def _check_wake_word(self, text):
-        """检查文本中是否包含唤醒词（仅使用拼音匹配）"""
-        # 将输入文本转换为拼音
-        text_pinyin = ''.join(lazy_pinyin(text))
-        text_pinyin = text_pinyin.replace(" ", "")  # 移除空格
-        # 只进行拼音匹配
-        for i, pinyin in enumerate(self.wake_words_pinyin):
-            if pinyin in text_pinyin:
-                return True, self.wake_words[i]
-
-        return False, None
-
-    def update_stream(self, new_stream):
-        """更新唤醒词检测器使用的音频流"""
-        if not self.running:
-            logger.warning("唤醒词检测器未运行，无法更新流")
-            return False
-
-        with self.stream_lock:
-            # 如果当前使用的是内部流，需要先清理
-            if not self.external_stream and self.stream:
-                try:
-                    if self.stream.is_active():
-                        self.stream.stop_stream()
-                    self.stream.close()
-                except Exception as e:
-                    logger.warning(f"关闭旧流时出错: {e}")
-
-            # 更新为新的流
-            self.stream = new_stream
-            self.external_stream = True
-            logger.info("已更新唤醒词检测器的音频流")
-        return True
+        """检查文本中是否包含唤醒词（仅使用拼音匹配，只处理新增的部分）"""
+        # 关键词检测模式下其他语音会被识别为 [unk]
+        return self.matcher.feed(text.replace("[unk]", ""))
 
     def _detection_loop(self):
         """唤醒词检测主循环"""
@@ -317,6 +345,10 @@ class WakeWordDetector:
 
                 error_count = 0  # 重置错误计数
 
+                if self._reset_pending:
+                    self._reset_pending = False
+                    self._reset_recognition()
+
                 # 处理音频数据
                 self._process_audio_data(data)
 
@@ -328,6 +360,11 @@ class WakeWordDetector:
 
     def _read_audio_data(self, error_count, max_errors, stream_error_time):
         """读取音频数据"""
+        source = self.audio_source
+        if source and not source.closed:
+            # 共享订阅在没有数据时会阻塞等待，不需要额外休眠
+            return source.read(timeout=0.5)
+
         with self.stream_lock:
             if not self.stream:
                 if stream_error_time is None:
@@ -344,7 +381,7 @@ class WakeWordDetector:
 
             # 尝试检查流状态
             try:
-                if not self.stream.is_active() and not self.external_stream:
+                if not self.stream.is_active():
                     self.stream.start_stream()
             except Exception:
                 pass
@@ -397,17 +434,50 @@ class WakeWordDetector:
 
     def _process_audio_data(self, data):
         """处理音频数据"""
-        # 处理音频数据
+        if not self.speech_gate:
+            self._recognize(data)
+            return
+
+        # 先经过语音门限，只有语音片段（含预录音频）才送入识别器
+        chunks, segment_ended = self.speech_gate.process(data)
+        for chunk in chunks:
+            self._recognize(chunk)
+        if segment_ended:
+            # 语音段结束，取出最终结果并重置识别器
+            result = json.loads(self.recognizer.FinalResult())
+            self._last_partial = None
+            text = result.get("text", "")
+            if text.strip():
+                logger.debug(f"识别文本: {text}")
+                self._check_and_handle_wake_word(text, is_partial=False)
+
+    def _reset_recognition(self):
+        """清空识别器和语音门限的状态"""
+        if self.speech_gate:
+            self.speech_gate.reset()
+        recognizer = getattr(self, 'recognizer', None)
+        if recognizer:
+            recognizer.Reset()
+        self._last_partial = None
+        matcher = getattr(self, 'matcher', None)
+        if matcher:
+            matcher.reset()
+
+    def _recognize(self, data):
+        """把音频送入识别器并检查唤醒词"""
         is_final = self.recognizer.AcceptWaveform(data)
 
-        # 处理部分结果，实现实时唤醒词检测
-        partial_result = json.loads(self.recognizer.PartialResult())
-        partial_text = partial_result.get('partial', '')
-        if partial_text.strip():
-            self._check_and_handle_wake_word(partial_text, is_partial=True)
+        # 处理部分结果，实现实时唤醒词检测；结果没有变化时跳过解析
+        partial = self.recognizer.PartialResult()
+        if partial != self._last_partial:
+            self._last_partial = partial
+            partial_text = json.loads(partial).get('partial', '')
+            if partial_text.strip():
+                self._check_and_handle_wake_word(partial_text, is_partial=True)
 
         # 处理最终结果
         if is_final:
+            self._last_partial = None
             result = json.loads(self.recognizer.Result())
             if "text" in result and result["text"].strip():
                 text = result["text"]
@@ -425,6 +495,9 @@ class WakeWordDetector:
             
             # 触发回调
             self._trigger_callbacks(wake_word, text)
+        elif not is_partial:
+            # 最终结果之后识别器开始新的一句话
+            self.matcher.reset()
 
     def _trigger_callbacks(self, wake_word, text):
         """触发唤醒词回调"""
@@ -434,4 +507,4 @@ class WakeWordDetector:
             except Exception as e:
                 logger.error(f"执行唤醒词检测回调时出错: {e}")
         # 重置识别器，准备下一轮检测
-        self.recognizer.Reset()
\ No newline at end of file
+        self._reset_recognition()
\ No newline at end of file
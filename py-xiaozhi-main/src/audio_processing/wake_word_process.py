@@ -0,0 +1,441 @@
+import logging
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.constants.constants import AudioConfig
+from src.utils.config_manager import ConfigManager
+
+logger = logging.getLogger("WakeWordProcess")
+
+# 共享内存头部：写指针、读指针（均为单调递增的样本计数）
+_HEADER_SIZE = 16
+
+
+class SharedPcmRing:
+    """共享内存中的 PCM 环形缓冲区（单生产者/单消费者，跨进程）
+
+    与 FrameRingBuffer 的做法相同：生产者只修改写指针，消费者只修改读指针，
+    指针是对齐的 64 位整数，读写两端都不需要加锁。写满时丢弃新到的数据。
+    """
+
+    def __init__(self, capacity, name=None):
+        """
+        创建或连接共享缓冲区
+
+        参数:
+            capacity: 能容纳的样本数（int16）
+            name: 已有共享内存的名称，为 None 时新建
+        """
+        self.capacity = int(capacity)
+        self.owner = name is None
+        size = _HEADER_SIZE + self.capacity * 2
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self._untrack()
+        self._header = np.ndarray((2,), dtype=np.uint64, buffer=self.shm.buf)
+        self._samples = np.ndarray(
+            (self.capacity,), dtype=np.int16, buffer=self.shm.buf, offset=_HEADER_SIZE
+        )
+        if self.owner:
+            self._header[:] = 0
+
+        # 溢出统计（只由生产者修改）
+        self.dropped_samples = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _untrack(self):
+        """子进程只是连接共享内存，由创建它的进程负责释放"""
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        except Exception:
+            pass
+
+    def available(self):
+        """当前可读取的样本数"""
+        header = self._header
+        if header is None:
+            return 0
+        return int(header[0] - header[1])
+
+    def write(self, data):
+        """
+        写入 PCM 数据（生产者调用）
+
+        返回:
+            bool: 空间不足时丢弃整块数据并返回 False
+        """
+        samples = np.frombuffer(data, dtype=np.int16)
+        count = len(samples)
+        write_pos = int(self._header[0])
+        if count > self.capacity - (write_pos - int(self._header[1])):
+            self.dropped_samples += count
+            return False
+
+        start = write_pos % self.capacity
+        first = min(count, self.capacity - start)
+        self._samples[start:start + first] = samples[:first]
+        if first < count:
+            self._samples[:count - first] = samples[first:]
+        # 数据写完后再移动写指针
+        self._header[0] = write_pos + count
+        return True
+
+    def read(self):
+        """
+        读取所有可用数据（消费者调用）
+
+        返回:
+            bytes: PCM 数据，没有数据时为空
+        """
+        read_pos = int(self._header[1])
+        count = int(self._header[0]) - read_pos
+        if count <= 0:
+            return b""
+
+        start = read_pos % self.capacity
+        first = min(count, self.capacity - start)
+        data = self._samples[start:start + first].tobytes()
+        if first < count:
+            data += self._samples[:count - first].tobytes()
+        self._header[1] = read_pos + count
+        return data
+
+    def clear(self):
+        """丢弃所有未读数据（消费者调用）"""
+        self._header[1] = self._header[0]
+
+    def close(self):
+        """断开共享内存，创建者同时释放它"""
+        # 先释放指向共享内存的数组，否则无法关闭
+        self._header = None
+        self._samples = None
+        try:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+        except Exception as e:
+            logger.debug(f"释放共享内存失败: {e}")
+
+
+def _engine_main(ring_name, capacity, conn, sample_rate, frame_size, frame_duration):
+    """子进程入口：从共享缓冲区读取音频并运行唤醒词识别
+
+    音频参数由主进程传入，子进程不会为了确定帧长度而打开音频设备。
+    """
+    # spawn 方式启动的子进程没有继承日志配置，只输出到控制台，日志文件由主进程写入
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s[%(name)s] - %(levelname)s - %(message)s - %(processName)s'
+    )
+    # 使用主进程协商好的帧长度，避免 AudioConfig 在子进程中查询设备
+    AudioConfig.FRAME_DURATION = frame_duration
+    from src.audio_processing.wake_word_detect import WakeWordDetector
+
+    ring = SharedPcmRing(capacity, name=ring_name)
+    try:
+        detector = WakeWordDetector(sample_rate=sample_rate, buffer_size=frame_size)
+        if not detector.enabled:
+            conn.send(("error", "唤醒词检测器初始化失败"))
+            return
+        detector.on_detected(
+            lambda wake_word, text: conn.send(("detected", wake_word, text))
+        )
+        conn.send(("ready",))
+
+        while True:
+            # 处理控制消息
+            while conn.poll():
+                command = conn.recv()[0]
+                if command == "stop":
+                    return
+                if command == "reset":
+                    ring.clear()
+                    detector._reset_recognition()
+
+            data = ring.read()
+            if data:
+                detector._process_audio_data(data)
+            else:
+                time.sleep(0.02)
+    except (EOFError, BrokenPipeError, KeyboardInterrupt):
+        pass
+    except Exception as e:
+        try:
+            conn.send(("error", str(e)))
+        except Exception:
+            pass
+        raise
+    finally:
+        ring.close()
+
+
+class WakeWordProcess:
+    """在子进程中运行的唤醒词检测
+
+    接口与 WakeWordDetector 相同。识别在独立进程中进行，不与主进程的音频、
+    事件循环和界面争用 GIL。主进程的转发线程把麦克风订阅的音频写入共享内存
+    环形缓冲区，检测结果通过 Pipe 返回。子进程异常退出时自动重启，
+    短时间内重启次数过多才通过 on_error 上报。
+    """
+
+    def __init__(self, max_restarts=3, restart_window=60.0, buffer_seconds=2.0):
+        """
+        初始化子进程唤醒词检测
+
+        参数:
+            max_restarts: restart_window 内最多自动重启的次数
+            restart_window: 统计重启次数的时间窗口（秒）
+            buffer_seconds: 共享缓冲区能容纳的音频时长
+        """
+        self.on_detected_callbacks = []
+        self.on_error = None
+        self.running = False
+        self.paused = False
+        self.audio_source = None
+
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.capacity = int(AudioConfig.INPUT_SAMPLE_RATE * buffer_seconds)
+
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._ring = None
+        self._pump_thread = None
+        self._restart_times = []
+
+        # 统计信息（子进程重启后共享缓冲区会重建，因此在这里累计）
+        self._overrun_count = 0
+        self._dropped_samples = 0
+        self.restart_count = 0
+
+        config = ConfigManager.get_instance()
+        self.enabled = config.get_config('WAKE_WORD_OPTIONS.USE_WAKE_WORD', False)
+
+    def on_detected(self, callback):
+        """
+        注册唤醒词检测回调
+
+        回调函数格式: callback(wake_word, full_text)
+        """
+        self.on_detected_callbacks.append(callback)
+
+    def start(self, audio_source=None):
+        """
+        启动子进程并开始转发音频
+
+        参数:
+            audio_source: 麦克风音频订阅（AudioSubscription）
+        """
+        if not self.enabled:
+            logger.info("唤醒词功能已禁用，无法启动")
+            return False
+        if audio_source is None:
+            logger.error("子进程唤醒词检测需要共享的麦克风订阅")
+            return False
+
+        self.stop()
+        try:
+            self.audio_source = audio_source
+            self._start_process()
+            self.running = True
+            self.paused = False
+            self._pump_thread = threading.Thread(
+                target=self._pump_loop,
+                name="WakeWordPump",
+                daemon=True
+            )
+            self._pump_thread.start()
+            logger.info("子进程唤醒词检测已启动")
+            return True
+        except Exception as e:
+            error_msg = f"启动子进程唤醒词检测失败: {e}"
+            logger.error(error_msg)
+            self.running = False
+            self._stop_process()
+            self._close_audio_source()
+            if self.on_error:
+                self.on_error(error_msg)
+            return False
+
+    def stop(self):
+        """停止转发并结束子进程"""
+        if not self.running:
+            return
+        self.running = False
+        self.paused = False
+
+        if self._pump_thread and self._pump_thread.is_alive():
+            self._pump_thread.join(timeout=1.0)
+        self._pump_thread = None
+
+        self._close_audio_source()
+        self._stop_process()
+
+    def pause(self):
+        """暂停唤醒词检测"""
+        if self.running and not self.paused:
+            self.paused = True
+            logger.info("唤醒词检测已暂停")
+
+    def resume(self):
+        """恢复唤醒词检测"""
+        if self.running and self.paused:
+            if self.audio_source and not self.audio_source.closed:
+                # 丢弃暂停期间积累的音频
+                self.audio_source.clear()
+            self._send(("reset",))
+            self.paused = False
+            logger.info("唤醒词检测已恢复")
+
+    def is_running(self):
+        """检查唤醒词检测是否正在运行"""
+        return self.running and not self.paused
+
+    def get_stats(self):
+        """获取共享缓冲区和子进程的统计信息"""
+        ring = self._ring
+        dropped = self._dropped_samples
+        buffered = 0
+        if ring:
+            dropped += ring.dropped_samples
+            buffered = ring.available()
+        return {
+            "buffered_samples": buffered,
+            "overrun": self._overrun_count,
+            "dropped_samples": dropped,
+            "restarts": self.restart_count,
+        }
+
+    def _close_audio_source(self):
+        """关闭麦克风订阅"""
+        if self.audio_source:
+            self.audio_source.close()
+            self.audio_source = None
+
+    def _start_process(self):
+        """创建共享缓冲区和子进程"""
+        self._ring = SharedPcmRing(self.capacity)
+        self._conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_engine_main,
+            args=(
+                self._ring.name, self.capacity, child_conn,
+                AudioConfig.INPUT_SAMPLE_RATE,
+                AudioConfig.INPUT_FRAME_SIZE,
+                AudioConfig.FRAME_DURATION,
+            ),
+            name="WakeWordEngine",
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+
+    def _stop_process(self):
+        """结束子进程并释放共享缓冲区"""
+        process, self._process = self._process, None
+        if process:
+            self._send(("stop",))
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=1.0)
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+        if self._ring:
+            self._dropped_samples += self._ring.dropped_samples
+            self._ring.close()
+            self._ring = None
+
+    def _send(self, message):
+        """向子进程发送控制消息"""
+        try:
+            if self._conn:
+                self._conn.send(message)
+        except (OSError, BrokenPipeError):
+            pass
+
+    def _restart_process(self, reason):
+        """子进程异常退出后重启"""
+        now = time.monotonic()
+        self._restart_times = [
+            t for t in self._restart_times if now - t < self.restart_window
+        ]
+        if len(self._restart_times) < self.max_restarts:
+            self._restart_times.append(now)
+            self.restart_count += 1
+            logger.warning(f"唤醒词子进程已退出（{reason}），正在重启")
+            self._stop_process()
+            try:
+                self._start_process()
+                return True
+            except Exception as e:
+                reason = f"重启失败: {e}"
+
+        # 重启次数过多（通常是模型或配置问题），交给 on_error 处理
+        error_msg = f"唤醒词子进程频繁退出: {reason}"
+        logger.error(error_msg)
+        self.running = False
+        self._stop_process()
+        self._close_audio_source()
+        if self.on_error:
+            self.on_error(error_msg)
+        return False
+
+    def _pump_loop(self):
+        """把麦克风音频写入共享缓冲区，并处理子进程返回的消息"""
+        while self.running:
+            try:
+                data = self.audio_source.read(timeout=0.05)
+                if data and not self.paused and not self._ring.write(data):
+                    self._overrun_count += 1
+                    if self._overrun_count % 100 == 1:
+                        logger.warning(
+                            f"唤醒词子进程处理不及时，共享缓冲区已满，"
+                            f"累计丢弃 {self._overrun_count} 块音频"
+                        )
+
+                while self._conn.poll():
+                    self._handle_message(self._conn.recv())
+
+                if not self._process.is_alive():
+                    if not self._restart_process(f"退出码 {self._process.exitcode}"):
+                        return
+            except (EOFError, OSError) as e:
+                if not self.running or self._process is None:
+                    # stop() 正在关闭管道，不算子进程异常退出
+                    return
+                if not self._restart_process(str(e) or "连接已断开"):
+                    return
+            except Exception as e:
+                logger.error(f"唤醒词转发线程出错: {e}")
+                time.sleep(0.5)
+
+    def _handle_message(self, message):
+        """处理子进程消息"""
+        kind = message[0]
+        if kind == "detected":
+            _, wake_word, text = message
+            if self.paused:
+                return
+            logger.info(f"检测到唤醒词: '{wake_word}' (文本: {text})")
+            for callback in self.on_detected_callbacks:
+                try:
+                    callback(wake_word, text)
+                except Exception as e:
+                    logger.error(f"执行唤醒词检测回调时出错: {e}")
+        elif kind == "ready":
+            logger.info("唤醒词子进程已就绪")
+        elif kind == "error":
+            logger.error(f"唤醒词子进程出错: {message[1]}")
@@ -1,5 +1,6 @@
+import threading
+
 from src.utils.config_manager import ConfigManager
-config = ConfigManager.get_instance()
 
 
 class ListeningMode:
@@ -39,21 +40,21 @@ def is_official_server(ws_addr: str) -> bool:
     """
     return "api.tenclass.net" in ws_addr
 
-def get_frame_duration() -> int:
+def _query_device_frame_duration():
     """
-    获取设备的帧长度
+    根据默认输入设备的建议缓冲区计算帧长度
 
     返回:
-        int: 帧长度(毫秒)
+        int: 帧长度(毫秒)，查询失败时返回 None
     """
     import pyaudio
     try:
-
-        if not is_official_server(config.get_config("SYSTEM_OPTIONS.NETWORK.WEBSOCKET_URL")):
-            return 60
         p = pyaudio.PyAudio()
-        # 获取默认输入设备信息
-        device_info = p.get_default_input_device_info()
+        try:
+            # 获取默认输入设备信息
+            device_info = p.get_default_input_device_info()
+        finally:
+            p.terminate()
         # 一些设备会提供建议的缓冲区大小
         default_rate = device_info.get('defaultSampleRate', 48000)
         # 默认20ms的缓冲区
@@ -61,26 +62,86 @@ def get_frame_duration() -> int:
         # 计算帧长度
         frame_duration = int(1000 * suggested_buffer / default_rate)
         # 确保帧长度在合理范围内 (10ms-50ms)
-        frame_duration = max(10, min(50, frame_duration))
-        p.terminate()
-        return frame_duration
+        return max(10, min(50, frame_duration))
     except Exception:
+        return None
+
+
+def get_frame_duration() -> int:
+    """
+    获取设备的帧长度
+
+    官方服务器需要按设备协商帧长度。结果只由 AudioConfig 在进程内缓存，
+    不写入配置文件，更换音频设备后下次启动会重新查询。
+
+    返回:
+        int: 帧长度(毫秒)
+    """
+    config = ConfigManager.get_instance()
+    if not is_official_server(config.get_config("SYSTEM_OPTIONS.NETWORK.WEBSOCKET_URL")):
+        return 60
+
+    frame_duration = _query_device_frame_duration()
+    if frame_duration is None:
         return 20  # 如果获取失败，返回默认值20ms
+    return frame_duration
+
+
+def _get_output_sample_rate() -> int:
+    """官方服务器使用24kHz输出，其他服务器使用16kHz"""
+    config = ConfigManager.get_instance()
+    if is_official_server(config.get_config("SYSTEM_OPTIONS.NETWORK.WEBSOCKET_URL")):
+        return 24000
+    return 16000
+
+
+class _LazyAudioConfigMeta(type):
+    """首次访问时才计算依赖设备和配置的音频参数，结果缓存为类属性"""
+
+    _lock = threading.RLock()
 
-class AudioConfig:
+    def __getattr__(cls, name):
+        resolver = cls._LAZY_ATTRIBUTES.get(name)
+        if resolver is None:
+            raise AttributeError(name)
+        with cls._lock:
+            # 其他线程可能已经计算完成
+            if name in cls.__dict__:
+                return cls.__dict__[name]
+            value = resolver(cls)
+            setattr(cls, name, value)
+            return value
+
+    def reset(cls):
+        """清除缓存的参数，下次访问时重新计算"""
+        with cls._lock:
+            for name in cls._LAZY_ATTRIBUTES:
+                if name in cls.__dict__:
+                    delattr(cls, name)
+
+
+class AudioConfig(metaclass=_LazyAudioConfigMeta):
     """音频配置类"""
     # 固定配置
     INPUT_SAMPLE_RATE = 16000  # 输入采样率16kHz
-    OUTPUT_SAMPLE_RATE = 24000 if is_official_server(config.get_config("SYSTEM_OPTIONS.NETWORK.WEBSOCKET_URL")) else 16000  # 输出采样率
     CHANNELS = 1
 
-    # 动态获取帧长度
-    FRAME_DURATION = get_frame_duration()
-
-    # 根据不同采样率计算帧大小
-    INPUT_FRAME_SIZE = int(INPUT_SAMPLE_RATE * (FRAME_DURATION / 1000))
-    OUTPUT_FRAME_SIZE = int(OUTPUT_SAMPLE_RATE * (FRAME_DURATION / 1000))
-
     # Opus编码配置
     OPUS_APPLICATION = 2049  # OPUS_APPLICATION_AUDIO
-    OPUS_FRAME_SIZE = INPUT_FRAME_SIZE  # 使用输入采样率的帧大小
+
+    # 以下参数依赖配置文件和音频设备，首次访问时才计算，避免导入模块时初始化 PortAudio
+    _LAZY_ATTRIBUTES = {
+        # 输出采样率
+        "OUTPUT_SAMPLE_RATE": lambda cls: _get_output_sample_rate(),
+        # 动态获取帧长度
+        "FRAME_DURATION": lambda cls: get_frame_duration(),
+        # 根据不同采样率计算帧大小
+        "INPUT_FRAME_SIZE": lambda cls: int(
+            cls.INPUT_SAMPLE_RATE * (cls.FRAME_DURATION / 1000)
+        ),
+        "OUTPUT_FRAME_SIZE": lambda cls: int(
+            cls.OUTPUT_SAMPLE_RATE * (cls.FRAME_DURATION / 1000)
+        ),
+        # 使用输入采样率的帧大小
+        "OPUS_FRAME_SIZE": lambda cls: cls.INPUT_FRAME_SIZE,
+    }
@@ -1,7 +1,7 @@
-import json
 from typing import Any, Dict
 
 from src.iot.thing import Thing
+from src.utils import json_codec
 
 
 class ThingManager:
@@ -21,11 +21,11 @@ class ThingManager:
 
     def get_descriptors_json(self) -> str:
         descriptors = [thing.get_descriptor_json() for thing in self.things]
-        return json.dumps(descriptors)
+        return json_codec.dumps(descriptors)
 
     def get_states_json(self) -> str:
         states = [thing.get_state_json() for thing in self.things]
-        return json.dumps(states)
+        return json_codec.dumps(states)
 
     def invoke(self, command: Dict) -> Any:
         thing_name = command.get("name")
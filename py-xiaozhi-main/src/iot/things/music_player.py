@@ -1,5 +1,7 @@
 from src.application import Application
 from src.constants.constants import DeviceState, AudioConfig
+from src.audio_codecs.audio_codec import negotiate_stream_format
+from src.audio_codecs.audio_resampler import AudioFormatConverter
 from src.iot.thing import Thing, Parameter, ValueType
 import os
 import requests
@@ -594,14 +596,23 @@ class MusicPlayer(Thing):
         """
         try:
             buffer_size = AudioConfig.OUTPUT_FRAME_SIZE  # 增加读取缓冲区大小提高效率
-            
+            # 管道读取的长度不一定是完整采样的整数倍，不足一个采样的尾部留到下一次
+            sample_bytes = 2 * AudioConfig.CHANNELS
+            remainder = b""
+
             while not self.stop_event.is_set():
                 # 读取固定大小的数据块
                 chunk = process.stdout.read(buffer_size)
                 if not chunk:
+                    # 流结束时剩下的不完整采样直接丢弃
                     break
-                # 将数据块放入队列
-                self.audio_decode_queue.put(chunk)
+                if remainder:
+                    chunk = remainder + chunk
+                aligned = len(chunk) - len(chunk) % sample_bytes
+                remainder = chunk[aligned:]
+                if aligned:
+                    # 将数据块放入队列
+                    self.audio_decode_queue.put(chunk[:aligned])
         except Exception as e:
             logger.error(f"解码过程中出错: {str(e)}")
         finally:
@@ -613,12 +624,26 @@ class MusicPlayer(Thing):
         try:
             # 初始化PyAudio
             self.pyaudio = pyaudio.PyAudio()
+
+            # 按扬声器支持的格式打开，FFmpeg 输出的数据在播放前转换
+            device_index = int(
+                self.pyaudio.get_default_output_device_info()["index"]
+            )
+            rate, channels = negotiate_stream_format(
+                self.pyaudio, device_index, False,
+                AudioConfig.OUTPUT_SAMPLE_RATE, AudioConfig.CHANNELS
+            )
+            converter = AudioFormatConverter(
+                AudioConfig.OUTPUT_SAMPLE_RATE, rate,
+                AudioConfig.CHANNELS, channels
+            )
             self.stream = self.pyaudio.open(
                 format=pyaudio.paInt16,
-                channels=AudioConfig.CHANNELS,
-                rate=AudioConfig.OUTPUT_SAMPLE_RATE,
+                channels=channels,
+                rate=rate,
                 output=True,
-                frames_per_buffer=AudioConfig.OUTPUT_FRAME_SIZE
+                output_device_index=device_index,
+                frames_per_buffer=int(rate * AudioConfig.FRAME_DURATION / 1000)
             )
 
             logger.info("开始播放音频流...")
@@ -660,13 +685,13 @@ class MusicPlayer(Thing):
                     last_data_time = time.time()
                     
                     if chunk is None:
-                        if self._check_stream_end(self.stream, total_chunks):
+                        if self._check_stream_end(self.stream, converter, total_chunks):
                             break
                         continue
 
                     # 播放音频数据
                     if not self.stop_event.is_set():
-                        self.stream.write(chunk)
+                        self.stream.write(converter.process(chunk).tobytes())
                         total_chunks += 1
 
                         if not playback_started and total_chunks > 5:
@@ -744,12 +769,13 @@ class MusicPlayer(Thing):
         
         return paused_for_tts, pause_start_time, total_pause_time
 
-    def _check_stream_end(self, stream, total_chunks):
+    def _check_stream_end(self, stream, converter, total_chunks):
         """
         检查音频流是否结束
         
         参数:
             stream: 音频流
+            converter: 播放前的格式转换器
             total_chunks: 已播放的数据块数量
             
         返回:
@@ -761,7 +787,7 @@ class MusicPlayer(Thing):
             try:
                 next_chunk = self.audio_decode_queue.get(timeout=2)
                 if next_chunk is not None:
-                    stream.write(next_chunk)
+                    stream.write(converter.process(next_chunk).tobytes())
                     return False
             except queue.Empty:
                 # 确认没有更多数据，可以结束播放
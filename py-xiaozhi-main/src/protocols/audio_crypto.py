@@ -0,0 +1,74 @@
+import struct
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+NONCE_SIZE = 16
+_BLOCK_SIZE = 16
+
+
+class AudioCryptoContext:
+    """UDP 音频通道的 AES-CTR 加解密上下文
+
+    每个会话创建一次：密钥只解析一次，nonce 模板预先分配，
+    发送时原地更新其中的长度和序列号字段，密文写入可复用的输出缓冲区。
+
+    nonce 格式（16字节）:
+        0-1: 服务器下发 nonce 的固定前缀
+        2-3: 载荷长度（uint16，网络字节序）
+        4-11: 服务器下发 nonce 的原始内容
+        12-15: 序列号（uint32，网络字节序）
+    """
+
+    def __init__(self, key_hex, nonce_hex):
+        """
+        初始化加解密上下文
+
+        参数:
+            key_hex: 服务器下发的十六进制 AES 密钥
+            nonce_hex: 服务器下发的十六进制 nonce
+        """
+        self._algorithm = algorithms.AES(bytes.fromhex(key_hex))
+        self._nonce = bytearray(bytes.fromhex(nonce_hex)[:NONCE_SIZE])
+        self._packet = bytearray(NONCE_SIZE + 1024)
+
+    def encrypt_packet(self, payload, sequence):
+        """
+        加密一个音频包
+
+        参数:
+            payload: Opus 数据
+            sequence: 包序列号
+
+        返回:
+            memoryview: nonce + 密文，指向内部缓冲区，下一次加密前有效
+        """
+        size = len(payload)
+        struct.pack_into(">H", self._nonce, 2, size)
+        struct.pack_into(">I", self._nonce, 12, sequence & 0xFFFFFFFF)
+
+        # update_into 要求输出缓冲区比输入多留出一个分组
+        required = NONCE_SIZE + size + _BLOCK_SIZE - 1
+        if len(self._packet) < required:
+            self._packet = bytearray(required * 2)
+
+        self._packet[:NONCE_SIZE] = self._nonce
+        encryptor = Cipher(self._algorithm, modes.CTR(bytes(self._nonce))).encryptor()
+        packet_view = memoryview(self._packet)
+        written = encryptor.update_into(payload, packet_view[NONCE_SIZE:])
+        encryptor.finalize()
+        return packet_view[:NONCE_SIZE + written]
+
+    def decrypt_packet(self, packet):
+        """
+        解密一个音频包
+
+        参数:
+            packet: nonce + 密文
+
+        返回:
+            bytes: 解密后的 Opus 数据
+        """
+        decryptor = Cipher(
+            self._algorithm, modes.CTR(bytes(packet[:NONCE_SIZE]))
+        ).decryptor()
+        return decryptor.update(packet[NONCE_SIZE:]) + decryptor.finalize()
@@ -0,0 +1,66 @@
+import struct
+
+# WebSocket 二进制帧协议版本
+PROTOCOL_VERSION_RAW = 1  # 二进制消息就是 Opus 数据
+PROTOCOL_VERSION_FRAMED = 2  # 二进制消息带有下面的帧头
+
+# 帧头（16字节，网络字节序）:
+#     0-1: 协议版本（uint16）
+#     2-3: 帧类型（uint16），见 FrameType
+#     4-7: 保留（uint32）
+#     8-11: 时间戳（uint32，毫秒）
+#     12-15: 载荷长度（uint32）
+_HEADER = struct.Struct(">HHIII")
+HEADER_SIZE = _HEADER.size
+
+
+class FrameType:
+    """二进制帧的载荷类型"""
+    OPUS = 0
+    JSON = 1
+
+
+def pack_frame(payload, timestamp, frame_type=FrameType.OPUS):
+    """
+    把载荷打包为 v2 二进制帧
+
+    参数:
+        payload: 载荷数据
+        timestamp: 时间戳（毫秒），按 uint32 回绕
+        frame_type: 载荷类型，见 FrameType
+
+    返回:
+        bytearray: 帧头 + 载荷
+    """
+    size = len(payload)
+    frame = bytearray(HEADER_SIZE + size)
+    _HEADER.pack_into(
+        frame, 0,
+        PROTOCOL_VERSION_FRAMED, frame_type, 0,
+        timestamp & 0xFFFFFFFF, size
+    )
+    frame[HEADER_SIZE:] = payload
+    return frame
+
+
+def unpack_frame(data):
+    """
+    解析 v2 二进制帧
+
+    参数:
+        data: 收到的二进制消息
+
+    返回:
+        tuple: (帧类型, 时间戳, 载荷)，载荷是指向 data 的 memoryview
+
+    异常:
+        ValueError: 帧头无效或长度不符
+    """
+    if len(data) < HEADER_SIZE:
+        raise ValueError(f"帧长度不足: {len(data)}")
+    version, frame_type, _, timestamp, size = _HEADER.unpack_from(data, 0)
+    if version != PROTOCOL_VERSION_FRAMED:
+        raise ValueError(f"不支持的帧版本: {version}")
+    if HEADER_SIZE + size > len(data):
+        raise ValueError(f"载荷长度不符: {size} > {len(data) - HEADER_SIZE}")
+    return frame_type, timestamp, memoryview(data)[HEADER_SIZE:HEADER_SIZE + size]
@@ -1,31 +1,54 @@
 import asyncio
-import json
 import logging
-import time
-import uuid
-import socket
+import struct
 import threading
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
 import paho.mqtt.client as mqtt
 from src.utils.config_manager import ConfigManager
 from src.protocols.protocol import Protocol
+from src.protocols.audio_crypto import AudioCryptoContext, NONCE_SIZE
+from src.protocols.sequence_tracker import SequenceTracker
 from src.constants.constants import AudioConfig
+from src.utils import json_codec
 
 
 # 配置日志
 logger = logging.getLogger("MqttProtocol")
 
+# 等待消息发出的最长时间（秒）
+PUBLISH_TIMEOUT = 10.0
+
+
+class _UdpAudioProtocol(asyncio.DatagramProtocol):
+    """UDP音频通道，收包、解密和分发都在事件循环中完成"""
+
+    def __init__(self, owner):
+        self.owner = owner
+
+    def datagram_received(self, data, addr):
+        self.owner._handle_udp_packet(data)
+
+    def error_received(self, exc):
+        logger.warning(f"UDP通道错误: {exc}")
+
+    def connection_lost(self, exc):
+        if exc:
+            logger.warning(f"UDP通道已断开: {exc}")
+        logger.info("UDP通道已关闭")
+
 
 class MqttProtocol(Protocol):
     def __init__(self, loop):
-        super().__init__()
-        self.loop = loop
+        super().__init__(loop)
         self.config = ConfigManager.get_instance()  # 在这里实例化
         self.mqtt_client = None
-        self.udp_socket = None
-        self.udp_thread = None
-        self.udp_running = False
+        self.mqtt_connected = False  # MQTT控制连接是否可用，在多次对话之间保持
+        self._connect_lock = None  # 在事件循环中创建
+        # 等待发出的消息: mid -> Future，由 on_publish 回调在网络线程中完成
+        self._pending_publishes = {}
+        self._published_mids = set()  # publish() 返回前就已经发出的消息
+        self._publish_lock = threading.RLock()
+        self.udp_transport = None
+        self._udp_packet_count = 0
 
         # MQTT配置
         self.endpoint = None
@@ -40,21 +63,35 @@ class MqttProtocol(Protocol):
         self.udp_port = 0
         self.aes_key = None
         self.aes_nonce = None
+        self.crypto = None  # 当前会话的加解密上下文
         self.local_sequence = 0
         self.remote_sequence = 0
+        self.sequence_tracker = SequenceTracker()
 
         # 事件
         self.server_hello_event = asyncio.Event()
 
+    async def prepare(self):
+        """预先建立MQTT控制连接，唤醒后只需交换hello即可开始对话"""
+        return await self.connect()
+
     async def connect(self):
-        """连接到MQTT服务器"""
-        # 重置hello事件
-        self.server_hello_event = asyncio.Event()
+        """建立MQTT控制连接，连接已可用时直接返回"""
+        if self.mqtt_client and self.mqtt_connected:
+            return True
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.mqtt_client and self.mqtt_connected:
+                return True
+            return await self._connect_mqtt()
 
+    async def _connect_mqtt(self):
+        """创建MQTT客户端并连接到服务器"""
         # 首先尝试获取MQTT配置
         try:
-            # 尝试从OTA服务器获取MQTT配置
-            mqtt_config = self.config.get_config("SYSTEM_OPTIONS.NETWORK.MQTT_INFO")
+            # 优先使用已保存的MQTT配置，首次运行时等待OTA请求完成
+            mqtt_config = await self.config.get_mqtt_info_async()
 
             # 更新MQTT配置
             self.endpoint = mqtt_config.get("endpoint")
@@ -71,17 +108,11 @@ class MqttProtocol(Protocol):
         # 验证MQTT配置
         if not self.endpoint or not self.username or not self.password or not self.publish_topic or not self.subscribe_topic:
             logger.error("MQTT配置不完整")
-            if self.on_network_error:
-                await self.on_network_error("MQTT配置不完整")
+            await self._report_network_error("MQTT配置不完整")
             return False
 
-        # 如果已有MQTT客户端，先断开连接
-        if self.mqtt_client:
-            try:
-                self.mqtt_client.loop_stop()
-                self.mqtt_client.disconnect()
-            except:
-                pass
+        # 如果已有不可用的MQTT客户端，先断开连接
+        self._stop_mqtt_client()
 
         # 创建新的MQTT客户端
         self.mqtt_client = mqtt.Client(
@@ -104,20 +135,30 @@ class MqttProtocol(Protocol):
         # 创建连接Future
         connect_future = self.loop.create_future()
 
+        def resolve_connect(result):
+            # paho 自动重连时会再次回调，此时 Future 已经完成
+            if not connect_future.done():
+                if isinstance(result, Exception):
+                    connect_future.set_exception(result)
+                else:
+                    connect_future.set_result(result)
+
         def on_connect_callback(client, userdata, flags, rc, properties=None):
             if rc == 0:
                 logger.info("已连接到MQTT服务器")
-                self.loop.call_soon_threadsafe(lambda: connect_future.set_result(True))
+                self.mqtt_connected = True
+                self.loop.call_soon_threadsafe(resolve_connect, True)
             else:
                 logger.error(f"连接MQTT服务器失败，返回码: {rc}")
-                self.loop.call_soon_threadsafe(lambda: connect_future.set_exception(
-                    Exception(f"连接MQTT服务器失败，返回码: {rc}")))
+                self.loop.call_soon_threadsafe(
+                    resolve_connect,
+                    Exception(f"连接MQTT服务器失败，返回码: {rc}")
+                )
 
         def on_message_callback(client, userdata, msg):
             try:
-                payload = msg.payload.decode('utf-8')
-
-                self._handle_mqtt_message(payload)
+                # 原始字节直接解析，不先解码为字符串
+                self._handle_mqtt_message(msg.payload)
             except Exception as e:
                 logger.error(f"处理MQTT消息时出错: {e}")
 
@@ -131,24 +172,32 @@ class MqttProtocol(Protocol):
             """
             try:
                 logger.info(f"MQTT连接已断开，返回码: {rc}")
-                self.connected = False
-
-                # 停止UDP接收线程
-                self._stop_udp_receiver()
+                self.mqtt_connected = False
+                self._fail_pending_publishes(Exception(f"MQTT连接已断开，返回码: {rc}"))
 
-                # 通知音频通道关闭
-                if self.on_audio_channel_closed:
+                # 控制连接断开时，正在进行的音频会话也随之中断，交给重连监督器恢复
+                if self.udp_transport is not None:
                     asyncio.run_coroutine_threadsafe(
-                        self.on_audio_channel_closed(),
+                        self._session_lost(f"MQTT连接已断开，返回码: {rc}"),
                         self.loop
                     )
             except Exception as e:
                 logger.error(f"断开MQTT连接失败: {e}")
 
+        def on_publish_callback(client, userdata, mid, *args):
+            """消息已写入网络（QoS 0）或已收到确认（QoS 1/2）"""
+            with self._publish_lock:
+                future = self._pending_publishes.pop(mid, None)
+                if future is None:
+                    self._published_mids.add(mid)
+                    return
+            self.loop.call_soon_threadsafe(self._resolve_publish, future, None)
+
         # 设置回调
         self.mqtt_client.on_connect = on_connect_callback
         self.mqtt_client.on_message = on_message_callback
         self.mqtt_client.on_disconnect = on_disconnect_callback
+        self.mqtt_client.on_publish = on_publish_callback
 
         try:
             # 连接MQTT服务器
@@ -158,7 +207,17 @@ class MqttProtocol(Protocol):
 
             # 等待连接完成
             await asyncio.wait_for(connect_future, timeout=10.0)
+            return True
 
+        except Exception as e:
+            logger.error(f"连接MQTT服务器失败: {e}")
+            await self._report_network_error(f"连接MQTT服务器失败: {e}")
+            return False
+
+    async def _open_audio_session(self):
+        """通过已建立的控制连接交换hello，并创建UDP音频通道"""
+        self.server_hello_event = asyncio.Event()
+        try:
             # 发送hello消息
             hello_message = {
                 "type": "hello",
@@ -173,7 +232,8 @@ class MqttProtocol(Protocol):
             }
 
             # 发送消息并等待响应
-            if not await self.send_text(json.dumps(hello_message)):
+            # hello 属于会话建立过程，重连期间也直接发送
+            if not await self._publish_batch([json_codec.dumps(hello_message)]):
                 logger.error("发送hello消息失败")
                 return False
 
@@ -181,51 +241,45 @@ class MqttProtocol(Protocol):
                 await asyncio.wait_for(self.server_hello_event.wait(), timeout=10.0)
             except asyncio.TimeoutError:
                 logger.error("等待服务器hello消息超时")
-                if self.on_network_error:
-                    await self.on_network_error("等待响应超时")
+                await self._report_network_error("等待响应超时")
                 return False
 
-            # 创建UDP套接字
+            # 创建UDP通道
             try:
-                if self.udp_socket:
-                    self.udp_socket.close()
-
-                self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                self.udp_socket.settimeout(0.5)
-
-                # 启动UDP接收线程
-                if self.udp_thread and self.udp_thread.is_alive():
-                    self.udp_running = False
-                    self.udp_thread.join(1.0)
-
-                self.udp_running = True
-                self.udp_thread = threading.Thread(target=self._udp_receive_thread)
-                self.udp_thread.daemon = True
-                self.udp_thread.start()
-
+                self._close_udp_transport()
+                self.udp_transport, _ = await self.loop.create_datagram_endpoint(
+                    lambda: _UdpAudioProtocol(self),
+                    remote_addr=(self.udp_server, self.udp_port)
+                )
+                logger.info(f"UDP通道已打开: {self.udp_server}:{self.udp_port}")
                 return True
             except Exception as e:
                 logger.error(f"创建UDP套接字失败: {e}")
-                if self.on_network_error:
-                    await self.on_network_error(f"创建UDP连接失败: {e}")
+                await self._report_network_error(f"创建UDP连接失败: {e}")
                 return False
 
         except Exception as e:
-            logger.error(f"连接MQTT服务器失败: {e}")
-            if self.on_network_error:
-                await self.on_network_error(f"连接MQTT服务器失败: {e}")
+            logger.error(f"打开音频会话失败: {e}")
+            await self._report_network_error(f"打开音频会话失败: {e}")
             return False
 
     def _handle_mqtt_message(self, payload):
         """处理MQTT消息"""
         try:
-            data = json.loads(payload)
+            data = json_codec.loads(payload)
+        except ValueError:
+            logger.error(f"无效的JSON数据: {payload}")
+            return
+
+        try:
             msg_type = data.get("type")
 
             if msg_type == "goodbye":
                 # 处理goodbye消息
                 session_id = data.get("session_id")
                 if not session_id or session_id == self.session_id:
+                    # 服务器主动结束会话，不需要重连
+                    self.loop.call_soon_threadsafe(self.reconnect.cancel)
                     # 在主事件循环中执行清理
                     asyncio.run_coroutine_threadsafe(self._handle_goodbye(), self.loop)
                 return
@@ -251,10 +305,12 @@ class MqttProtocol(Protocol):
                 self.udp_port = udp.get("port")
                 self.aes_key = udp.get("key")
                 self.aes_nonce = udp.get("nonce")
+                self.crypto = AudioCryptoContext(self.aes_key, self.aes_nonce)
 
                 # 重置序列号
                 self.local_sequence = 0
                 self.remote_sequence = 0
+                self.sequence_tracker.reset()
 
                 logger.info(f"收到服务器hello响应，UDP服务器: {self.udp_server}:{self.udp_port}")
 
@@ -278,89 +334,119 @@ class MqttProtocol(Protocol):
                             self.on_incoming_json(json_data)
 
                     self.loop.call_soon_threadsafe(process_json)
-        except json.JSONDecodeError:
-            logger.error(f"无效的JSON数据: {payload}")
         except Exception as e:
             logger.error(f"处理MQTT消息时出错: {e}")
 
-    def _udp_receive_thread(self):
-        """UDP接收线程
-
-        参考 audio_player.py 的实现方式
-        """
-        logger.info(f"UDP接收线程已启动，监听来自 {self.udp_server}:{self.udp_port} 的数据")
+    def _handle_udp_packet(self, data):
+        """处理收到的UDP音频包（在事件循环中调用）"""
+        # 验证数据包
+        if len(data) < NONCE_SIZE:  # 至少需要16字节的nonce
+            logger.error(f"无效的音频数据包大小: {len(data)}")
+            return
+        crypto = self.crypto
+        if not crypto:
+            return
+
+        # 序列号位于nonce的最后4字节，重复和过期的包不再解密
+        sequence = struct.unpack_from(">I", data, 12)[0]
+        if not self.sequence_tracker.check(sequence):
+            return
+        self.remote_sequence = self.sequence_tracker.highest
 
-        self.udp_running = True
-        debug_counter = 0
-
-        while self.udp_running:
-            try:
-                data, addr = self.udp_socket.recvfrom(4096)
-                debug_counter += 1
-
-                try:
-                    # 验证数据包
-                    if len(data) < 16:  # 至少需要16字节的nonce
-                        logger.error(f"无效的音频数据包大小: {len(data)}")
-                        continue
-
-                    # 分离nonce和加密数据
-                    received_nonce = data[:16]
-                    encrypted_audio = data[16:]
-
-                    # 使用AES-CTR解密
-                    decrypted = self.aes_ctr_decrypt(
-                        bytes.fromhex(self.aes_key),
-                        received_nonce,
-                        encrypted_audio
-                    )
+        try:
+            # 使用会话的AES-CTR上下文解密
+            decrypted = crypto.decrypt_packet(data)
+        except Exception as e:
+            logger.error(f"处理音频数据包错误: {e}")
+            return
 
-                    # 调试信息
-                    if debug_counter % 100 == 0:
-                        logger.debug(f"已解密音频数据包 #{debug_counter}, 大小: {len(decrypted)} 字节")
+        self._udp_packet_count += 1
+        if self._udp_packet_count % 100 == 0:
+            logger.debug(
+                f"已解密音频数据包 #{self._udp_packet_count}, 大小: {len(decrypted)} 字节"
+            )
 
-                    # 处理解密后的音频数据
-                    if self.on_incoming_audio:
-                        def process_audio(audio_data=decrypted):
+        # 处理解密后的音频数据，序列号交给抖动缓冲区重新排序
+        if self.on_incoming_audio:
+            if asyncio.iscoroutinefunction(self.on_incoming_audio):
+                asyncio.create_task(self.on_incoming_audio(decrypted, sequence))
+            else:
+                self.on_incoming_audio(decrypted, sequence)
+
+    def get_receive_stats(self):
+        """获取接收端的丢包、乱序和重复统计"""
+        return self.sequence_tracker.get_stats()
+
+    @staticmethod
+    def _resolve_publish(future, error):
+        """在事件循环中完成等待发送的 Future"""
+        if future.done():
+            return
+        if error is None:
+            future.set_result(True)
+        else:
+            future.set_exception(error)
+
+    def _publish(self, message):
+        """
+        发布一条消息，不等待其发出
 
-                            if asyncio.iscoroutinefunction(self.on_incoming_audio):
-                                coro = self.on_incoming_audio(audio_data)
-                                if coro is not None:
-                                    asyncio.create_task(coro)
-                            else:
-                                self.on_incoming_audio(audio_data)
+        返回:
+            asyncio.Future: 消息发出后完成
+        """
+        future = self.loop.create_future()
+        with self._publish_lock:
+            info = self.mqtt_client.publish(self.publish_topic, message)
+            if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                raise Exception(mqtt.error_string(info.rc))
+            if info.mid in self._published_mids:
+                self._published_mids.discard(info.mid)
+                future.set_result(True)
+            else:
+                self._pending_publishes[info.mid] = future
+        return future
+
+    def _fail_pending_publishes(self, error):
+        """连接断开时结束所有等待发送的消息"""
+        with self._publish_lock:
+            futures = list(self._pending_publishes.values())
+            self._pending_publishes.clear()
+            self._published_mids.clear()
+        for future in futures:
+            self.loop.call_soon_threadsafe(self._resolve_publish, future, error)
 
-                        self.loop.call_soon_threadsafe(process_audio)
+    async def send_text(self, message):
+        """发送文本消息，等待发出期间不阻塞事件循环"""
+        return await self.send_text_batch([message])
 
-                except Exception as e:
-                    logger.error(f"处理音频数据包错误: {e}")
-                    continue
+    async def send_text_batch(self, messages):
+        """
+        连续发布多条消息，最后一起等待全部发出
 
-            except socket.timeout:
-                # 超时是正常的，继续循环
-                pass
-            except Exception as e:
-                logger.error(f"UDP接收线程错误: {e}")
-                if not self.udp_running:
-                    break
-                time.sleep(0.1)  # 避免在错误情况下过度消耗CPU
+        参数:
+            messages: 文本消息列表
 
-        logger.info("UDP接收线程已停止")
+        返回:
+            bool: 是否全部发送成功
+        """
+        # 正在重连时先缓存，恢复后补发
+        if all(self.reconnect.buffer(message) for message in messages):
+            return True
+        return await self._publish_batch(messages)
 
-    async def send_text(self, message):
-        """发送文本消息"""
+    async def _publish_batch(self, messages):
+        """发布消息并等待全部发出"""
         if not self.mqtt_client:
             logger.error("MQTT客户端未初始化")
             return False
 
         try:
-            result = self.mqtt_client.publish(self.publish_topic, message)
-            result.wait_for_publish()
+            futures = [self._publish(message) for message in messages]
+            await asyncio.wait_for(asyncio.gather(*futures), timeout=PUBLISH_TIMEOUT)
             return True
         except Exception as e:
             logger.error(f"发送MQTT消息失败: {e}")
-            if self.on_network_error:
-                await self.on_network_error(f"发送MQTT消息失败: {e}")
+            await self._report_network_error(f"发送MQTT消息失败: {e}")
             return False
 
     async def send_audio(self, audio_data):
@@ -368,53 +454,45 @@ class MqttProtocol(Protocol):
 
         参考 audio_sender.py 的实现方式
         """
-        if not self.udp_socket or not self.udp_server or not self.udp_port:
+        if (not self.udp_transport or self.udp_transport.is_closing()
+                or not self.crypto):
             logger.error("UDP通道未初始化")
             return False
 
         try:
-            # 生成新的nonce (类似于 audio_sender.py 中的实现)
-            # 格式: 0x01 (1字节) + 0x00 (3字节) + 长度 (2字节) + 原始nonce (8字节) + 序列号 (8字节)
+            # nonce 中的长度和序列号在预分配的模板中原地更新
             self.local_sequence = (self.local_sequence + 1) & 0xFFFFFFFF
-            new_nonce = (
-                    self.aes_nonce[:4] +  # 固定前缀
-                    format(len(audio_data), '04x') +  # 数据长度
-                    self.aes_nonce[8:24] +  # 原始nonce
-                    format(self.local_sequence, '08x')  # 序列号
-            )
-
-            encrypt_encoded_data = self.aes_ctr_encrypt(
-                bytes.fromhex(self.aes_key),
-                bytes.fromhex(new_nonce),
-                bytes(audio_data)
-            )
+            packet = self.crypto.encrypt_packet(audio_data, self.local_sequence)
 
-            # 拼接nonce和密文
-            packet = bytes.fromhex(new_nonce) + encrypt_encoded_data
-
-            # 发送数据包
-            self.udp_socket.sendto(packet, (self.udp_server, self.udp_port))
+            # 发送数据包，由传输层缓冲，不会阻塞事件循环
+            self.udp_transport.sendto(packet)
 
             # 每发送10个包打印一次日志
             if self.local_sequence % 10 == 0:
                 logger.info(f"已发送音频数据包，序列号: {self.local_sequence}，目标: {self.udp_server}:{self.udp_port}")
 
-            self.local_sequence += 1
             return True
         except Exception as e:
             logger.error(f"发送音频数据失败: {e}")
-            if self.on_network_error:
-                asyncio.create_task(self.on_network_error(f"发送音频数据失败: {e}"))
+            asyncio.create_task(self._report_network_error(f"发送音频数据失败: {e}"))
             return False
 
     async def open_audio_channel(self):
-        """打开音频通道"""
-        if not self.mqtt_client:
-            return await self.connect()
-        return True
+        """打开音频通道
+
+        复用已建立的MQTT控制连接，只在需要时才重新连接，
+        每次对话只交换hello并创建UDP通道。
+        """
+        if self.is_audio_channel_opened():
+            return True
+        if not await self.connect():
+            return False
+        return await self._open_audio_session()
 
     async def close_audio_channel(self):
-        """关闭音频通道"""
+        """关闭音频通道，MQTT控制连接保持不变"""
+        self.reconnect.cancel()
+        self.uplink.clear()
         try:
             # 如果有会话ID，发送goodbye消息
             if self.session_id:
@@ -422,7 +500,7 @@ class MqttProtocol(Protocol):
                     "type": "goodbye",
                     "session_id": self.session_id
                 }
-                await self.send_text(json.dumps(goodbye_msg))
+                await self.send_text(json_codec.dumps(goodbye_msg))
 
             # 处理goodbye
             await self._handle_goodbye()
@@ -435,107 +513,77 @@ class MqttProtocol(Protocol):
 
     def is_audio_channel_opened(self):
         """检查音频通道是否已打开"""
-        return self.udp_socket is not None
-
-    def aes_ctr_encrypt(self, key, nonce, plaintext):
-        """AES-CTR模式加密函数
-        Args:
-            key: bytes格式的加密密钥
-            nonce: bytes格式的初始向量
-            plaintext: 待加密的原始数据
-        Returns:
-            bytes格式的加密数据
-        """
-        cipher = Cipher(algorithms.AES(key), modes.CTR(nonce), backend=default_backend())
-        encryptor = cipher.encryptor()
-        return encryptor.update(plaintext) + encryptor.finalize()
-
-    def aes_ctr_decrypt(self, key, nonce, ciphertext):
-        """AES-CTR模式解密函数
-        Args:
-            key: bytes格式的解密密钥
-            nonce: bytes格式的初始向量（需要与加密时使用的相同）
-            ciphertext: bytes格式的加密数据
-        Returns:
-            bytes格式的解密后的原始数据
-        """
-        cipher = Cipher(algorithms.AES(key), modes.CTR(nonce), backend=default_backend())
-        decryptor = cipher.decryptor()
-        plaintext = decryptor.update(ciphertext) + decryptor.finalize()
-        return plaintext
+        return self.udp_transport is not None
+
+    async def disconnect(self):
+        """结束音频会话并断开MQTT控制连接"""
+        await self.close_audio_channel()
+        self._stop_mqtt_client()
+
+    def _stop_mqtt_client(self):
+        """停止MQTT客户端"""
+        client = self.mqtt_client
+        self.mqtt_client = None
+        self.mqtt_connected = False
+        if client:
+            try:
+                client.loop_stop()
+                client.disconnect()
+            except Exception as e:
+                logger.error(f"断开MQTT连接失败: {e}")
+            self._fail_pending_publishes(Exception("MQTT客户端已停止"))
+
+    async def _session_lost(self, reason):
+        """音频会话意外中断：清理会话状态，由重连监督器决定是否恢复"""
+        if self.udp_transport is None:
+            return
+        await self._handle_goodbye(notify=False)
+        await self._connection_lost(reason)
 
-    async def _handle_goodbye(self):
-        """处理goodbye消息"""
+    async def _handle_goodbye(self, notify=True):
+        """处理goodbye消息，只结束音频会话
+
+        参数:
+            notify: 是否调用音频通道关闭回调
+        """
         try:
-            # 停止UDP接收线程
-            if self.udp_thread and self.udp_thread.is_alive():
-                self.udp_running = False
-                self.udp_thread.join(1.0)
-                self.udp_thread = None
-            logger.info("UDP接收线程已停止")
-
-            # 关闭UDP套接字
-            if self.udp_socket:
-                try:
-                    self.udp_socket.close()
-                except Exception as e:
-                    logger.error(f"关闭UDP套接字失败: {e}")
-                self.udp_socket = None
-
-            # 停止MQTT客户端
-            if self.mqtt_client:
-                try:
-                    self.mqtt_client.loop_stop()
-                    self.mqtt_client.disconnect()
-                    self.mqtt_client.loop_forever()  # 确保断开连接完全完成
-                except Exception as e:
-                    logger.error(f"断开MQTT连接失败: {e}")
-                self.mqtt_client = None
-
-            # 重置所有状态
-            self.connected = False
+            # 关闭UDP通道
+            self._close_udp_transport()
+
+            # 重置会话状态
             self.session_id = None
+            if self.sequence_tracker.received_count:
+                logger.info(f"UDP音频接收统计: {self.get_receive_stats()}")
             self.local_sequence = 0
             self.remote_sequence = 0
             self.udp_server = ""
             self.udp_port = 0
             self.aes_key = None
             self.aes_nonce = None
+            self.crypto = None
 
             # 调用音频通道关闭回调
-            if self.on_audio_channel_closed:
+            if notify and self.on_audio_channel_closed:
                 await self.on_audio_channel_closed()
 
         except Exception as e:
             logger.error(f"处理goodbye消息时出错: {e}")
 
-    def _stop_udp_receiver(self):
-        """停止UDP接收线程和关闭UDP套接字"""
-        # 关闭UDP接收线程
-        if hasattr(self, 'udp_thread') and self.udp_thread and self.udp_thread.is_alive():
-            self.udp_running = False
+    def _close_udp_transport(self):
+        """关闭UDP通道（在事件循环中调用）"""
+        transport = getattr(self, 'udp_transport', None)
+        self.udp_transport = None
+        if transport:
             try:
-                self.udp_thread.join(1.0)
-            except RuntimeError:
-                pass  # 处理线程已经终止的情况
-
-        # 关闭UDP套接字
-        if hasattr(self, 'udp_socket') and self.udp_socket:
-            try:
-                self.udp_socket.close()
-            except:
-                pass
+                transport.close()
+            except Exception as e:
+                logger.error(f"关闭UDP通道失败: {e}")
 
     def __del__(self):
         """析构函数，清理资源"""
-        # 停止UDP接收相关资源
-        self._stop_udp_receiver()
+        # 关闭UDP通道
+        self._close_udp_transport()
 
         # 关闭MQTT客户端
-        if hasattr(self, 'mqtt_client') and self.mqtt_client:
-            try:
-                self.mqtt_client.loop_stop()
-                self.mqtt_client.disconnect()
-                self.mqtt_client.loop_forever()  # 确保断开连接完全完成
-            except Exception as e:
-                pass
+        if hasattr(self, 'mqtt_client'):
+            self._stop_mqtt_client()
@@ -1,10 +1,16 @@
-import json
+import asyncio
 
 from src.constants.constants import AbortReason, ListeningMode
+from src.protocols.reconnect_supervisor import ReconnectSupervisor
+from src.protocols.uplink_queue import UplinkQueue
+from src.utils import json_codec
+from src.utils.config_manager import ConfigManager
+from src.utils.json_codec import RawJson
 
 
 class Protocol:
-    def __init__(self):
+    def __init__(self, loop):
+        self.loop = loop
         self.session_id = ""
         # 初始化回调函数为None
         self.on_incoming_json = None
@@ -12,13 +18,23 @@ class Protocol:
         self.on_audio_channel_opened = None
         self.on_audio_channel_closed = None
         self.on_network_error = None
+        # 会话意外中断时负责重连
+        self.reconnect = ReconnectSupervisor(self)
+        # 上行音频队列，在事件循环中按顺序调用 send_audio
+        self.uplink = UplinkQueue(
+            loop,
+            self.send_audio,
+            ConfigManager.get_instance().get_config(
+                "SYSTEM_OPTIONS.NETWORK.UPLINK_MAX_BYTES", 8192
+            )
+        )
 
     def on_incoming_json(self, callback):
         """设置JSON消息接收回调函数"""
         self.on_incoming_json = callback
 
     def on_incoming_audio(self, callback):
-        """设置音频数据接收回调函数"""
+        """设置音频数据接收回调函数，格式: callback(data, sequence=None)"""
         self.on_incoming_audio = callback
 
     def on_audio_channel_opened(self, callback):
@@ -33,10 +49,44 @@ class Protocol:
         """设置网络错误回调函数"""
         self.on_network_error = callback
 
+    async def prepare(self):
+        """预热连接，在空闲时提前完成耗时的握手，默认不做任何事"""
+        return True
+
+    async def disconnect(self):
+        """断开所有连接，默认只关闭音频通道"""
+        await self.close_audio_channel()
+
+    async def _connection_lost(self, reason):
+        """音频会话意外中断，交给重连监督器，放弃重连时才通知音频通道关闭"""
+        if await self.reconnect.handle_connection_lost(reason):
+            return
+        if self.on_audio_channel_closed:
+            await self.on_audio_channel_closed()
+
+    async def _report_network_error(self, message):
+        """通知网络错误，重连过程中的失败由重连监督器处理，不再上报"""
+        if self.reconnect.resuming or not self.on_network_error:
+            return
+        result = self.on_network_error(message)
+        if asyncio.iscoroutine(result):
+            await result
+
+    def enqueue_audio(self, data):
+        """提交一帧上行音频（可在任意线程中调用），由上行队列在事件循环中按顺序发送"""
+        self.uplink.put(data)
+
     async def send_text(self, message):
         """发送文本消息的抽象方法，需要在子类中实现"""
         raise NotImplementedError("send_text方法必须由子类实现")
 
+    async def send_text_batch(self, messages):
+        """连续发送多条文本消息，子类可以实现为一次性发出后统一等待"""
+        for message in messages:
+            if not await self.send_text(message):
+                return False
+        return True
+
     async def send_abort_speaking(self, reason):
         """发送中止语音的消息"""
         message = {
@@ -45,7 +95,7 @@ class Protocol:
         }
         if reason == AbortReason.WAKE_WORD_DETECTED:
             message["reason"] = "wake_word_detected"
-        await self.send_text(json.dumps(message))
+        await self.send_text(json_codec.dumps(message))
 
     async def send_wake_word_detected(self, wake_word):
         """发送检测到唤醒词的消息"""
@@ -55,7 +105,7 @@ class Protocol:
             "state": "detect",
             "text": wake_word
         }
-        await self.send_text(json.dumps(message))
+        await self.send_text(json_codec.dumps(message))
 
     async def send_start_listening(self, mode):
         """发送开始监听的消息"""
@@ -70,7 +120,7 @@ class Protocol:
             "state": "start",
             "mode": mode_map[mode]
         }
-        await self.send_text(json.dumps(message))
+        await self.send_text(json_codec.dumps(message))
 
     async def send_stop_listening(self):
         """发送停止监听的消息"""
@@ -79,22 +129,27 @@ class Protocol:
             "type": "listen",
             "state": "stop"
         }
-        await self.send_text(json.dumps(message))
+        await self.send_text(json_codec.dumps(message))
 
-    async def send_iot_descriptors(self, descriptors):
-        """发送物联网设备描述信息"""
-        message = {
+    def _iot_message(self, key, value):
+        """构造物联网消息，value 为 JSON 字符串时原样嵌入，不再解析"""
+        return json_codec.dumps({
             "session_id": self.session_id,
             "type": "iot",
-            "descriptors": json.loads(descriptors) if isinstance(descriptors, str) else descriptors
-        }
-        await self.send_text(json.dumps(message))
+            key: RawJson(value) if isinstance(value, (str, bytes)) else value
+        })
+
+    async def send_iot_descriptors(self, descriptors):
+        """发送物联网设备描述信息"""
+        await self.send_text(self._iot_message("descriptors", descriptors))
 
     async def send_iot_states(self, states):
         """发送物联网设备状态信息"""
-        message = {
-            "session_id": self.session_id,
-            "type": "iot",
-            "states": json.loads(states) if isinstance(states, str) else states
-        }
-        await self.send_text(json.dumps(message))
\ No newline at end of file
+        await self.send_text(self._iot_message("states", states))
+
+    async def send_iot_snapshot(self, descriptors, states):
+        """一次性发送物联网设备描述信息和当前状态"""
+        await self.send_text_batch([
+            self._iot_message("descriptors", descriptors),
+            self._iot_message("states", states),
+        ])
\ No newline at end of file
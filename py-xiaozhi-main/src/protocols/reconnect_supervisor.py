@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+
+from src.utils import json_codec
+
+logger = logging.getLogger("ReconnectSupervisor")
+
+
+class ReconnectSupervisor:
+    """音频会话的断线重连
+
+    会话意外中断时（网络抖动、发送失败、服务器断开连接），按指数退避加随机抖动
+    重新打开音频通道，避免大量设备同时重连。重连期间发出的控制消息先缓存起来，
+    恢复后按顺序补发；IoT 描述信息和状态由音频通道打开回调重新发送。
+    主动关闭音频通道时调用 cancel()，不会触发重连。
+    """
+
+    def __init__(self, protocol, initial_delay=0.5, max_delay=8.0,
+                 max_attempts=5, buffer_limit=32, buffer_ttl=15.0):
+        """
+        初始化重连监督器
+
+        参数:
+            protocol: 所属的 Protocol
+            initial_delay: 第一次重连前的最大等待时间（秒）
+            max_delay: 退避等待时间的上限（秒）
+            max_attempts: 放弃前最多尝试的次数
+            buffer_limit: 重连期间最多缓存的控制消息数
+            buffer_ttl: 缓存消息的有效期（秒），超过后不再补发
+        """
+        self.protocol = protocol
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.buffer_limit = buffer_limit
+        self.buffer_ttl = buffer_ttl
+
+        self._task = None
+        self._resuming = False
+        self._buffer = deque()  # (缓存时间, 消息)
+
+        # 回调
+        self.on_reconnecting = None  # 开始重连时调用: callback(reason)
+        self.on_resumed = None  # 会话恢复后调用
+
+        # 统计信息
+        self.reconnect_count = 0
+        self.failure_count = 0
+
+    @property
+    def resuming(self):
+        """是否正在重连"""
+        return self._resuming
+
+    def buffer(self, message):
+        """
+        重连期间缓存一条控制消息
+
+        返回:
+            bool: 已缓存时返回 True，调用方不再发送
+        """
+        if not self.resuming:
+            return False
+        if len(self._buffer) >= self.buffer_limit:
+            self._buffer.popleft()
+            logger.warning("重连期间缓存的消息过多，丢弃最早的一条")
+        self._buffer.append((time.monotonic(), message))
+        return True
+
+    async def handle_connection_lost(self, reason):
+        """
+        会话意外中断时由协议调用
+
+        返回:
+            bool: 已开始（或正在）重连时返回 True
+        """
+        if self.max_attempts <= 0:
+            return False
+        if self.resuming:
+            return True
+
+        logger.warning(f"音频会话中断: {reason}，准备重连")
+        self._resuming = True
+        self._task = asyncio.create_task(self._reconnect_loop())
+        if self.on_reconnecting:
+            await self.on_reconnecting(reason)
+        return True
+
+    def cancel(self):
+        """停止重连并丢弃缓存的消息（主动关闭音频通道时调用）"""
+        task = self._task
+        self._task = None
+        self._resuming = False
+        if task and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+        self._buffer.clear()
+
+    async def _reconnect_loop(self):
+        """按指数退避重连，成功后补发缓存的消息"""
+        delay = self.initial_delay
+        for attempt in range(1, self.max_attempts + 1):
+            # 完全随机抖动，分散同时掉线的设备的重连时间
+            await asyncio.sleep(random.uniform(0, delay))
+            logger.info(f"正在重连（第 {attempt}/{self.max_attempts} 次）")
+            try:
+                success = await self.protocol.open_audio_channel()
+            except Exception as e:
+                logger.error(f"重连失败: {e}")
+                success = False
+
+            if success:
+                self._resuming = False
+                self.reconnect_count += 1
+                logger.info("音频会话已恢复")
+                await self._flush_buffer()
+                if self.on_resumed:
+                    await self.on_resumed()
+                return
+            delay = min(self.max_delay, delay * 2)
+
+        self._resuming = False
+        self.failure_count += 1
+        logger.error(f"重连 {self.max_attempts} 次仍未成功，放弃")
+        self._buffer.clear()
+        if self.protocol.on_audio_channel_closed:
+            await self.protocol.on_audio_channel_closed()
+
+    async def _flush_buffer(self):
+        """补发重连期间缓存的消息，会话ID更新为新会话的ID"""
+        now = time.monotonic()
+        while self._buffer:
+            queued_at, message = self._buffer.popleft()
+            if now - queued_at > self.buffer_ttl:
+                continue
+            try:
+                data = json_codec.loads(message)
+                if isinstance(data, dict) and "session_id" in data:
+                    data["session_id"] = self.protocol.session_id
+                    message = json_codec.dumps(data)
+            except ValueError:
+                pass
+            await self.protocol.send_text(message)
@@ -0,0 +1,84 @@
+class SequenceTracker:
+    """接收端的序列号校验
+
+    使用滑动窗口位图记录最近收到的序列号（与 SRTP 的重放窗口相同的做法），
+    丢弃重复包和落后窗口之外的过期包，并统计丢包和乱序。
+    窗口内晚到的包仍然接收，由下游的抖动缓冲区按序列号重新排序。
+    """
+
+    def __init__(self, window=64):
+        """
+        初始化序列号校验
+
+        参数:
+            window: 窗口大小，落后最新序列号超过该值的包视为过期
+        """
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        """开始新的会话，清空状态和统计信息"""
+        self.highest = None  # 收到的最大序列号
+        self._bitmap = 0  # 第 i 位表示 highest - i 已收到
+
+        # 统计信息
+        self.received_count = 0
+        self.duplicate_count = 0
+        self.stale_count = 0
+        self.reordered_count = 0
+        self.lost_count = 0  # 尚未收到的包，晚到后会扣除
+
+    def check(self, sequence):
+        """
+        校验一个序列号
+
+        参数:
+            sequence: 包序列号（uint32）
+
+        返回:
+            bool: 是否接收该包
+        """
+        if self.highest is None:
+            self.highest = sequence
+            self._bitmap = 1
+            self.received_count += 1
+            return True
+
+        # 按 32 位无符号整数计算差值，兼容序列号回绕
+        diff = ((sequence - self.highest + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+
+        if diff > 0:
+            # 比之前的都新，中间缺失的包先计为丢失
+            self.lost_count += diff - 1
+            self._bitmap = ((self._bitmap << diff) | 1) & ((1 << self.window) - 1)
+            self.highest = sequence
+            self.received_count += 1
+            return True
+
+        offset = -diff
+        if offset >= self.window:
+            self.stale_count += 1
+            return False
+
+        mask = 1 << offset
+        if self._bitmap & mask:
+            self.duplicate_count += 1
+            return False
+
+        # 窗口内晚到的包
+        self._bitmap |= mask
+        self.reordered_count += 1
+        self.lost_count -= 1
+        self.received_count += 1
+        return True
+
+    def get_stats(self):
+        """获取统计信息"""
+        return {
+            "highest": self.highest,
+            "received": self.received_count,
+            "lost": self.lost_count,
+            "reordered": self.reordered_count,
+            "duplicate": self.duplicate_count,
+            "stale": self.stale_count,
+        }
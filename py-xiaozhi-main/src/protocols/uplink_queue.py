@@ -0,0 +1,126 @@
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger("UplinkQueue")
+
+
+class UplinkQueue:
+    """上行音频发送队列
+
+    编码线程调用 put() 提交 Opus 帧，只在队列从空变为非空时唤醒一次事件循环，
+    事件循环中的单个发送任务按顺序把积压的帧全部发出，而不是每帧创建一个协程。
+    待发送的字节数（含正在发送的一帧）超过上限时丢弃最旧的帧，
+    慢速网络下只会丢掉过时的音频，内存占用和延迟都有上限。
+    """
+
+    def __init__(self, loop, send, max_bytes=8192):
+        """
+        初始化上行队列
+
+        参数:
+            loop: 发送任务所在的事件循环
+            send: 发送一帧的协程函数，例如 Protocol.send_audio
+            max_bytes: 待发送字节数的上限
+        """
+        self.loop = loop
+        self.send = send
+        self.max_bytes = max(1, int(max_bytes))
+
+        self._frames = deque()
+        self._lock = threading.Lock()
+        self._pending_bytes = 0
+        self._in_flight_bytes = 0
+        self._scheduled = False  # 发送任务已启动或即将启动
+        self._task = None
+
+        # 统计信息
+        self.enqueued_count = 0
+        self.sent_count = 0
+        self.dropped_count = 0
+        self.dropped_bytes = 0
+        self.max_pending_bytes = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    def put(self, frame):
+        """
+        提交一帧数据（可在任意线程中调用）
+
+        参数:
+            frame: Opus 编码数据
+        """
+        with self._lock:
+            self._frames.append(frame)
+            self._pending_bytes += len(frame)
+            self.enqueued_count += 1
+
+            # 超出上限时丢弃最旧的帧，至少保留刚提交的一帧
+            previous = self.dropped_count
+            while (self._pending_bytes + self._in_flight_bytes > self.max_bytes
+                   and len(self._frames) > 1):
+                dropped = self._frames.popleft()
+                self._pending_bytes -= len(dropped)
+                self.dropped_count += 1
+                self.dropped_bytes += len(dropped)
+
+            pending = self._pending_bytes + self._in_flight_bytes
+            if pending > self.max_pending_bytes:
+                self.max_pending_bytes = pending
+
+            wake = not self._scheduled
+            self._scheduled = True
+
+        if self.dropped_count != previous and (
+                previous == 0 or previous // 50 != self.dropped_count // 50):
+            logger.warning(f"上行网络拥塞，累计丢弃 {self.dropped_count} 帧音频")
+
+        if wake:
+            self.loop.call_soon_threadsafe(self._start_sending)
+
+    def clear(self):
+        """丢弃所有待发送的帧"""
+        with self._lock:
+            self._frames.clear()
+            self._pending_bytes = 0
+
+    def pending_bytes(self):
+        """待发送的字节数，包括正在发送的一帧"""
+        return self._pending_bytes + self._in_flight_bytes
+
+    def get_stats(self):
+        """获取统计信息"""
+        return {
+            "depth": len(self._frames),
+            "pending_bytes": self.pending_bytes(),
+            "max_pending_bytes": self.max_pending_bytes,
+            "enqueued": self.enqueued_count,
+            "sent": self.sent_count,
+            "dropped": self.dropped_count,
+            "dropped_bytes": self.dropped_bytes,
+        }
+
+    def _start_sending(self):
+        """启动发送任务（在事件循环中调用）"""
+        if self._task is None or self._task.done():
+            self._task = self.loop.create_task(self._send_pending())
+
+    async def _send_pending(self):
+        """依次发送队列中的帧，队列为空时结束"""
+        while True:
+            with self._lock:
+                if not self._frames:
+                    self._scheduled = False
+                    return
+                frame = self._frames.popleft()
+                self._pending_bytes -= len(frame)
+                self._in_flight_bytes = len(frame)
+
+            try:
+                await self.send(frame)
+                self.sent_count += 1
+            except Exception as e:
+                logger.error(f"发送上行音频失败: {e}")
+            finally:
+                self._in_flight_bytes = 0
@@ -1,10 +1,15 @@
 import asyncio
-import json
 import logging
 import websockets
 
 from src.constants.constants import AudioConfig
+from src.protocols.binary_protocol import (
+    FrameType, PROTOCOL_VERSION_FRAMED, PROTOCOL_VERSION_RAW,
+    pack_frame, unpack_frame
+)
 from src.protocols.protocol import Protocol
+from src.protocols.sequence_tracker import SequenceTracker
+from src.utils import json_codec
 from src.utils.config_manager import ConfigManager
 
 
@@ -12,48 +17,155 @@ logger = logging.getLogger("WebsocketProtocol")
 
 
 class WebsocketProtocol(Protocol):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, loop):
+        super().__init__(loop)
         # 获取配置管理器实例
         self.config = ConfigManager.get_instance()
         self.websocket = None
         self.connected = False
         self.hello_received = None  # 初始化时先设为 None
         self.WEBSOCKET_URL = self.config.get_config("SYSTEM_OPTIONS.NETWORK.WEBSOCKET_URL")
+
+        # 二进制帧协议：配置为 2 时在 hello 中请求带帧头的二进制消息，服务器同意后才启用
+        self.requested_version = self.config.get_config(
+            "SYSTEM_OPTIONS.NETWORK.WEBSOCKET_PROTOCOL_VERSION", PROTOCOL_VERSION_RAW
+        )
+        self.protocol_version = PROTOCOL_VERSION_RAW  # 当前会话实际使用的版本
+        self._session_started_at = 0.0
+        self._first_remote_timestamp = None
+        self._last_transit = None
+        self.sequence_tracker = SequenceTracker()
+        self.jitter_ms = 0.0  # 下行到达时间抖动（RFC 3550 的估计方法）
+
         self.HEADERS = {
             "Authorization": f"Bearer {self.config.get_config('SYSTEM_OPTIONS.NETWORK.WEBSOCKET_ACCESS_TOKEN')}",
-            "Protocol-Version": "1",
+            "Protocol-Version": str(self.requested_version),
             "Device-Id": self.config.get_config("SYSTEM_OPTIONS.DEVICE_ID"),  # 获取设备MAC地址
             "Client-Id": self.config.get_config("SYSTEM_OPTIONS.CLIENT_ID")
         }
 
+        # 备用连接：空闲时保持一个已完成TLS和认证的连接，唤醒后直接发送hello
+        self.standby_enabled = self.config.get_config(
+            "SYSTEM_OPTIONS.NETWORK.WEBSOCKET_STANDBY", False
+        )
+        self.ping_interval = self.config.get_config(
+            "SYSTEM_OPTIONS.NETWORK.WEBSOCKET_PING_INTERVAL", 20
+        )
+        self.idle_timeout = self.config.get_config(
+            "SYSTEM_OPTIONS.NETWORK.WEBSOCKET_IDLE_TIMEOUT", 300
+        )
+        self._socket_opened_at = 0.0
+        self._socket_lock = None  # 在事件循环中创建
+        self._socket_claimed = False  # connect() 正在用当前连接握手，备用连接任务不能关闭它
+        self._standby_task = None
+        self._standby_wakeup = None
+
+    def _is_socket_open(self) -> bool:
+        """底层连接是否可用"""
+        return self.websocket is not None and self.websocket.close_code is None
+
+    async def _open_socket(self):
+        """建立WebSocket连接（TLS握手和认证），不发送hello"""
+        kwargs = {
+            "ping_interval": self.ping_interval,
+            "ping_timeout": self.ping_interval,
+        }
+        # 建立WebSocket连接 (兼容不同Python版本的写法)
+        try:
+            # 新的写法 (在Python 3.11+版本中)
+            websocket = await websockets.connect(
+                uri=self.WEBSOCKET_URL,
+                additional_headers=self.HEADERS,
+                **kwargs
+            )
+        except TypeError:
+            # 旧的写法 (在较早的Python版本中)
+            websocket = await websockets.connect(
+                self.WEBSOCKET_URL,
+                extra_headers=self.HEADERS,
+                **kwargs
+            )
+
+        self.websocket = websocket
+        self._socket_opened_at = asyncio.get_running_loop().time()
+        # 启动消息处理循环
+        asyncio.create_task(self._message_handler(websocket))
+
+    async def _ensure_socket(self):
+        """需要时建立连接，已有可用的备用连接则直接复用"""
+        if self._socket_lock is None:
+            self._socket_lock = asyncio.Lock()
+        async with self._socket_lock:
+            if self._is_socket_open():
+                logger.info("使用备用WebSocket连接")
+            else:
+                await self._open_socket()
+            # 在释放锁之前标记，握手完成或失败前备用连接任务不会关闭这个连接
+            self._socket_claimed = True
+
+    async def prepare(self):
+        """启用备用连接时，在后台维护一个预先建立好的连接"""
+        if self.standby_enabled and (
+            self._standby_task is None or self._standby_task.done()
+        ):
+            self._standby_wakeup = asyncio.Event()
+            self._standby_task = asyncio.create_task(self._standby_loop())
+        return True
+
+    async def _standby_loop(self):
+        """维护备用连接：断开后重连，空闲超过 idle_timeout 后重建"""
+        loop = asyncio.get_running_loop()
+        while True:
+            wait = self.ping_interval
+            if not self.connected and not self._socket_claimed:
+                try:
+                    if self._socket_lock is None:
+                        self._socket_lock = asyncio.Lock()
+                    async with self._socket_lock:
+                        # 等锁期间连接可能已被 connect() 取走
+                        if not self.connected and not self._socket_claimed:
+                            if self._is_socket_open():
+                                # 服务器可能会关闭长时间空闲的连接，定期换一个新的
+                                if loop.time() - self._socket_opened_at >= self.idle_timeout:
+                                    logger.info("备用WebSocket连接空闲超时，重新建立")
+                                    await self.websocket.close()
+                                    self.websocket = None
+                            if not self._is_socket_open():
+                                await self._open_socket()
+                                logger.info("备用WebSocket连接已就绪")
+                    wait = max(
+                        1.0,
+                        self._socket_opened_at + self.idle_timeout - loop.time()
+                    )
+                except Exception as e:
+                    logger.warning(f"建立备用WebSocket连接失败: {e}")
+
+            # 会话结束或连接断开时会提前唤醒
+            try:
+                await asyncio.wait_for(self._standby_wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            self._standby_wakeup.clear()
+
+    def _wake_standby(self):
+        """通知后台任务检查备用连接"""
+        if self._standby_wakeup is not None:
+            self._standby_wakeup.set()
+
     async def connect(self) -> bool:
-        """连接到WebSocket服务器"""
+        """连接到WebSocket服务器并完成hello握手"""
+        if self.is_audio_channel_opened():
+            return True
         try:
             # 在连接时创建 Event，确保在正确的事件循环中
             self.hello_received = asyncio.Event()
 
-            # 建立WebSocket连接 (兼容不同Python版本的写法)
-            try:
-                # 新的写法 (在Python 3.11+版本中)
-                self.websocket = await websockets.connect(
-                    uri=self.WEBSOCKET_URL, 
-                    additional_headers=self.HEADERS
-                )
-            except TypeError:
-                # 旧的写法 (在较早的Python版本中)
-                self.websocket = await websockets.connect(
-                    self.WEBSOCKET_URL, 
-                    extra_headers=self.HEADERS
-                )
-
-            # 启动消息处理循环
-            asyncio.create_task(self._message_handler())
+            await self._ensure_socket()
 
             # 发送客户端hello消息
             hello_message = {
                 "type": "hello",
-                "version": 1,
+                "version": self.requested_version,
                 "transport": "websocket",
                 "audio_params": {
                     "format": "opus",
@@ -62,7 +174,8 @@ class WebsocketProtocol(Protocol):
                     "frame_duration": AudioConfig.FRAME_DURATION,
                 }
             }
-            await self.send_text(json.dumps(hello_message))
+            # hello 属于会话建立过程，重连期间也直接发送
+            await self.websocket.send(json_codec.dumps(hello_message))
 
             # 等待服务器hello响应
             try:
@@ -75,47 +188,125 @@ class WebsocketProtocol(Protocol):
                 return True
             except asyncio.TimeoutError:
                 logger.error("等待服务器hello响应超时")
-                if self.on_network_error:
-                    self.on_network_error("等待响应超时")
+                # 连接状态未知，丢弃后下次重新建立
+                websocket, self.websocket = self.websocket, None
+                if websocket:
+                    await websocket.close()
+                await self._report_network_error("等待响应超时")
                 return False
 
         except Exception as e:
             logger.error(f"WebSocket连接失败: {e}")
-            if self.on_network_error:
-                self.on_network_error(f"无法连接服务: {str(e)}")
+            await self._report_network_error(f"无法连接服务: {str(e)}")
             return False
+        finally:
+            self._socket_claimed = False
 
-    async def _message_handler(self):
+    async def _message_handler(self, websocket):
         """处理接收到的WebSocket消息"""
         try:
-            async for message in self.websocket:
+            async for message in websocket:
                 if isinstance(message, str):
-                    try:
-                        data = json.loads(message)
-                        msg_type = data.get("type")
-                        if msg_type == "hello":
-                            # 处理服务器 hello 消息
-                            await self._handle_server_hello(data)
-                        else:
-                            if self.on_incoming_json:
-                                self.on_incoming_json(data)
-                    except json.JSONDecodeError as e:
-                        logger.error(f"无效的JSON消息: {message}, 错误: {e}")
+                    await self._handle_json_message(message)
+                elif self.protocol_version >= PROTOCOL_VERSION_FRAMED:
+                    await self._handle_binary_frame(message)
                 elif self.on_incoming_audio:  # 使用 elif 更清晰
                     self.on_incoming_audio(message)
 
+            # 服务器正常关闭连接时迭代直接结束
+            await self._handle_socket_closed(websocket)
         except websockets.ConnectionClosed:
-            logger.info("WebSocket连接已关闭")
-            self.connected = False
-            if self.on_audio_channel_closed:
-                # 使用 schedule 确保回调在主线程中执行
-                await self.on_audio_channel_closed()
+            await self._handle_socket_closed(websocket)
         except Exception as e:
             logger.error(f"消息处理错误: {e}")
-            self.connected = False
-            if self.on_network_error:
-                # 使用 schedule 确保错误处理在主线程中执行
-                self.on_network_error(f"连接错误: {str(e)}")
+            if websocket is not self.websocket:
+                return
+            if self.connected:
+                await self._drop_session(f"连接错误: {str(e)}")
+            else:
+                await self._report_network_error(f"连接错误: {str(e)}")
+
+    async def _handle_json_message(self, message):
+        """处理JSON消息"""
+        try:
+            data = json_codec.loads(message)
+        except ValueError as e:
+            logger.error(f"无效的JSON消息: {message}, 错误: {e}")
+            return
+        msg_type = data.get("type")
+        if msg_type == "hello":
+            # 处理服务器 hello 消息
+            await self._handle_server_hello(data)
+        elif self.on_incoming_json:
+            self.on_incoming_json(data)
+
+    async def _handle_binary_frame(self, message):
+        """处理带帧头的二进制消息"""
+        try:
+            frame_type, timestamp, payload = unpack_frame(message)
+        except ValueError as e:
+            logger.error(f"无效的二进制帧: {e}")
+            return
+
+        if frame_type == FrameType.JSON:
+            await self._handle_json_message(payload)
+            return
+        if frame_type != FrameType.OPUS:
+            logger.warning(f"未知的二进制帧类型: {frame_type}")
+            return
+
+        # 时间戳按帧时长换算为序列号，用于丢包统计和抖动缓冲区排序（0 也是有效的时间戳）
+        if self._first_remote_timestamp is None:
+            self._first_remote_timestamp = timestamp
+        elapsed = (timestamp - self._first_remote_timestamp) & 0xFFFFFFFF
+        sequence = round(elapsed / AudioConfig.FRAME_DURATION)
+        if not self.sequence_tracker.check(sequence):
+            return
+        self._update_jitter(timestamp)
+
+        if self.on_incoming_audio:
+            self.on_incoming_audio(bytes(payload), sequence)
+
+    def _update_jitter(self, timestamp):
+        """按 RFC 3550 估计下行到达时间抖动"""
+        arrival = (self.loop.time() - self._session_started_at) * 1000
+        transit = arrival - timestamp
+        if self._last_transit is not None:
+            delta = abs(transit - self._last_transit)
+            self.jitter_ms += (delta - self.jitter_ms) / 16
+        self._last_transit = transit
+
+    def get_receive_stats(self):
+        """获取下行音频的丢包、乱序和抖动统计（仅在使用二进制帧协议 v2 时有效）"""
+        stats = self.sequence_tracker.get_stats()
+        stats["jitter_ms"] = round(self.jitter_ms, 1)
+        stats["protocol_version"] = self.protocol_version
+        return stats
+
+    async def _handle_socket_closed(self, websocket):
+        """处理连接关闭"""
+        logger.info("WebSocket连接已关闭")
+        if websocket is not self.websocket:
+            # 已被替换或主动关闭的连接
+            return
+        if not self.connected:
+            # 备用连接断开，由后台任务重新建立
+            self.websocket = None
+            self._wake_standby()
+            return
+        await self._drop_session("WebSocket连接已断开")
+
+    async def _drop_session(self, reason):
+        """会话意外中断：丢弃当前连接，由重连监督器决定是否恢复"""
+        websocket, self.websocket = self.websocket, None
+        self.connected = False
+        if websocket:
+            try:
+                await websocket.close()
+            except Exception:
+                pass
+        await self._connection_lost(reason)
+        self._wake_standby()
 
     async def send_audio(self, data: bytes):
         """发送音频数据"""
@@ -123,20 +314,39 @@ class WebsocketProtocol(Protocol):
             return
 
         try:
+            if self.protocol_version >= PROTOCOL_VERSION_FRAMED:
+                # 时间戳为会话开始以来的毫秒数
+                timestamp = int((self.loop.time() - self._session_started_at) * 1000)
+                data = pack_frame(data, timestamp)
             await self.websocket.send(data)
         except Exception as e:
-            if self.on_network_error:
-                self.on_network_error()
+            # 连接断开由消息处理循环发现并处理
+            logger.warning(f"发送音频数据失败: {e}")
 
-    async def send_text(self, message: str):
-        """发送文本消息"""
-        if self.websocket:
-            try:
-                await self.websocket.send(message)
-            except Exception as e:
-                await self.close_audio_channel()
-                if self.on_network_error:
-                    self.on_network_error(f"发送消息失败: {str(e)}")
+    async def send_text(self, message: str) -> bool:
+        """
+        发送文本消息
+
+        返回:
+            bool: 是否已发出（正在重连时缓存下来等待补发也视为成功）
+        """
+        # 正在重连时先缓存，恢复后补发
+        if self.reconnect.buffer(message):
+            return True
+        if not self.websocket:
+            logger.error("WebSocket未连接，无法发送消息")
+            return False
+        try:
+            await self.websocket.send(message)
+            return True
+        except Exception as e:
+            logger.error(f"发送消息失败: {e}")
+            if self.connected:
+                await self._drop_session(f"发送消息失败: {str(e)}")
+                # 重连成功后补发这条消息
+                return self.reconnect.buffer(message)
+            await self._report_network_error(f"发送消息失败: {str(e)}")
+            return False
 
     def is_audio_channel_opened(self) -> bool:
         """检查音频通道是否打开"""
@@ -163,6 +373,20 @@ class WebsocketProtocol(Protocol):
                 return
             print("服务链接返回初始化配置", data)
 
+            # 服务器也支持时才使用带帧头的二进制消息
+            server_version = data.get("version", PROTOCOL_VERSION_RAW)
+            if (self.requested_version >= PROTOCOL_VERSION_FRAMED and
+                    server_version == PROTOCOL_VERSION_FRAMED):
+                self.protocol_version = PROTOCOL_VERSION_FRAMED
+            else:
+                self.protocol_version = PROTOCOL_VERSION_RAW
+            logger.info(f"二进制协议版本: {self.protocol_version}")
+            self._session_started_at = self.loop.time()
+            self._first_remote_timestamp = None
+            self._last_transit = None
+            self.jitter_ms = 0.0
+            self.sequence_tracker.reset()
+
             # 设置 hello 接收事件
             self.hello_received.set()
 
@@ -174,17 +398,39 @@ class WebsocketProtocol(Protocol):
 
         except Exception as e:
             logger.error(f"处理服务器 hello 消息时出错: {e}")
-            if self.on_network_error:
-                self.on_network_error(f"处理服务器响应失败: {str(e)}")
+            await self._report_network_error(f"处理服务器响应失败: {str(e)}")
 
     async def close_audio_channel(self):
         """关闭音频通道"""
+        self.reconnect.cancel()
+        self.uplink.clear()
+        if self.sequence_tracker.received_count:
+            logger.info(f"WebSocket音频接收统计: {self.get_receive_stats()}")
         if self.websocket:
             try:
-                await self.websocket.close()
-                self.websocket = None
+                # 先清空状态，消息处理循环看到的就是主动关闭
+                websocket, self.websocket = self.websocket, None
                 self.connected = False
+                await websocket.close()
                 if self.on_audio_channel_closed:
                     await self.on_audio_channel_closed()
             except Exception as e:
-                logger.error(f"关闭WebSocket连接失败: {e}")
\ No newline at end of file
+                logger.error(f"关闭WebSocket连接失败: {e}")
+        # 会话结束后重新准备备用连接
+        self._wake_standby()
+
+    async def disconnect(self):
+        """停止备用连接并关闭当前连接"""
+        if self._standby_task:
+            self._standby_task.cancel()
+            self._standby_task = None
+        self._standby_wakeup = None
+        if self.websocket and not self.connected:
+            # 只有备用连接，直接关闭，不触发音频通道关闭回调
+            websocket, self.websocket = self.websocket, None
+            try:
+                await websocket.close()
+            except Exception as e:
+                logger.error(f"关闭WebSocket连接失败: {e}")
+            return
+        await self.close_audio_channel()
\ No newline at end of file
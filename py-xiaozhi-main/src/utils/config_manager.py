@@ -1,5 +1,7 @@
+import asyncio
 import json
 import logging
+import time
 from pathlib import Path
 from typing import Dict, Any
 import threading
@@ -34,12 +36,34 @@ class ConfigManager:
                 "OTA_VERSION_URL": "https://api.tenclass.net/xiaozhi/ota/",
                 "WEBSOCKET_URL": "wss://api.tenclass.net/xiaozhi/v1/",
                 "WEBSOCKET_ACCESS_TOKEN": "test-token",
-                "MQTT_INFO": None
+                "WEBSOCKET_STANDBY": False,  # 空闲时保持一个已完成握手的备用连接
+                "WEBSOCKET_PING_INTERVAL": 20,  # 心跳间隔（秒）
+                "WEBSOCKET_IDLE_TIMEOUT": 300,  # 备用连接空闲多久后重建（秒）
+                "WEBSOCKET_PROTOCOL_VERSION": 1,  # 设为 2 时协商带帧头（时间戳、载荷长度）的二进制消息
+                "UPLINK_MAX_BYTES": 8192,  # 上行音频队列待发送字节数上限，超出后丢弃最旧的帧
+                "MQTT_INFO": None,
+                "OTA_ETAG": None,  # 上次OTA响应的ETag
+                "OTA_FETCHED_AT": 0,  # 上次成功获取OTA信息的时间戳
+                "OTA_REFRESH_TTL": 3600  # OTA信息的有效期（秒），过期后才重新请求
             }
         },
+        "AUDIO_OPTIONS": {
+            "INPUT_MODE": "callback",
+            "INPUT_BUFFER_FRAMES": 50,
+            "OUTPUT_MODE": "callback",
+            "OUTPUT_BUFFER_FRAMES": 4,
+            "JITTER_MIN_DELAY_MS": 60,
+            "JITTER_MAX_DELAY_MS": 400,
+            "DOWNLINK_MAX_MS": 10000,
+            "DOWNLINK_OVERFLOW_POLICY": "drop_oldest"
+        },
         "WAKE_WORD_OPTIONS": {
             "USE_WAKE_WORD": False,
             "MODEL_PATH": "models/vosk-model-small-cn-0.22",
+            "RECOGNIZER_MODE": "grammar",  # grammar: 只识别唤醒词（关键词检测）；open: 开放词表识别
+            "SPEECH_GATE": True,  # 只把检测到语音的片段送入识别器，降低空闲时的CPU占用
+            "GATE_MIN_ENERGY": 200,  # 语音门限的最低能量（int16 RMS）
+            "OUT_OF_PROCESS": False,  # 在独立子进程中运行识别，音频经共享内存传递，子进程崩溃时自动重启
             "WAKE_WORDS": [
                 "小智",
                 "小美"
@@ -77,11 +101,14 @@ class ConfigManager:
             return
         self._initialized = True
 
+        self._local_ip = None
+        self._ota_lock = threading.Lock()
+        self._refresh_future = None  # 正在进行的OTA刷新
+
         # 加载配置
         self._config = self._load_config()
         self._initialize_client_id()
         self._initialize_device_id()
-        self._initialize_mqtt_info()
 
     def _load_config(self) -> Dict[str, Any]:
         """加载配置文件，如果不存在则创建"""
@@ -190,16 +217,23 @@ class ConfigManager:
         # 方法1：使用 Python 的 uuid 模块
         return str(uuid.uuid4())
 
-    def get_local_ip(self):
+    def get_local_ip(self, refresh=False):
+        """获取本机 IP，结果会被缓存"""
+        if self._local_ip and not refresh:
+            return self._local_ip
         try:
-            # 创建一个临时 socket 连接来获取本机 IP
+            # 创建一个临时 socket 连接来获取本机 IP（UDP connect 不会发送数据）
             s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(('8.8.8.8', 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
+            try:
+                s.connect(('8.8.8.8', 80))
+                ip = s.getsockname()[0]
+            finally:
+                s.close()
         except Exception:
+            # 离线时不缓存，联网后可以重新获取
             return '127.0.0.1'
+        self._local_ip = ip
+        return ip
 
     def _initialize_client_id(self):
         """确保存在客户端ID"""
@@ -224,40 +258,96 @@ class ConfigManager:
             except Exception as e:
                 logger.error(f"Error generating DEVICE_ID: {e}")
 
-    def _initialize_mqtt_info(self):
+    def _is_mqtt_info_fresh(self):
+        """已保存的MQTT信息是否仍在有效期内"""
+        if not self.get_config("SYSTEM_OPTIONS.NETWORK.MQTT_INFO"):
+            return False
+        fetched_at = self.get_config("SYSTEM_OPTIONS.NETWORK.OTA_FETCHED_AT", 0) or 0
+        ttl = self.get_config("SYSTEM_OPTIONS.NETWORK.OTA_REFRESH_TTL", 3600)
+        return time.time() - fetched_at < ttl
+
+    def refresh_mqtt_info(self, force=False):
         """
-        初始化MQTT信息
-        每次启动都重新获取最新的MQTT配置信息
-        
+        从OTA服务器刷新MQTT信息
+        会发起阻塞的HTTP请求，异步代码请使用 refresh_mqtt_info_async。
+        已保存的信息未过期时不发起请求；过期后带上 ETag 请求，
+        服务器返回 304 时沿用已保存的信息。
+
+        参数:
+            force: 忽略有效期，强制向服务器确认
+
         Returns:
             dict: MQTT配置信息，获取失败则返回已保存的配置
         """
-        try:
-            # 尝试获取新的MQTT信息
-            mqtt_info = self._get_ota_version()
-            if mqtt_info:
-                # 更新配置
-                self.update_config("SYSTEM_OPTIONS.NETWORK.MQTT_INFO", mqtt_info)
-                self.logger.info("MQTT信息已成功更新")
+        with self._ota_lock:
+            if not force and self._is_mqtt_info_fresh():
+                self.logger.debug("MQTT信息仍在有效期内，跳过OTA请求")
+                return self.get_config("SYSTEM_OPTIONS.NETWORK.MQTT_INFO")
+
+            try:
+                # 尝试获取新的MQTT信息
+                mqtt_info, etag = self._get_ota_version()
+                if mqtt_info is None:
+                    self.logger.info("OTA信息未变化，使用已保存的MQTT配置")
+                    mqtt_info = self.get_config("SYSTEM_OPTIONS.NETWORK.MQTT_INFO")
+                else:
+                    self.logger.info("MQTT信息已成功更新")
+                self._update_network_config({
+                    "MQTT_INFO": mqtt_info,
+                    "OTA_ETAG": etag,
+                    "OTA_FETCHED_AT": int(time.time()),
+                })
                 return mqtt_info
-            else:
-                self.logger.warning("获取MQTT信息失败，使用已保存的配置")
+
+            except Exception as e:
+                self.logger.error(f"刷新MQTT信息失败: {e}")
+                # 发生错误时返回已保存的配置
                 return self.get_config("SYSTEM_OPTIONS.NETWORK.MQTT_INFO")
-                
-        except Exception as e:
-            self.logger.error(f"初始化MQTT信息失败: {e}")
-            # 发生错误时返回已保存的配置
-            return self.get_config("MQTT_INFO")
+
+    async def refresh_mqtt_info_async(self, force=False):
+        """
+        在线程池中刷新MQTT信息，不阻塞事件循环
+        同一时间只会有一个刷新请求，并发调用会等待同一个结果
+        """
+        loop = asyncio.get_running_loop()
+        future = self._refresh_future
+        if future is None or future.done():
+            future = loop.run_in_executor(None, self.refresh_mqtt_info, force)
+            self._refresh_future = future
+        return await asyncio.shield(future)
+
+    async def get_mqtt_info_async(self):
+        """
+        获取MQTT信息：有已保存的信息时立即返回，否则等待OTA请求完成
+        """
+        mqtt_info = self.get_config("SYSTEM_OPTIONS.NETWORK.MQTT_INFO")
+        if mqtt_info:
+            return mqtt_info
+        return await self.refresh_mqtt_info_async(force=True)
+
+    def _update_network_config(self, values):
+        """批量更新网络配置并只保存一次文件"""
+        network = self._config.setdefault("SYSTEM_OPTIONS", {}).setdefault("NETWORK", {})
+        network.update(values)
+        self._save_config(self._config)
 
     def _get_ota_version(self):
-        """获取OTA服务器的MQTT信息"""
+        """
+        获取OTA服务器的MQTT信息
+
+        Returns:
+            tuple: (mqtt_info, etag)，服务器返回 304 时 mqtt_info 为 None
+        """
         MAC_ADDR = self.get_config("SYSTEM_OPTIONS.DEVICE_ID")
         OTA_VERSION_URL = self.get_config("SYSTEM_OPTIONS.NETWORK.OTA_VERSION_URL")
-        
+        etag = self.get_config("SYSTEM_OPTIONS.NETWORK.OTA_ETAG")
+
         headers = {
             "Device-Id": MAC_ADDR,
             "Content-Type": "application/json"
         }
+        if etag and self.get_config("SYSTEM_OPTIONS.NETWORK.MQTT_INFO"):
+            headers["If-None-Match"] = etag
         
         # 构建设备信息payload
         payload = {
@@ -296,10 +386,14 @@ class ConfigManager:
                 OTA_VERSION_URL,
                 headers=headers,
                 json=payload,
-                timeout=10,  # 设置超时时间，防止请求卡死
+                # 连接超时较短，离线时快速失败；读取超时防止请求卡死
+                timeout=(3, 10),
                 proxies={'http': None, 'https': None}  # 禁用代理
             )
-            
+
+            if response.status_code == 304:
+                return None, etag
+
             # 检查HTTP状态码
             if response.status_code != 200:
                 self.logger.error(f"OTA服务器错误: HTTP {response.status_code}")
@@ -318,7 +412,7 @@ class ConfigManager:
             # 确保"mqtt"信息存在
             if "mqtt" in response_data:
                 self.logger.info("MQTT服务器信息已更新")
-                return response_data["mqtt"]
+                return response_data["mqtt"], response.headers.get("ETag")
             else:
                 self.logger.error("OTA服务器返回的数据无效: MQTT信息缺失")
                 raise ValueError(
@@ -0,0 +1,66 @@
+"""协议控制消息的 JSON 编解码
+
+安装了 orjson 时使用 orjson，否则使用标准库 json。
+已经序列化好的内容用 RawJson 包装后可以直接嵌入消息，不会被解析再重新序列化。
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class RawJson:
+    """已经序列化好的 JSON 片段，dumps 时原样嵌入"""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        if isinstance(text, (bytes, bytearray, memoryview)):
+            text = bytes(text).decode("utf-8")
+        self.text = text
+
+    def __repr__(self):
+        return f"RawJson({self.text!r})"
+
+
+if orjson is not None:
+    def _dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+
+    def loads(data):
+        """解析 JSON，data 可以是 str、bytes 或 bytearray"""
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        return orjson.loads(data)
+else:
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+    def loads(data):
+        """解析 JSON，data 可以是 str、bytes 或 bytearray"""
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        return json.loads(data)
+
+
+def dumps(obj):
+    """
+    序列化为 JSON 字符串
+
+    顶层字典中值为 RawJson 的字段直接拼接其内容，不做任何解析。
+
+    参数:
+        obj: 要序列化的对象
+
+    返回:
+        str: JSON 字符串
+    """
+    if isinstance(obj, dict) and any(isinstance(v, RawJson) for v in obj.values()):
+        fields = [
+            f"{_dumps(str(key))}:{value.text if isinstance(value, RawJson) else _dumps(value)}"
+            for key, value in obj.items()
+        ]
+        return "{" + ",".join(fields) + "}"
+    return _dumps(obj)
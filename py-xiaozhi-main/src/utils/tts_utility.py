@@ -3,8 +3,8 @@ import asyncio
 from edge_tts import Communicate
 import soundfile as sf
 import io
-from pydub import AudioSegment
 import numpy as np
+from src.audio_codecs.audio_resampler import resample_pcm
 
 
 class TtsUtility:
@@ -20,6 +20,21 @@ class TtsUtility:
                 audio_data += chunk["data"]
         return audio_data
 
+    @staticmethod
+    def _decode_mp3(audio_data: bytes):
+        """将 MP3 数据解码为 int16 PCM，返回 (样本数组, 采样率, 声道数)"""
+        try:
+            data, samplerate = sf.read(io.BytesIO(audio_data), dtype='int16')
+            channels = 1 if data.ndim == 1 else data.shape[1]
+            return data.reshape(-1), samplerate, channels
+        except Exception:
+            # 旧版本 libsndfile 不支持 MP3，退回 pydub 只做解码
+            from pydub import AudioSegment
+            audio = AudioSegment.from_mp3(io.BytesIO(audio_data))
+            audio = audio.set_sample_width(2)
+            samples = np.frombuffer(audio.raw_data, dtype=np.int16)
+            return samples, audio.frame_rate, audio.channels
+
     async def text_to_opus_audio(self, text: str) -> list:
         """将文本转换为 Opus 音频"""
 
@@ -28,22 +43,16 @@ class TtsUtility:
 
         try:
             # 2. 将 MP3 数据转换为 PCM 数据
-            audio = AudioSegment.from_mp3(io.BytesIO(audio_data))
+            samples, samplerate, channels = self._decode_mp3(audio_data)
 
             # 修改采样率与通道数，以匹配录音数据格式
-            audio = audio.set_frame_rate(self.audio_config.INPUT_SAMPLE_RATE)
-            audio = audio.set_channels(self.audio_config.CHANNELS)
-
-            wav_data = io.BytesIO()
-            audio.export(wav_data, format='wav')
-            wav_data.seek(0)
-
-            # 使用 soundfile 读取 WAV 数据
-            data, samplerate = sf.read(wav_data)
-
-            # 确保数据是 16 位整数格式
-            if data.dtype != np.int16:
-                data = (data * 32767).astype(np.int16)
+            data = resample_pcm(
+                samples,
+                samplerate,
+                self.audio_config.INPUT_SAMPLE_RATE,
+                channels,
+                self.audio_config.CHANNELS
+            )
 
             # 转换为字节序列
             raw_data = data.tobytes()
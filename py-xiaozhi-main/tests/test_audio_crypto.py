@@ -0,0 +1,46 @@
+import os
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from src.protocols.audio_crypto import NONCE_SIZE, AudioCryptoContext
+
+KEY = "00112233445566778899aabbccddeeff"
+NONCE = "01000000000000001122334455667788"
+
+
+def legacy_encrypt(key_hex, nonce_hex, payload, sequence):
+    """原来 MqttProtocol.send_audio 中按十六进制字符串拼接 nonce 的实现"""
+    new_nonce = (
+        nonce_hex[:4] +
+        format(len(payload), '04x') +
+        nonce_hex[8:24] +
+        format(sequence, '08x')
+    )
+    cipher = Cipher(algorithms.AES(bytes.fromhex(key_hex)), modes.CTR(bytes.fromhex(new_nonce)))
+    encryptor = cipher.encryptor()
+    return bytes.fromhex(new_nonce) + encryptor.update(payload) + encryptor.finalize()
+
+
+def test_encrypt_matches_legacy_nonce_layout():
+    crypto = AudioCryptoContext(KEY, NONCE)
+    for sequence, size in ((1, 0), (2, 1), (3, 120), (0xFFFFFFFF, 1500)):
+        payload = os.urandom(size)
+        expected = legacy_encrypt(KEY, NONCE, payload, sequence)
+        assert bytes(crypto.encrypt_packet(payload, sequence)) == expected
+
+
+def test_round_trip():
+    sender = AudioCryptoContext(KEY, NONCE)
+    receiver = AudioCryptoContext(KEY, NONCE)
+    for sequence in range(1, 20):
+        payload = os.urandom(sequence * 37)
+        packet = bytes(sender.encrypt_packet(payload, sequence))
+        assert len(packet) == NONCE_SIZE + len(payload)
+        assert receiver.decrypt_packet(packet) == payload
+
+
+def test_copied_packet_survives_next_encrypt():
+    crypto = AudioCryptoContext(KEY, NONCE)
+    first = bytes(crypto.encrypt_packet(b"first", 1))
+    crypto.encrypt_packet(b"second", 2)
+    assert crypto.decrypt_packet(first) == b"first"
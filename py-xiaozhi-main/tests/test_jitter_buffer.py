@@ -0,0 +1,129 @@
+from src.audio_codecs.jitter_buffer import JitterBuffer
+
+FRAME = 0.02
+
+
+def make_buffer(**kwargs):
+    return JitterBuffer(frame_duration_ms=20, min_delay_ms=60, max_delay_ms=200, **kwargs)
+
+
+def fill(buffer, sequences, start=0.0):
+    """按 20ms 间隔放入包，载荷就是序列号"""
+    for i, seq in enumerate(sequences):
+        buffer.put(bytes([seq % 256]), sequence=seq, arrival_time=start + i * FRAME)
+
+
+def drain(buffer, now):
+    packets = []
+    while True:
+        packet = buffer.pop(now)
+        if packet is None:
+            return packets
+        packets.append(packet)
+
+
+def test_plays_in_sequence_order():
+    buffer = make_buffer()
+    fill(buffer, [0, 1, 2, 3])
+    assert drain(buffer, now=1.0) == [(bytes([i]), False) for i in range(4)]
+
+
+def test_reordered_packets_are_sorted():
+    buffer = make_buffer()
+    fill(buffer, [1, 0, 3, 2])
+    assert [data for data, _ in drain(buffer, now=1.0)] == [bytes([i]) for i in range(4)]
+
+
+def test_waits_for_target_delay_before_playing():
+    buffer = make_buffer()
+    buffer.put(b"\x00", sequence=0, arrival_time=0.0)
+    assert buffer.pop(now=0.01) is None
+    assert buffer.time_until_ready(now=0.01) > 0
+    assert buffer.pop(now=1.0) == (b"\x00", False)
+
+
+def test_gap_uses_fec_from_next_packet():
+    buffer = make_buffer()
+    fill(buffer, [0, 2, 3])
+    packets = drain(buffer, now=1.0)
+    assert packets == [
+        (b"\x00", False),
+        (b"\x02", True),  # 用 2 的 FEC 恢复丢失的 1
+        (b"\x02", False),
+        (b"\x03", False),
+    ]
+    assert buffer.fec_count == 1
+    assert buffer.plc_count == 0
+
+
+def test_gap_without_next_packet_uses_plc():
+    buffer = make_buffer()
+    fill(buffer, [0, 3])
+    packets = drain(buffer, now=1.0)
+    assert packets == [(b"\x00", False), (b"", False), (b"\x03", True), (b"\x03", False)]
+    assert buffer.plc_count == 1
+    assert buffer.fec_count == 1
+    assert buffer.lost_count == 2
+
+
+def test_late_and_duplicate_packets_are_dropped():
+    buffer = make_buffer()
+    fill(buffer, [0, 1, 2])
+    buffer.pop(now=1.0)
+    assert not buffer.put(b"\x00", sequence=0, arrival_time=1.0)
+    assert not buffer.put(b"\x01", sequence=1, arrival_time=1.0)
+    assert buffer.late_count == 1
+    assert buffer.duplicate_count == 1
+
+
+def test_resume_after_underrun_skips_the_pause():
+    buffer = make_buffer()
+    fill(buffer, [0, 1, 2])
+    assert len(drain(buffer, now=1.0)) == 3
+    assert buffer.pop(now=1.0) is None
+    assert buffer.underrun_count == 1
+
+    # 下一句话的序列号跳到 50，不应为中间的序列号补 PLC
+    fill(buffer, [50, 51, 52], start=3.0)
+    packets = drain(buffer, now=4.0)
+    assert packets == [(bytes([i]), False) for i in (50, 51, 52)]
+    assert buffer.plc_count == 0
+
+
+def test_pause_between_bursts_does_not_inflate_jitter():
+    buffer = make_buffer()
+    fill(buffer, [0, 1, 2])
+    drain(buffer, now=1.0)
+    buffer.pop(now=1.0)
+
+    # 停顿 1 秒后发送下一句，时间戳对应的序列号没有跳变
+    fill(buffer, [3, 4, 5], start=2.0)
+    assert buffer.jitter == 0.0
+    assert buffer.target_delay == buffer.min_delay
+
+
+def test_long_gap_while_playing_is_capped():
+    buffer = make_buffer()
+    fill(buffer, [0, 1, 2])
+    buffer.pop(now=1.0)
+    buffer.put(b"\x64", sequence=100, arrival_time=1.0)
+    drain_count = len(drain(buffer, now=1.0))
+    # 2 个正常包 + 最多 max_packets 个隐藏帧 + 100
+    assert buffer.plc_count <= buffer.max_packets
+    assert drain_count <= 3 + buffer.max_packets
+
+
+def test_overflow_drops_oldest_packets():
+    buffer = make_buffer()
+    count = buffer.max_packets + 5
+    fill(buffer, range(count))
+    assert len(buffer) == buffer.max_packets
+    assert buffer.overflow_count == 5
+    assert buffer.pop(now=1.0) == (bytes([5]), False)
+
+
+def test_auto_sequence_when_not_provided():
+    buffer = make_buffer()
+    for i in range(3):
+        buffer.put(bytes([i]), arrival_time=i * FRAME)
+    assert [data for data, _ in drain(buffer, now=1.0)] == [bytes([i]) for i in range(3)]
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from src.constants.constants import AudioConfig
+from src.protocols.binary_protocol import PROTOCOL_VERSION_FRAMED, pack_frame
+from src.protocols.websocket_protocol import WebsocketProtocol
+
+
+@pytest.fixture
+def protocol():
+    # 直接设置帧长度，不查询音频设备
+    AudioConfig.FRAME_DURATION = 60
+    loop = asyncio.new_event_loop()
+    protocol = WebsocketProtocol(loop)
+    protocol.protocol_version = PROTOCOL_VERSION_FRAMED
+    received = []
+    protocol.on_incoming_audio = lambda data, sequence: received.append((data, sequence))
+    yield protocol, received
+    loop.close()
+    AudioConfig.reset()
+
+
+def feed(protocol, frames):
+    async def run():
+        for payload, timestamp in frames:
+            await protocol._handle_binary_frame(pack_frame(payload, timestamp))
+    protocol.loop.run_until_complete(run())
+
+
+def test_stream_starting_at_zero_timestamp(protocol):
+    protocol, received = protocol
+    feed(protocol, [(b"a", 0), (b"b", 60), (b"c", 120)])
+    assert received == [(b"a", 0), (b"b", 1), (b"c", 2)]
+    assert protocol.sequence_tracker.duplicate_count == 0
+
+
+def test_timestamps_are_relative_to_first_frame(protocol):
+    protocol, received = protocol
+    feed(protocol, [(b"a", 1000), (b"c", 1120), (b"b", 1060)])
+    assert received == [(b"a", 0), (b"c", 2), (b"b", 1)]
+
+
+def test_duplicate_frames_are_dropped(protocol):
+    protocol, received = protocol
+    feed(protocol, [(b"a", 0), (b"a", 0)])
+    assert received == [(b"a", 0)]
+    assert protocol.sequence_tracker.duplicate_count == 1
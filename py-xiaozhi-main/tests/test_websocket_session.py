@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from src.constants.constants import AudioConfig
+from src.protocols.websocket_protocol import WebsocketProtocol
+from src.utils import json_codec
+
+SERVER_HELLO = json_codec.dumps({"type": "hello", "transport": "websocket"})
+
+
+class FakeWebSocket:
+    """收到客户端 hello 后回复服务器 hello 的 WebSocket 替身"""
+
+    def __init__(self, hello_delay=0.0):
+        self.sent = []
+        self.close_code = None
+        self.hello_delay = hello_delay
+        self._incoming = asyncio.Queue()
+
+    async def send(self, message):
+        if self.close_code is not None:
+            raise ConnectionError("连接已关闭")
+        self.sent.append(message)
+        if json_codec.loads(message).get("type") == "hello":
+            asyncio.get_running_loop().call_later(
+                self.hello_delay, self._incoming.put_nowait, SERVER_HELLO
+            )
+
+    async def close(self):
+        if self.close_code is None:
+            self.close_code = 1000
+            self._incoming.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self._incoming.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    def messages(self, msg_type=None):
+        decoded = [json_codec.loads(message) for message in self.sent]
+        if msg_type is None:
+            return decoded
+        return [message for message in decoded if message.get("type") == msg_type]
+
+
+async def shutdown(protocol):
+    """关闭连接并结束剩余的后台任务"""
+    await protocol.disconnect()
+    pending = asyncio.all_tasks() - {asyncio.current_task()}
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+@pytest.fixture
+def protocol():
+    # 直接设置帧长度，不查询音频设备
+    AudioConfig.FRAME_DURATION = 60
+    loop = asyncio.new_event_loop()
+    protocol = WebsocketProtocol(loop)
+    yield protocol
+    loop.run_until_complete(shutdown(protocol))
+    loop.close()
+    AudioConfig.reset()
+
+
+def install_fake_sockets(protocol, **kwargs):
+    """用 FakeWebSocket 代替真实连接，返回所有创建过的连接"""
+    sockets = []
+
+    async def open_socket():
+        websocket = FakeWebSocket(**kwargs)
+        sockets.append(websocket)
+        protocol.websocket = websocket
+        protocol._socket_opened_at = asyncio.get_running_loop().time()
+        asyncio.create_task(protocol._message_handler(websocket))
+
+    protocol._open_socket = open_socket
+    return sockets
+
+
+def run(protocol, coro):
+    return protocol.loop.run_until_complete(coro)
+
+
+def test_send_text_reports_result(protocol):
+    install_fake_sockets(protocol)
+    assert run(protocol, protocol.send_text("{}")) is False
+    assert run(protocol, protocol.connect())
+    assert run(protocol, protocol.send_text("{}")) is True
+
+
+def test_iot_snapshot_sends_every_message(protocol):
+    sockets = install_fake_sockets(protocol)
+    assert run(protocol, protocol.connect())
+
+    run(protocol, protocol.send_iot_snapshot('[{"name": "Lamp"}]', '[{"power": true}]'))
+
+    iot = sockets[0].messages("iot")
+    assert [message["descriptors"] for message in iot if "descriptors" in message] == [
+        [{"name": "Lamp"}]
+    ]
+    assert [message["states"] for message in iot if "states" in message] == [
+        [{"power": True}]
+    ]
+
+
+def test_resume_resends_iot_snapshot(protocol):
+    sockets = install_fake_sockets(protocol)
+    protocol.reconnect.initial_delay = 0
+    resumed = asyncio.Event()
+
+    async def on_audio_channel_opened():
+        # 与 Application._on_audio_channel_opened 相同：在后台发送 IoT 快照
+        asyncio.create_task(
+            protocol.send_iot_snapshot('[{"name": "Lamp"}]', '[{"power": true}]')
+        )
+
+    async def on_resumed():
+        resumed.set()
+
+    protocol.on_audio_channel_opened = on_audio_channel_opened
+    protocol.reconnect.on_resumed = on_resumed
+
+    async def scenario():
+        assert await protocol.connect()
+        await asyncio.sleep(0)
+        await protocol._drop_session("测试断线")
+        await asyncio.wait_for(resumed.wait(), timeout=2)
+        await asyncio.sleep(0.05)
+
+    run(protocol, scenario())
+
+    assert len(sockets) == 2
+    iot = sockets[1].messages("iot")
+    assert any("descriptors" in message for message in iot)
+    assert any("states" in message for message in iot)
+
+
+def test_standby_does_not_close_socket_during_handshake(protocol):
+    sockets = install_fake_sockets(protocol, hello_delay=0.2)
+    protocol.standby_enabled = True
+    protocol.idle_timeout = 0.05
+
+    async def scenario():
+        await protocol.prepare()
+        await asyncio.sleep(0.1)  # 备用连接已建立，且已超过空闲时间
+        handshake = asyncio.create_task(protocol.connect())
+        await asyncio.sleep(0.05)
+        # 握手过程中备用连接任务被唤醒，不应关闭正在使用的连接
+        protocol._wake_standby()
+        return await asyncio.wait_for(handshake, timeout=2)
+
+    assert run(protocol, scenario())
+    assert len(sockets) == 1
+    assert sockets[0].close_code is None
+    assert protocol.is_audio_channel_opened()